@@ -6,25 +6,46 @@ import time
 import scipy.linalg as scipy
 import warnings
 import copy
+from collections import Counter
 from Modified_Node_Analysis import ModifiedNodalAnalysis
+from Frequency_Sweep import get_sweep_solver, IncrementalInverse, SWEEP_STRATEGIES
+from Compiled_Evaluator import evaluate_transfer_function
 
 
 
 
 class Approximation:
 
-    def __init__(self, equation_formulator):
+    def __init__(self, equation_formulator, sweep_strategy="auto", relevance_method="sherman-morrison"):
+        """Initialize the approximation.
+
+        Args:
+            equation_formulator (ModifiedNodalAnalysis): analysis with the system to approximate
+            sweep_strategy (str): solver for the verification solves, see get_Sweep_Strategies
+            relevance_method (str): computation of the relevance coefficients, see get_Relevance_Methods
+
+        """
         self.analysis = equation_formulator
+        self.sweep_strategy = sweep_strategy
+        self.relevance_method = relevance_method
         warnings.filterwarnings("error", category=scipy.LinAlgWarning)
         
     @staticmethod
     def get_Elimination_Methods():
-        return list(("term-by-term",))
+        return list(("term-by-term", "block"))
     
     @staticmethod
     def get_Sorting_Methods():
         return list(("max", "avg", "column"))
 
+    @staticmethod
+    def get_Sweep_Strategies():
+        return ["auto"] + list(SWEEP_STRATEGIES)
+
+    @staticmethod
+    def get_Relevance_Methods():
+        return list(("sherman-morrison", "exact"))
+
 
     def generate_term_list(self, matrix):
         """Generate term list of matrix.
@@ -46,204 +67,197 @@ class Approximation:
                     term_list.append(((i, j), t, [0.0]))  # Placeholder for numerical value
         return term_list
 
-    def generate_relevance_coefficients_sm(
-        self,
-        output_potential,
-        approx_points,
-        sysMatrix
-    ):
-        t0 = time.perf_counter_ns()
-        term_list = self.generate_term_list(sysMatrix)
-       
-
-        x_syms = list(self.analysis.get_unknowns())
-        
-        idx_out = x_syms.index(output_potential)
-
-
-        s = sp.symbols('s')
-
-        
-        
-        sysMatrix = sysMatrix.subs(self.analysis.value_dict)
-        z_num = self.analysis.z.subs(self.analysis.value_dict)
-
-          
-        print("Computing reference solution for sensitivity calculation...") 
-
-        f_terms = []
-
-        t_all = [t.subs(self.analysis.value_dict) for (_, t, _) in term_list]
-        f_all = sp.lambdify(s, t_all, 'numpy')
-
-        i_idx = np.array([i for ((i, j), _, _) in term_list])
-        j_idx = np.array([j for ((i, j), _, _) in term_list])
-        
-
-        
-        
-        
-
-        for ap in approx_points:
-            sysMatrix_num = sysMatrix.subs(s, 1j*2*np.pi*ap)
-            
-            t1 = time.perf_counter_ns()
-            A_inv = sysMatrix_num.inv()
-            t2 = time.perf_counter_ns()
-            print(f"Matrix inversion took {(t2 - t1) / 1e6} ms")
-
-            A_inv_np = np.array(A_inv, dtype=complex)
-
+    def evaluate_relevance_system(self, output_potential, approx_points, sysMatrix):
+        """Evaluate the system and its terms numerically at the approximation points.
 
-            x = A_inv_np * z_num
-            x_np = np.array(x, dtype=complex).flatten()
-            ref_result_k = x_np[idx_out]
-
-            print("Term list length: ", len(term_list))
-
-            t4 = time.perf_counter_ns()
-
-            t_vals = f_all(1j*2*np.pi*ap)
-            t_vals = np.array(t_vals, dtype=np.complex128)
+        Args:
+            output_potential (sp.Symbol): unknown of the transfer function
+            approx_points (list): frequencies in Hz
+            sysMatrix (sp.Matrix): symbolic system matrix
 
-            A_out_i = A_inv_np[idx_out, i_idx]
-            A_j_i = A_inv_np[j_idx, i_idx]
-            x_j = x_np[j_idx]
+        Returns:
+            term_list(list): terms of the matrix, see generate_term_list
+            A(array): system matrices, shape (frequencies, n, n)
+            z(array): excitation vectors, shape (frequencies, n)
+            terms(array): values of the terms, shape (terms, frequencies)
+            idx_out(int): index of the output unknown
 
-            dx_k_all = (-t_vals * A_out_i) / (1 + t_vals * A_j_i) * x_j
+        """
+        term_list = self.generate_term_list(sysMatrix)
+        idx_out = list(self.analysis.get_unknowns()).index(output_potential)
+        value_dict = self.analysis.value_dict
 
-            se_all = np.abs(dx_k_all) / abs(ref_result_k)
+        A = evaluate_transfer_function(sysMatrix, approx_points, value_dict)
+        z = evaluate_transfer_function(self.analysis.z, approx_points, value_dict)
+        terms = evaluate_transfer_function(sp.Matrix([t for _, t, _ in term_list]), approx_points, value_dict)
 
-            for idx, se in enumerate(se_all):
-                term_list[idx][2].append(float(se))
+        return term_list, np.moveaxis(A, -1, 0), np.moveaxis(z[:, 0], -1, 0), terms[:, 0], idx_out
 
-            
+    def generate_relevance_coefficients(self, output_potential, approx_points, sysMatrix):
+        """Generate relevance coefficients for each term of the matrix.
 
-            
-            t5 = time.perf_counter_ns()
-            print(f"Sensitivity evaluation for one frequency point took {(t5 - t4) / 1e6} ms")
-                
+        The relevance of a term is the relative change of |H| at every
+        approximation point if the term is removed from the matrix. The
+        method is chosen by relevance_method, see get_Relevance_Methods.
 
-        
-        t3 = time.perf_counter_ns()
-        print(f"Sensitivity calculation took {(t3 - t0) / 1e6} ms")
-       
-        
-        
+        Args:
+            output_potential (sp.Symbol): unknown of the transfer function
+            approx_points (list): frequencies in Hz
+            sysMatrix (sp.Matrix): symbolic system matrix
 
-        return term_list
+        Returns:
+            list: terms in the form ((i, j), term, relative errors per approximation point)
+        """
+        match self.relevance_method:
+            case "sherman-morrison":
+                return self.generate_relevance_coefficients_sm(output_potential, approx_points, sysMatrix)
+            case "exact":
+                return self.generate_relevance_coefficients_exact(output_potential, approx_points, sysMatrix)
+            case _:
+                raise ValueError(f"Unknown relevance method: {self.relevance_method}")
 
+    def generate_relevance_coefficients_sm(self, output_potential, approx_points, sysMatrix, singular_tolerance=1e-8):
+        """Generate relevance coefficients with rank-1 updates of the inverse.
 
+        Removing the term t at (i, j) changes A by -t*e_i*e_j^T, with the
+        Sherman-Morrison formula the changed output is
 
+            H_mod = H + t * inv(A)[out, i] * x[j] / (1 - t * inv(A)[j, i])
 
-    
-    def generate_relevance_coefficients(self, output_potential, approx_points, sysMatrix):
-        """Generate relevance coefficients for each term in the term list.
+        so A is only inverted once per approximation point and the relevance
+        of all terms at all points is one array operation. If the denominator
+        is almost zero the removal makes the matrix (nearly) singular and the
+        update loses its accuracy, those terms are solved exactly.
 
         Args:
-            term_list (list): list of terms in the form ((i, j), term, relevance coefficient)
-            mna (ModifiedNodalAnalysis): MNA instance with numerical solution
-            input_potential (sp.Expr): dictionary key for input potential
-            output_potential (sp.Expr): dictionary key for output potential
+            output_potential (sp.Symbol): unknown of the transfer function
+            approx_points (list): frequencies in Hz
+            sysMatrix (sp.Matrix): symbolic system matrix
+            singular_tolerance (float): terms with |1 - t * inv(A)[j, i]| below this are solved exactly
 
         Returns:
-            list: updated term list with relevance coefficients
+            list: terms in the form ((i, j), term, relative errors per approximation point)
         """
         t0 = time.perf_counter_ns()
-        
-
-        term_list = self.generate_term_list(sysMatrix)
-
-       
 
-    
-        s = sp.symbols('s')
-        approx_points = np.atleast_1d(approx_points)
-        jw = 1j * 2* np.pi* approx_points
+        term_list, A, z, terms, idx_out = self.evaluate_relevance_system(output_potential, approx_points, sysMatrix)
+        if not term_list:
+            return term_list
 
-    
-        x_syms = list(self.analysis.get_unknowns())
-        
-        idx_out = x_syms.index(output_potential)
+        i_idx = np.array([i for (i, _), _, _ in term_list])
+        j_idx = np.array([j for (_, j), _, _ in term_list])
 
-    
-        A_sym = sysMatrix.subs(self.analysis.value_dict)
-        z_sym = self.analysis.z.subs(self.analysis.value_dict)
+        A_inv = np.linalg.inv(A)
+        x = np.einsum("fij,fj->fi", A_inv, z)
+        abs_H_ref = np.abs(x[:, idx_out])
 
-        A_func = sp.lambdify(s, A_sym, "numpy")
-        z_func = sp.lambdify(s, z_sym, "numpy")
+        # (terms, frequencies)
+        denominator = 1 - terms * A_inv[:, j_idx, i_idx].T
+        with np.errstate(divide="ignore", invalid="ignore"):
+            H_mod = x[:, idx_out] + terms * A_inv[:, idx_out, i_idx].T * x[:, j_idx].T / denominator
+            relative_error = np.abs((abs_H_ref - np.abs(H_mod)) / abs_H_ref)
 
-        n_freq = len(jw)
-        n = A_sym.rows
+        exact = np.flatnonzero((np.abs(denominator) < singular_tolerance).any(axis=1))
+        for idx in exact:
+            (i, j), _, _ = term_list[idx]
+            relative_error[idx] = self.exact_relevance(A, z, idx_out, i, j, terms[idx], abs_H_ref)
 
-    
-        abs_H_ref = np.empty(n_freq)
+        term_list = [((i, j), term, relative_error[idx]) for idx, ((i, j), term, _) in enumerate(term_list)]
 
-        A_base = []
-        lu_cache = []
-        z_num_cache = []
-        x_ref_cache = []
+        t1 = time.perf_counter_ns()
+        print(f"Relevance coefficient generation (Sherman-Morrison) took {(t1 - t0) / 1e6} ms, {len(exact)} terms solved exactly")
 
-        
+        return term_list
 
-        for k, w in enumerate(jw):
-            A_num = np.array(A_func(w), dtype=complex)
-            z_num = np.array(z_func(w), dtype=complex).reshape(n)
+    def exact_relevance(self, A, z, idx_out, i, j, term, abs_H_ref):
+        """Compute the relevance of one term with a new factorization per approximation point.
 
-            lu, piv = scipy.lu_factor(A_num)
-            x = scipy.lu_solve((lu, piv), z_num)
+        Args:
+            A (array): system matrices, shape (frequencies, n, n)
+            z (array): excitation vectors, shape (frequencies, n)
+            idx_out (int): index of the output unknown
+            i (int): row of the term
+            j (int): column of the term
+            term (array): values of the term per approximation point
+            abs_H_ref (array): |H| of the complete matrix
 
-            H = x[idx_out] 
-            abs_H_ref[k] = np.abs(H)
+        Returns:
+            array: relative errors per approximation point, inf if the reduced matrix is singular
+        """
+        abs_H_mod = np.empty(len(A))
+        for k in range(len(A)):
+            A_mod = A[k].copy()
+            A_mod[i, j] -= term[k]
+            try:
+                lu, piv = scipy.lu_factor(A_mod)
+                x_mod = scipy.lu_solve((lu, piv), z[k])
+            except Exception:
+                return np.full(len(A), np.inf)
+            abs_H_mod[k] = np.abs(x_mod[idx_out])
 
-            A_base.append(A_num)
-            lu_cache.append((lu, piv))
-            z_num_cache.append(z_num)
-            x_ref_cache.append(x)
+        return np.abs((abs_H_ref - abs_H_mod) / abs_H_ref)
 
-        for idx, ((i, j), term, _) in enumerate(term_list):
+    def generate_relevance_coefficients_exact(self, output_potential, approx_points, sysMatrix):
+        """Generate relevance coefficients with a new LU factorization per term and approximation point.
 
-            
-            
+        Args:
+            output_potential (sp.Symbol): unknown of the transfer function
+            approx_points (list): frequencies in Hz
+            sysMatrix (sp.Matrix): symbolic system matrix
 
-            term_num = sp.lambdify(s, term.subs(self.analysis.value_dict), "numpy")
+        Returns:
+            list: terms in the form ((i, j), term, relative errors per approximation point)
+        """
+        t0 = time.perf_counter_ns()
 
-           
+        term_list, A, z, terms, idx_out = self.evaluate_relevance_system(output_potential, approx_points, sysMatrix)
 
-            abs_H_mod = np.empty(n_freq)
+        abs_H_ref = np.empty(len(A))
+        for k in range(len(A)):
+            lu, piv = scipy.lu_factor(A[k])
+            abs_H_ref[k] = np.abs(scipy.lu_solve((lu, piv), z[k])[idx_out])
 
-            failed = False
+        term_list = [
+            ((i, j), term, self.exact_relevance(A, z, idx_out, i, j, terms[idx], abs_H_ref))
+            for idx, ((i, j), term, _) in enumerate(term_list)
+        ]
 
-            for k, w in enumerate(jw):
-            
-                A_mod = A_base[k].copy()
-                A_mod[i, j] -= complex(term_num(w))
+        t1 = time.perf_counter_ns()
+        print(f"Relevance coefficient generation took {(t1 - t0) / 1e6} ms")
 
+        return term_list
 
-                try:
-                    lu, piv = scipy.lu_factor(A_mod)
-                    x_mod = scipy.lu_solve((lu, piv), z_num_cache[k])
+    def compare_relevance_methods(self, output_potential, approx_points, sysMatrix=None, rtol=1e-6, atol=1e-12):
+        """Report the terms where the Sherman-Morrison relevance differs from the exact one.
 
-                    H_mod = x_mod[idx_out] 
-                    abs_H_mod[k] = np.abs(H_mod)
-                    
+        Args:
+            output_potential (sp.Symbol | str): unknown of the transfer function
+            approx_points (list): frequencies in Hz
+            sysMatrix (sp.Matrix): symbolic system matrix, None for the matrix of the analysis
+            rtol (float): relative tolerance of the comparison
+            atol (float): absolute tolerance of the comparison
 
-                except Exception:
-                    term_list[idx] = ((i, j), term, float("inf"))
-                    failed = True
-                    break
+        Returns:
+            list: ((i, j), term, point index, Sherman-Morrison error, exact error) of every mismatch
+        """
+        output_potential = sp.Symbol(str(output_potential))
+        sysMatrix = self.analysis.A if sysMatrix is None else sysMatrix
 
-            if failed:
-                continue
+        sm = self.generate_relevance_coefficients_sm(output_potential, approx_points, sysMatrix)
+        exact = self.generate_relevance_coefficients_exact(output_potential, approx_points, sysMatrix)
 
-            relative_error = np.abs((abs_H_ref - abs_H_mod) / abs_H_ref)
-            term_list[idx] = ((i, j), term, relative_error) 
+        mismatches = []
+        for ((i, j), term, error_sm), (_, _, error_exact) in zip(sm, exact):
+            with np.errstate(invalid="ignore"):
+                close = np.isclose(error_sm, error_exact, rtol=rtol, atol=atol, equal_nan=True)
+            for k in np.flatnonzero(~close):
+                mismatches.append(((i, j), term, int(k), float(error_sm[k]), float(error_exact[k])))
 
-        t1 = time.perf_counter_ns()
-        print(f"Relevance coefficient generation took {(t1 - t0) / 1e6} ms")
+        print(f"Sherman-Morrison relevance differs from the exact one for {len(mismatches)} of {len(sm) * len(np.atleast_1d(approx_points))} values")
+        for (i, j), term, k, error_sm, error_exact in mismatches:
+            print(f"  ({i}, {j}) {term} at {np.atleast_1d(approx_points)[k]} Hz: {error_sm:.6g} instead of {error_exact:.6g}")
 
-        
-        return term_list
+        return mismatches
 
     
     def approximate(
@@ -351,133 +365,56 @@ class Approximation:
 
 
         match elimination_method:
-            # case "block":
-                
-                # error_flag = False
-                
-
-                # while term_list:
-                #     mag_jump = self.find_order_jumps(term_list, rel_error_threshold)
-
-                #     trial_term_list = term_list.copy()
-                #     trial_term_list_sym = term_list_sym.copy()
-                #     # create trial matrices
-                #     A0_trial = A0.copy()
-                #     A1_trial = A1.copy()
-
-                #     for k in range(mag_jump + 1):
-                #         (i, j), t0, t1, rel_coeff = trial_term_list.pop(0) #get least relevant numeric term
-                #         (i_sym, j_sym), term, rel_coeff_sym = trial_term_list_sym.pop(0) # get least relevant symbolic term for record keeping
-                        
-                #         A0_trial[i, j] -= t0
-                #         A1_trial[i, j] -= t1
-
-                #     # compute trial transfer function
-                #     try:
-                        
-                #         H_trial = self.compute_transfer_function_numeric(
-                #                 A0_trial,
-                #                 A1_trial,
-                #                 z_num_func,
-                #                 approx_points,
-                #                 idx_in,
-                #                 idx_out
-                #             )
-                #         print("Computed trial transfer function.")
-                #         print(H_trial)
-                        
-
-                #     except NonInvertibleMatrixError:
-                #         error_flag = True
-                    
-                #     if not error_flag:
-                #         if self.has_phase_sign_jump(H_ref, H_trial):# check for phase jumps
-                #             continue
-
-                #         abs_H_trial= np.abs(H_trial)
-
-                #         # calculate true error
-                #         true_error = np.max(
-                #             np.abs(abs_H_ref - abs_H_trial) / abs_H_ref
-                #         )
-                #     #check if true error is acceptable
-                #     if true_error > max_error or error_flag: #TODO: max_error per frequency point
-                #         for k in range(mag_jump + 1):
-                    
-                #             #get next, least relevant, term
-                            
-
-                #             (i, j), t0, t1, rel_coeff = term_list.pop(0) #get least relevant numeric term
-
-
-                #             (i_sym, j_sym), term, rel_coeff_sym = term_list_sym.pop(0) # get least relevant symbolic term for record keeping
+            case "block":
 
-                #             print(f"Trying to remove term {term} at position ({i}, {j}) with relevance coefficient {rel_coeff}")
-
-                #             #-------------------------------------------------------------------------------
-                #             # create trial matrices
-
-
-                #             A0_trial = A0.copy()
-                #             A1_trial = A1.copy()
-
-                #             A0_trial[i, j] -= t0
-                #             A1_trial[i, j] -= t1
-
-                #             #-------------------------------------------------------------------------------
-                #             # compute trial transfer function
-
-                #             try:
-                                
-                #                 H_trial = self.compute_transfer_function_numeric(
-                #                         A0_trial,
-                #                         A1_trial,
-                #                         z_num_func,
-                #                         approx_points,
-                #                         idx_in,
-                #                         idx_out
-                #                     )
-                #                 print("Computed trial transfer function.")
-                #                 print(H_trial)
-                                
-
-                #             except NonInvertibleMatrixError:
-                #                 continue
-                            
-
-                #             if self.has_phase_sign_jump(H_ref, H_trial):# check for phase jumps 
-                #                 continue
-
-                        
-                #             abs_H_trial= np.abs(H_trial)
+                solves = 0
+                # number of terms left per entry, entries without terms are set to exactly zero
+                remaining = Counter(position for position, _, _ in self.generate_term_list(self.analysis.A))
 
+                while term_list:
+                    # remove all terms up to the next jump of the relevance at once
+                    block_size = min(self.find_order_jump(term_list, rel_error_threshold) + 1, len(term_list))
+
+                    status = self.verify_removal(A0, A1, remaining, term_list[:block_size], z_num_func, approx_points, idx_out, H_ref, max_error)
+                    solves += 1
+
+                    accepted = block_size
+                    if status != "ok":
+                        # bisect for the longest part of the block which can still be removed
+                        low, high = 0, block_size
+                        while high - low > 1:
+                            middle = (low + high) // 2
+                            middle_status = self.verify_removal(A0, A1, remaining, term_list[:middle], z_num_func, approx_points, idx_out, H_ref, max_error)
+                            solves += 1
+                            if middle_status == "ok":
+                                low = middle
+                            else:
+                                high, status = middle, middle_status
+                        accepted = low
+
+                    self.remove_terms(A0, A1, remaining, term_list[:accepted])
+                    removed_terms.extend(term_list_sym[:accepted])
+                    del term_list[:accepted]
+                    del term_list_sym[:accepted]
+
+                    if status == "error":
+                        print("Error too high, ending approximation...")
+                        break
 
-                #             #-------------------------------------------------------------------------------
-                #             # calculate true error
-                            
-                            
-                #             true_error = np.abs(abs_H_ref - abs_H_trial) / abs_H_ref
-                            
-                            
-                            
-                #             #check if true error is acceptable
-                #             if any(error > max_error for error in true_error): #TODO: max_error per frequency point
-                #                 break
+                    if status == "skip":
+                        # the next term makes the matrix singular or flips the phase, keep it
+                        term_list.pop(0)
+                        term_list_sym.pop(0)
 
+                print(f"Removed {len(removed_terms)} terms with {solves} verification solves")
 
-                #             #-------------------------------------------------------------------------------
-                        
-                #             #accept removal
-                #             A0 = A0_trial.copy()
-                #             A1 = A1_trial.copy()
-                            
+            case "term-by-term":
 
-                #             removed_terms.append(((i_sym, j_sym), term, rel_coeff_sym)) # record keeping
+                # inverse of the reduced matrix at the approximation points, kept up to date over the removals
+                n = A0.shape[0]
+                z_ref = np.array(z_num_func(1j * 2 * np.pi * approx_points[0]), dtype=complex).reshape(n)
+                inverse = IncrementalInverse(A0, A1, approx_points, z_ref)
 
-                       
-            
-            case "term-by-term":
-               
                 while term_list:
 
                   
@@ -493,32 +430,12 @@ class Approximation:
                     #print(f"Trying to remove term {term} at position ({i}, {j}) with relevance coefficient {rel_coeff}")
 
                     #-------------------------------------------------------------------------------
-                    # create trial matrices
+                    # compute trial transfer function with a rank-1 update of the current inverse
 
+                    X_trial, singular = inverse.trial(i, j, t0, t1)
+                    H_trial = X_trial[:, idx_out]
 
-                    A0_trial = A0.copy()
-                    A1_trial = A1.copy()
-
-                    A0_trial[i, j] -= t0
-                    A1_trial[i, j] -= t1
-
-                    #-------------------------------------------------------------------------------
-                    # compute trial transfer function
-
-                    
-                        
-                    H_trial, is_singular = self.compute_transfer_function_numeric(
-                                A0_trial,
-                                A1_trial,
-                                z_num_func,
-                                approx_points,
-                                idx_out
-                            )
-                        # print("Computed trial transfer function.")
-                    #print(H_trial)
-                        
-
-                    if is_singular:
+                    if singular.any():
                         continue
                     
 
@@ -544,15 +461,14 @@ class Approximation:
                     #check if true error is acceptable
                     if (true_error > max_error) or (np.isnan(true_error) and (accumulated_relevance_error > max_error)): #TODO: max_error per frequency point
                         print("Error too high, ending approximation...")
+                        print(f"{inverse.updates} rank-1 updates, {inverse.refactorizations} inversions")
                         return self.calc_End_Result(removed_terms)
 
 
                     #-------------------------------------------------------------------------------
                 
                     #accept removal
-                    A0 = A0_trial.copy()
-                    A1 = A1_trial.copy()
-                    
+                    inverse.update(i, j, t0, t1)
 
                     removed_terms.append(((i_sym, j_sym), term, rel_coeff_sym)) # record keeping
 
@@ -625,55 +541,32 @@ class Approximation:
         return A_sym
 
     def compute_transfer_function_numeric(self, A0, A1, z_func ,approx_points, output_potential):
+        """Solve A(s) = A0 + s*A1 at the approximation points.
 
-        
-        #s = sp.symbols("s")
+        Args:
+            A0 (array): frequency independent part of the system matrix
+            A1 (array): part of the system matrix which gets multiplied with s
+            z_func (function): numeric excitation vector as function of s
+            approx_points (list): frequencies in Hz
+            output_potential (int): index of the output unknown
+
+        Returns:
+            H(array): complex output values, NaN at singular points
+            is_singular(bool): True if the system is singular at any point
+
+        """
         approx_points = np.atleast_1d(approx_points)
         jw = 1j * 2*np.pi* approx_points
 
- 
-
-        H = np.empty(len(jw))
         n = A0.shape[0]
+        z_num = np.array(z_func(jw[0]), dtype=complex).reshape(n)
 
-        is_singular = False
-
-        for k, w in enumerate(jw):
-            #A_num = np.array(A_func(w), dtype=complex)
-            z_num = np.array(z_func(w), dtype=complex).reshape(n)
-
-            A = A0 + w * A1
-
-            # try:
-
-            #     lu, piv = scipy.lu_factor(A)
-
-            # except RuntimeWarning:
-            #     is_singular = True
-            #     return None, is_singular
-
-            try:
-            
-                lu, piv = scipy.lu_factor(A)
+        solver = get_sweep_solver(self.sweep_strategy, A0, A1, len(jw))
+        X, singular = solver.solve(approx_points, z_num)
 
-                x = scipy.lu_solve((lu, piv), z_num)
-            
-            except scipy.LinAlgWarning:
-                is_singular = True
-                H[k] = np.nan
-                continue
-                
-            
-            print(x[output_potential])
-            
-
-            
-
-            
+        H = X[:, output_potential] #/ x[input_potential]
 
-            H[k] = x[output_potential] #/ x[input_potential]
-
-        return H, is_singular
+        return H, bool(singular.any())
 
     def has_phase_sign_jump(self, H_ref, H_trial, threshold=np.pi):
         phi_ref   = np.unwrap(np.angle(H_ref))
@@ -824,8 +717,16 @@ class Approximation:
 
         return term_list
     
-    def find_order_jump(term_list, threshold):
+    def find_order_jump(self, term_list, threshold):
+        """Find the first jump of the relevance coefficients by at least threshold decades.
+
+        Args:
+            term_list (list): sorted terms in the form ((i, j), term0, term1, relevance coefficient)
+            threshold (float): minimum jump in decades
 
+        Returns:
+            int: index of the last term before the jump, len(term_list) if there is no jump
+        """
         for i in range(len(term_list) - 1):
             _,_,_,a= term_list[i] 
             _,_,_,b= term_list[i + 1]
@@ -844,3 +745,62 @@ class Approximation:
                 return i
 
         return len(term_list)
+
+    def remove_terms(self, A0, A1, remaining, terms):
+        """Subtract terms from the numeric matrices in place.
+
+        The subtraction of all terms of an entry leaves round-off instead of
+        zero, which hides an empty row or column from the singularity checks
+        of the solvers. Entries without terms are set to exactly zero.
+
+        Args:
+            A0 (array): frequency independent part of the matrix
+            A1 (array): part of the matrix which gets multiplied with s
+            remaining (Counter): number of terms left per entry, updated in place
+            terms (list): terms to remove in the form ((i, j), term0, term1, relevance coefficient)
+        """
+        for (i, j), t0, t1, _ in terms:
+            A0[i, j] -= t0
+            A1[i, j] -= t1
+            remaining[(i, j)] -= 1
+            if remaining[(i, j)] == 0:
+                A0[i, j] = 0
+                A1[i, j] = 0
+
+    def verify_removal(self, A0, A1, remaining, terms, z_func, approx_points, output_potential, H_ref, max_error):
+        """Check if a group of terms can be removed from the matrix.
+
+        Args:
+            A0 (array): frequency independent part of the current matrix
+            A1 (array): part of the current matrix which gets multiplied with s
+            remaining (Counter): number of terms left per entry of the current matrix
+            terms (list): terms to remove in the form ((i, j), term0, term1, relevance coefficient)
+            z_func (function): numeric excitation vector as function of s
+            approx_points (list): frequencies in Hz
+            output_potential (int): index of the output unknown
+            H_ref (array): output values of the complete matrix
+            max_error (float): maximum relative error of |H|
+
+        Returns:
+            str: "ok" if the terms can be removed, "error" if the error gets too high,
+                "skip" if the matrix gets singular or the phase jumps
+        """
+        A0_trial = A0.copy()
+        A1_trial = A1.copy()
+        self.remove_terms(A0_trial, A1_trial, remaining.copy(), terms)
+
+        pattern = (A0_trial != 0) | (A1_trial != 0)
+        if not (pattern.any(axis=0).all() and pattern.any(axis=1).all()):
+            # an empty row or column, singular at every frequency
+            return "skip"
+
+        H_trial, is_singular = self.compute_transfer_function_numeric(A0_trial, A1_trial, z_func, approx_points, output_potential)
+
+        if is_singular or self.has_phase_sign_jump(H_ref, H_trial):
+            return "skip"
+
+        true_error = np.max(np.abs(np.abs(H_ref) - np.abs(H_trial)) / np.abs(H_ref))
+        if true_error > max_error:
+            return "error"
+
+        return "ok"
@@ -0,0 +1,202 @@
+"""Defines the compilation of symbolic results into vectorized evaluators.
+"""
+from functools import lru_cache
+import numpy
+import sympy as sp
+from sympy.printing.numpy import NumPyPrinter
+import logging
+logger = logging.getLogger(__name__)
+
+
+class ArgumentPrinter(NumPyPrinter):
+    """NumPy printer which prints the arguments of the evaluator by position.
+
+    Circuit symbols are no valid identifiers in general (V_$N_0001), renaming
+    them in the printer is much cheaper than an xreplace of the expression.
+
+    """
+
+    def __init__(self, arguments:dict):
+        """Innitialize the printer.
+
+        Args:
+            arguments (dict): symbol -> name of the argument
+
+        """
+        super().__init__()
+        self.arguments = arguments
+
+    def _print_Symbol(self, expr):
+        if expr in self.arguments:
+            return self.arguments[expr]
+        return super()._print_Symbol(expr)
+
+
+class CompiledExpression:
+    """Evaluator of an expression (or matrix) with its common subexpressions computed once.
+
+    sp.cse() splits the expression into a list of assignments, every shared
+    subterm becomes a variable. The assignments are printed as one Python
+    function with NumPy arithmetic and compiled once, calls only run the
+    arithmetic. The arguments are broadcast against each other, so the
+    frequency vector and the element values can both be arrays.
+
+    """
+
+    def __init__(self, expression, symbols:tuple, cse:bool=True):
+        """Compile an expression.
+
+        Args:
+            expression (sp.Expr | sp.Matrix): expression to evaluate
+            symbols (tuple): symbols in the order of the call arguments
+            cse (bool): eliminate common subexpressions, expanded polynomials compile much faster without
+
+        Raises:
+            ValueError: the expression has symbols which are no arguments
+
+        """
+        self.symbols = tuple(symbols)
+        self.shape = expression.shape if isinstance(expression, sp.MatrixBase) else None
+
+        entries = list(expression) if self.shape is not None else [sp.sympify(expression)]
+
+        free = set().union(*(entry.free_symbols for entry in entries)) - set(self.symbols)
+        if free:
+            raise ValueError(f"Symbols {sorted(map(str, free))} are no arguments of the evaluator")
+
+        arguments = [f"_a{i}" for i in range(len(self.symbols))]
+        self.printer = ArgumentPrinter(dict(zip(self.symbols, arguments)))
+        self.partial_sums = sp.numbered_symbols("_p", exclude=self.symbols)
+
+        if cse:
+            replacements, reduced = sp.cse(entries, symbols=sp.numbered_symbols("_x", exclude=self.symbols), order="none")
+        else:
+            replacements, reduced = [], entries
+        self.operations = len(replacements)
+
+        lines = [f"def _compiled({', '.join(arguments)}):"]
+        for symbol, value in replacements:
+            self.emit(lines, symbol, value)
+
+        results = []
+        for k, entry in enumerate(reduced):
+            result = sp.Symbol(f"_r{k}")
+            self.emit(lines, result, entry)
+            results.append(str(result))
+        lines.append(f"    return ({', '.join(results)},)")
+
+        namespace = {"numpy": numpy}
+        exec(compile("\n".join(lines), "<compiled expression>", "exec"), namespace)
+        self.function = namespace["_compiled"]
+
+        logger.debug(f"Compiled {len(entries)} entries with {self.operations} common subexpressions")
+
+    def emit(self, lines:list, symbol:sp.Symbol, value:sp.Expr):
+        """Append the assignment of one subexpression to the generated code.
+
+        Args:
+            lines (list): lines of the generated function
+            symbol (sp.Symbol): variable to assign
+            value (sp.Expr): value of the variable
+
+        """
+        lines.append(f"    {symbol} = {self.printer.doprint(self.split_sums(lines, value))}")
+
+    def split_sums(self, lines:list, value:sp.Expr, chunk:int=64):
+        """Move long sums into partial sums of at most chunk terms.
+
+        The Python compiler recurses once per operator of a chained sum, so
+        a determinant with thousands of terms can not be compiled in one line.
+
+        Args:
+            lines (list): lines of the generated function, the partial sums are appended
+            value (sp.Expr): expression to split
+            chunk (int): maximum number of terms per line
+
+        Returns:
+            sp.Expr: expression with the long sums replaced by partial sum variables
+
+        """
+        if value.is_Atom:
+            return value
+
+        args = [self.split_sums(lines, arg, chunk) for arg in value.args]
+        if not isinstance(value, sp.Add):
+            return value.func(*args, evaluate=False) if args != list(value.args) else value
+
+        while len(args) > chunk:
+            partial = []
+            for start in range(0, len(args), chunk):
+                name = next(self.partial_sums)
+                lines.append(f"    {name} = {self.printer.doprint(sp.Add(*args[start:start + chunk], evaluate=False))}")
+                partial.append(name)
+            args = partial
+        return sp.Add(*args, evaluate=False)
+
+    def __call__(self, *values):
+        """Evaluate the expression.
+
+        Args:
+            *values: one value (scalar or array) per symbol, broadcast against each other
+
+        Returns:
+            array: values of the expression, with the matrix shape in front for matrices
+
+        """
+        # Python scalars, the arithmetic on 0-d arrays is several times slower
+        values = [numpy.asarray(value) for value in values]
+        result = self.function(*(value.item() if value.ndim == 0 else value for value in values))
+        shape = numpy.broadcast_shapes(*(numpy.shape(entry) for entry in result), *(value.shape for value in values))
+
+        if self.shape is None:
+            return numpy.broadcast_to(result[0], shape).copy()
+
+        result = numpy.array([numpy.broadcast_to(entry, shape) for entry in result])
+        return result.reshape(self.shape + shape)
+
+
+@lru_cache(maxsize=64)
+def compile_expression(expression, symbols:tuple, cse:bool=True):
+    """Return the compiled evaluator of an expression, cached by the hash of the expression.
+
+    Args:
+        expression (sp.Expr | sp.ImmutableMatrix): expression to evaluate
+        symbols (tuple): symbols in the order of the call arguments
+        cse (bool): eliminate common subexpressions
+
+    Returns:
+        CompiledExpression: evaluator
+
+    """
+    return CompiledExpression(expression, symbols, cse)
+
+
+def evaluate_transfer_function(expression, frequencies, value_dict:dict|None=None):
+    """Evaluate a symbolic transfer function at s = j*2*pi*f.
+
+    Args:
+        expression (sp.Expr | sp.Matrix): transfer function in s and the element symbols
+        frequencies (array): frequencies in Hz
+        value_dict (dict): symbol -> value of the element symbols, arrays must broadcast against the frequencies
+
+    Returns:
+        array: complex values of the transfer function
+
+    Raises:
+        ValueError: a symbol of the expression has no value
+
+    """
+    value_dict = value_dict or {}
+    s = sp.symbols("s")
+    if isinstance(expression, sp.MatrixBase):
+        expression = sp.ImmutableMatrix(expression)
+
+    symbols = (s,) + tuple(sorted(expression.free_symbols - {s}, key=str))
+    missing = [symbol for symbol in symbols[1:] if symbol not in value_dict]
+    if missing:
+        raise ValueError(f"No values for {missing}")
+
+    evaluator = compile_expression(expression, symbols)
+    jw = 2j * numpy.pi * numpy.asarray(frequencies, dtype=float)
+
+    return evaluator(jw, *(value_dict[symbol] for symbol in symbols[1:]))
@@ -0,0 +1,364 @@
+"""Defines a determinant decision diagram (DDD) for symbolic network functions.
+"""
+import numpy as np
+import sympy as sp
+import logging
+logger = logging.getLogger(__name__)
+
+
+class DeterminantDecisionDiagram:
+    """Determinant of a sparse pencil A(s) = G + s*C as shared expansion graph.
+
+    The determinant is expanded along the rows (Laplace expansion). A minor is
+    identified by the next row to expand and the set of columns which are
+    already used, every minor is created only once and shared by all products
+    that lead to it. The graph therefore stays small for sparse MNA matrices,
+    while the expanded determinant can have millions of product terms.
+
+    Node 0 is the terminal node (the empty minor, value 1). Every other node
+    has a list of edges (entry, sign, child), the value of the node is
+    sum(sign * entry * child). The nodes are stored in the order they were
+    created, children always before their parents.
+
+    """
+
+    def __init__(self, size:int, entries:dict, max_nodes:int=1_000_000):
+        """Build the diagram of a sparse matrix.
+
+        Args:
+            size (int): number of rows/columns of the matrix
+            entries (dict): (row, col) -> (g, c, g_terms, c_terms), numeric value of the
+                s^0 and s^1 part and the number of symbolic terms of both parts
+            max_nodes (int): abort if the diagram gets larger than this
+
+        Raises:
+            ValueError: the diagram needs more than max_nodes nodes
+
+        """
+        self.size = size
+        self.max_nodes = max_nodes
+
+        values = list(entries.values())
+        self.positions = [(int(row), int(col)) for row, col in entries]
+        self.g = np.array([value[0] for value in values], dtype=complex)
+        self.c = np.array([value[1] for value in values], dtype=complex)
+        self.g_terms = [value[2] for value in values]
+        self.c_terms = [value[3] for value in values]
+
+        self.row_entries = [[] for _ in range(size)]
+        for idx, (row, col) in enumerate(self.positions):
+            self.row_entries[row].append((col, idx))
+
+        self.row_order, self.sign = self._order_rows()
+
+        self.edges = [[]]
+        self.root = self._build()
+
+    @classmethod
+    def from_stamps(cls, stamps, value_dict=None, rhs_column:int|None=None, rhs=None, max_nodes:int=1_000_000):
+        """Build the diagram from the stamps of an equation formulator.
+
+        Every stamp is one symbolic term. Stamps of the same element (or the
+        constant +-1 stamps) at the same position are counted as one term.
+
+        Args:
+            stamps (StampAssembler): stamps of the system
+            value_dict (dict): numeric values of the symbols, None if the stamps are numeric already
+            rhs_column (int): replace this column by the right hand side (Cramer numerator)
+            rhs (array): numeric right hand side to use instead of the rhs stamps
+            max_nodes (int): abort if the diagram gets larger than this
+
+        Returns:
+            DeterminantDecisionDiagram: diagram of det(A), or of det(A) with column rhs_column replaced by z
+
+        """
+        values = stamps.evaluate(stamps.values, value_dict)
+        entries = {}
+        terms = {pos: counts for pos, counts in stamps.term_counts().items() if pos[1] != rhs_column}
+
+        for row, col, value, order in zip(stamps.rows, stamps.cols, values, stamps.orders):
+            if col != rhs_column:
+                entries.setdefault((row, col), [0j, 0j])[order] += value
+
+        if rhs_column is not None:
+            if rhs is None:
+                rhs_values = stamps.evaluate(stamps.rhs_values, value_dict)
+                rhs_terms = {}
+                for row, value, param in zip(stamps.rhs_rows, rhs_values, stamps.rhs_params):
+                    entries.setdefault((row, rhs_column), [0j, 0j])[0] += value
+                    rhs_terms.setdefault(row, set()).add(param[0] if param else None)
+                for row, names in rhs_terms.items():
+                    terms[(row, rhs_column)] = [len(names), 0]
+            else:
+                for row, value in enumerate(rhs):
+                    if value != 0:
+                        entries[(row, rhs_column)] = [complex(value), 0j]
+                        terms[(row, rhs_column)] = [1, 0]
+
+        data = {
+            pos: (g, c, terms[pos][0] if g != 0 else 0, terms[pos][1] if c != 0 else 0)
+            for pos, (g, c) in entries.items() if g != 0 or c != 0
+        }
+
+        return cls(stamps.size, data, max_nodes)
+
+    @classmethod
+    def from_matrix(cls, matrix:sp.MatrixBase, value_dict:dict, max_nodes:int=1_000_000):
+        """Build the diagram from a symbolic matrix which is linear in s.
+
+        Args:
+            matrix (sp.Matrix): symbolic system matrix
+            value_dict (dict): numeric values of the symbols
+            max_nodes (int): abort if the diagram gets larger than this
+
+        Returns:
+            DeterminantDecisionDiagram: diagram of det(matrix)
+
+        """
+        s = sp.symbols("s")
+        entries = {}
+        for row in range(matrix.rows):
+            for col in range(matrix.cols):
+                expr = sp.expand(matrix[row, col])
+                if expr == 0:
+                    continue
+                g_part = expr.subs(s, 0)
+                c_part = sp.diff(expr, s)
+                entries[(row, col)] = (
+                    complex(g_part.xreplace(value_dict)),
+                    complex(c_part.xreplace(value_dict)),
+                    len(sp.Add.make_args(g_part)) if g_part != 0 else 0,
+                    len(sp.Add.make_args(c_part)) if c_part != 0 else 0,
+                )
+
+        return cls(matrix.rows, entries, max_nodes)
+
+    def _order_rows(self):
+        """Order the rows so few columns are open at a time, which keeps the diagram small.
+
+        Greedy: the next row is the one which opens the fewest columns that
+        are not touched by the rows before.
+
+        Returns:
+            order(list): row order of the expansion
+            sign(int): sign of the row permutation
+
+        """
+        remaining = set(range(self.size))
+        touched = set()
+        order = []
+
+        while remaining:
+            row = min(remaining, key=lambda r: (len({col for col, _ in self.row_entries[r]} - touched), r))
+            remaining.remove(row)
+            touched.update(col for col, _ in self.row_entries[row])
+            order.append(row)
+
+        # sign of the permutation via the cycle decomposition
+        sign = 1
+        seen = [False] * self.size
+        for start in range(self.size):
+            length = 0
+            pos = start
+            while not seen[pos]:
+                seen[pos] = True
+                pos = order[pos]
+                length += 1
+            if length > 0 and length % 2 == 0:
+                sign = -sign
+
+        return order, sign
+
+    def _build(self):
+        """Expand the determinant into the shared graph.
+
+        Returns:
+            int: id of the root node, None if the determinant is structurally zero
+
+        """
+        n = self.size
+        memo = {}
+        stack = [(0, 0)]
+
+        # columns which no row from this depth on can fill, a minor that
+        # still has one of them free is zero
+        last_depth = [-1] * n
+        for depth, row in enumerate(self.row_order):
+            for col, _ in self.row_entries[row]:
+                last_depth[col] = depth
+        closed = [0] * (n + 1)
+        for col, depth in enumerate(last_depth):
+            for k in range(depth + 1, n + 1):
+                closed[k] |= 1 << col
+
+        while stack:
+            key = stack[-1]
+            if key in memo:
+                stack.pop()
+                continue
+
+            depth, used = key
+            if depth == n:
+                memo[key] = 0
+                stack.pop()
+                continue
+
+            row = self.row_order[depth]
+            free = [
+                (col, idx) for col, idx in self.row_entries[row]
+                if not used >> col & 1 and not closed[depth + 1] & ~(used | 1 << col)
+            ]
+            pending = [(depth + 1, used | 1 << col) for col, _ in free if (depth + 1, used | 1 << col) not in memo]
+            if pending:
+                stack.extend(pending)
+                continue
+
+            edges = []
+            for col, idx in free:
+                child = memo[(depth + 1, used | 1 << col)]
+                if child is None:
+                    continue
+                # position of the column among the free columns of the minor
+                position = col - bin(used & ((1 << col) - 1)).count("1")
+                edges.append((idx, -1 if position % 2 else 1, child))
+
+            if edges:
+                memo[key] = len(self.edges)
+                self.edges.append(edges)
+            else:
+                memo[key] = None
+            stack.pop()
+
+            # zero minors count as well, they cost the same to find
+            if len(memo) > self.max_nodes:
+                raise ValueError(f"Determinant decision diagram exceeds {self.max_nodes} nodes")
+
+        logger.debug(f"DDD with {self.node_count()} nodes and {self.edge_count()} edges")
+
+        return memo[(0, 0)]
+
+    def node_count(self):
+        """Return the number of nodes (without the terminal node)."""
+        return len(self.edges) - 1
+
+    def edge_count(self):
+        """Return the number of edges of the graph."""
+        return sum(len(edges) for edges in self.edges)
+
+    def _propagate(self, terminal, combine):
+        """Compute a value for every node, children first.
+
+        Args:
+            terminal: value of the terminal node
+            combine (function): (edges, values) -> value of a node
+
+        Returns:
+            value of the root node, None if the determinant is structurally zero
+
+        """
+        if self.root is None:
+            return None
+
+        values = [terminal]
+        for edges in self.edges[1:]:
+            values.append(combine(edges, values))
+
+        return values[self.root]
+
+    def term_counts(self):
+        """Count the product terms of the expanded determinant per power of s.
+
+        Cancellations of equal terms with opposite sign are not considered,
+        so this is the size of the fully expanded sum of products.
+
+        Returns:
+            list: number of terms for s^0, s^1, ... (python ints, they can get very large)
+
+        """
+        def combine(edges, values):
+            result = [0] * (max(len(values[child]) for _, _, child in edges) + 1)
+            for idx, _, child in edges:
+                for power, count in enumerate(values[child]):
+                    result[power] += self.g_terms[idx] * count
+                    result[power + 1] += self.c_terms[idx] * count
+            return result
+
+        counts = self._propagate([1], combine)
+        if counts is None:
+            return [0]
+
+        while len(counts) > 1 and counts[-1] == 0:
+            counts.pop()
+        return counts
+
+    def term_count(self):
+        """Return the total number of product terms of the expanded determinant."""
+        total_terms = [g + c for g, c in zip(self.g_terms, self.c_terms)]
+
+        def combine(edges, values):
+            return sum(total_terms[idx] * values[child] for idx, _, child in edges)
+
+        count = self._propagate(1, combine)
+        return 0 if count is None else count
+
+    def evaluate_s(self, s_values):
+        """Evaluate the determinant for complex frequencies.
+
+        Args:
+            s_values (array): complex frequencies
+
+        Returns:
+            array: complex determinant values
+
+        """
+        s_values = np.atleast_1d(np.asarray(s_values, dtype=complex))
+        entry_values = self.g[:, None] + self.c[:, None] * s_values[None, :]
+
+        def combine(edges, values):
+            result = np.zeros(len(s_values), dtype=complex)
+            for idx, sign, child in edges:
+                result += sign * entry_values[idx] * values[child]
+            return result
+
+        det = self._propagate(np.ones(len(s_values), dtype=complex), combine)
+        if det is None:
+            return np.zeros(len(s_values), dtype=complex)
+
+        return self.sign * det
+
+    def evaluate(self, frequencies):
+        """Evaluate the determinant at s = j*2*pi*f.
+
+        Args:
+            frequencies (list): frequencies in Hz
+
+        Returns:
+            array: complex determinant values
+
+        """
+        return self.evaluate_s(1j * 2 * np.pi * np.atleast_1d(np.asarray(frequencies, dtype=float)))
+
+    def coefficients(self):
+        """Return the numeric coefficients of the determinant as polynomial in s.
+
+        Returns:
+            array: coefficients of s^0, s^1, ... (ascending powers)
+
+        """
+        def combine(edges, values):
+            result = np.zeros(max(len(values[child]) for _, _, child in edges) + 1, dtype=complex)
+            for idx, sign, child in edges:
+                child_value = values[child]
+                result[:len(child_value)] += sign * self.g[idx] * child_value
+                result[1:len(child_value) + 1] += sign * self.c[idx] * child_value
+            return result
+
+        coefficients = self._propagate(np.ones(1, dtype=complex), combine)
+        if coefficients is None:
+            return np.zeros(1)
+
+        coefficients = self.sign * coefficients
+        if not np.iscomplex(coefficients).any():
+            coefficients = coefficients.real
+
+        return np.trim_zeros(coefficients, "b") if coefficients.any() else coefficients[:1]
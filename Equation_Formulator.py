@@ -2,10 +2,83 @@
 """
 import netlist.Circuit as Circuit
 import sympy as sp
+from sympy.polys.matrices import DomainMatrix
+import numpy as np
+import scipy.sparse as sparse
+from scipy.sparse.csgraph import maximum_bipartite_matching
+from Determinant_Decision_Diagram import DeterminantDecisionDiagram
+import heapq
 import logging
 import Pspice_util as pu
 logger = logging.getLogger(__name__)
 
+def _poly_exquo(dividend, divisor):
+    """Exact division of two sparse polynomials (PolyElement).
+
+    PolyElement.exquo searches the leading term of the whole remainder in
+    every step, which is quadratic in the number of terms. Here the
+    monomials of the remainder are kept in a heap instead. Division by a
+    monomial, the common case for the pivots in sparse systems, just shifts
+    the exponents.
+
+    Args:
+        dividend (PolyElement): polynomial to divide
+        divisor (PolyElement): polynomial which divides the dividend exactly
+
+    Returns:
+        PolyElement: quotient
+
+    """
+    ring = dividend.ring
+    domain = ring.domain
+
+    if len(divisor) == 1:
+        (monom, coeff), = divisor.items()
+        if not any(monom) and coeff == domain.one:
+            return dividend
+        quotient = ring.zero
+        for term_monom, term_coeff in dividend.items():
+            quotient[tuple(a - b for a, b in zip(term_monom, monom))] = domain.exquo(term_coeff, coeff)
+        return quotient
+
+    # lex order, the monomials are compared as exponent tuples
+    lead_monom = max(divisor.keys())
+    lead_coeff = divisor[lead_monom]
+    rest = [(monom, coeff) for monom, coeff in divisor.items() if monom != lead_monom]
+
+    remainder = dict(dividend)
+    heap = [tuple(-e for e in monom) for monom in remainder]
+    heapq.heapify(heap)
+    quotient = ring.zero
+
+    while heap:
+        monom = tuple(-e for e in heapq.heappop(heap))
+        coeff = remainder.pop(monom, None)
+        if not coeff:
+            continue
+        # skip duplicates of the same monomial further down the heap
+        while heap and heap[0] == tuple(-e for e in monom):
+            heapq.heappop(heap)
+
+        q_monom = tuple(a - b for a, b in zip(monom, lead_monom))
+        if min(q_monom) < 0:
+            raise sp.polys.polyerrors.ExactQuotientFailed(dividend, divisor)
+        q_coeff = domain.exquo(coeff, lead_coeff)
+        quotient[q_monom] = q_coeff
+
+        for r_monom, r_coeff in rest:
+            m = tuple(a + b for a, b in zip(q_monom, r_monom))
+            value = remainder.get(m, domain.zero) - q_coeff * r_coeff
+            if value:
+                if m not in remainder:
+                    heapq.heappush(heap, tuple(-e for e in m))
+                remainder[m] = value
+            else:
+                remainder.pop(m, None)
+
+    return quotient
+
+
 class EquationFormulator:
     """_summary_.
     """
@@ -46,35 +119,309 @@ class EquationFormulator:
         num_matrix = matrix.subs(value_dict)
         return num_matrix
 
-    def estimateTerms(self, matrix: sp.Matrix):
+    def estimateTerms(self, matrix: sp.Matrix, max_edges: int = 200000):
         """Estimate the terms of an equation system.
 
+        The terms of the expanded determinant are counted structurally from
+        the number of terms of every matrix entry, see countTerms().
+
         Args:
             matrix (sp.Matrix): _Matrix of equation system.
+            max_edges (int): size limit of the decision diagram for the exact count
 
         Raises:
             TypeError: Argument is not a sympy MatrixBase object.
 
         Returns:
-            sympy.Expr: Determinant of the matrix with all symbols replaced by 1.
+            int: number of product terms of the determinant (without cancellation)
 
         """
         if not isinstance(matrix, sp.MatrixBase):
             raise TypeError(self.EXCEPTION_NOTAMATRIX)
-        
-       
-        symbols = matrix.free_symbols
-        
-      
-        subs_dict = {s: 1 for s in symbols}
 
-        matrix_ones = matrix.subs(subs_dict)
+        term_counts = {
+            pos: len(sp.Add.make_args(sp.expand(entry)))
+            for pos, entry in matrix.todok().items() if entry != 0
+        }
+
+        return self.countTerms(matrix.rows, term_counts, max_edges)
+
+    def countTerms(self, size: int, term_counts: dict, max_edges: int = 200000):
+        """Count the product terms of a determinant from its sparsity pattern.
+
+        The count is the permanent of the matrix of per-entry term counts,
+        i.e. the determinant expanded without cancellation. It is computed
+        exactly by path counting on the determinant decision diagram. If the
+        diagram gets too large, the permanent is estimated from the Sinkhorn
+        scaled matrix (Bethe approximation) instead.
+
+        Args:
+            size (int): number of rows/columns of the matrix
+            term_counts (dict): (row, col) -> number of terms of the entry
+            max_edges (int): size limit of the decision diagram for the exact count
+
+        Returns:
+            int: (estimated) number of product terms
+
+        """
+        entries = {pos: (1, 0, count, 0) for pos, count in term_counts.items() if count > 0}
+        # every node costs about one edge per entry of its row
+        max_nodes = max_edges * size // max(len(entries), 1)
+
+        try:
+            return DeterminantDecisionDiagram(size, entries, max_nodes).term_count()
+
+        except ValueError:
+            logger.info(f"More than {max_nodes} minors, estimating the number of terms")
+
+        return self.estimatePermanent(size, term_counts)
 
-        return sp.det(matrix_ones)    
+    @staticmethod
+    def estimatePermanent(size: int, term_counts: dict, iterations: int = 1000, tol: float = 1e-10):
+        """Estimate the permanent of a non-negative sparse matrix.
 
+        The matrix is scaled to a doubly stochastic matrix B = diag(x) A diag(y)
+        (Sinkhorn). Then per(A) = per(B) / (prod(x) * prod(y)) and per(B) is
+        approximated by prod((1 - b)^(1 - b)), which is a lower bound within
+        a factor of sqrt(2)^n.
 
+        Args:
+            size (int): number of rows/columns of the matrix
+            term_counts (dict): (row, col) -> non-negative entry
+            iterations (int): maximum number of Sinkhorn iterations
+            tol (float): tolerance of the row and column sums
+
+        Returns:
+            int: estimated permanent, 0 if the matrix is structurally singular
+
+        """
+        positions = [pos for pos, count in term_counts.items() if count > 0]
+        rows = np.array([row for row, _ in positions], dtype=int)
+        cols = np.array([col for _, col in positions], dtype=int)
+        values = np.array([term_counts[pos] for pos in positions], dtype=float)
 
+        pattern = sparse.csr_matrix((np.ones(len(values)), (rows, cols)), shape=(size, size))
+        if (maximum_bipartite_matching(pattern, perm_type="column") < 0).any():
+            return 0
 
+        log_x = np.zeros(size)
+        log_y = np.zeros(size)
+        for _ in range(iterations):
+            scaled = values * np.exp(log_x[rows] + log_y[cols])
+            log_x -= np.log(np.bincount(rows, scaled, size))
+            scaled = values * np.exp(log_x[rows] + log_y[cols])
+            col_sums = np.bincount(cols, scaled, size)
+            log_y -= np.log(col_sums)
+            if np.max(np.abs(np.bincount(rows, scaled / col_sums[cols], size) - 1)) < tol:
+                break
+
+        B = values * np.exp(log_x[rows] + log_y[cols])
+        free = 1 - np.minimum(B, 1)
+        log_per = np.sum(free[free > 0] * np.log(free[free > 0])) - np.sum(log_x) - np.sum(log_y)
+
+        return int(sp.exp(sp.Float(log_per)).round())
+
+    def fractionFreeSolve(self, system: DomainMatrix, idx: int):
+        """Solve for a single unknown with Cramer's rule and fraction-free elimination.
+
+        See fractionFreeDeterminants(), the determinants are converted to sympy expressions.
+
+        Args:
+            system (DomainMatrix): augmented system [A | z] over a polynomial ring (or a field)
+            idx (int): index of the unknown to solve for
+
+        Returns:
+            N(sp.Expr): numerator determinant
+            D(sp.Expr): system determinant
+
+        """
+        N, D = self.fractionFreeDeterminants(system, idx)
+        return system.domain.to_sympy(N), system.domain.to_sympy(D)
 
+    @staticmethod
+    def fractionFreeDeterminants(system: DomainMatrix, idx: int):
+        """Compute the two determinants of Cramer's rule with fraction-free elimination.
 
+        The augmented system [A | z] is eliminated with the Bareiss algorithm
+        over its polynomial ring, the target column is never used as pivot
+        column. All divisions are exact, so no rational function ever gets
+        built. The last pivot is det(A) and the last entry of the rhs column
+        is the determinant of A with the target column replaced by z.
+
+        The rows are kept as sparse dicts. A row without an entry in the pivot
+        column is not touched at all, its pending scaling by the following
+        pivots telescopes and is applied in the next division instead.
+
+        Args:
+            system (DomainMatrix): augmented system [A | z] over a polynomial ring (or a field)
+            idx (int): index of the unknown to solve for
+
+        Returns:
+            N(DomainElement): numerator determinant
+            D(DomainElement): system determinant
+
+        """
+        n = system.shape[0]
+        domain = system.domain
+        dod = system.to_dod()
+        rows = [dict(dod.get(i, {})) for i in range(n)]
+
+        if domain.is_PolynomialRing:
+            entry_size, exquo = len, _poly_exquo
+        else:
+            entry_size, exquo = (lambda value: 1), domain.exquo
+
+        one = domain.one
+        prev = one
+        # pivot which was current when the row has been stored, true row = row * prev / row_prev
+        row_prev = [one] * n
+
+        remaining_rows = list(range(n))
+        remaining_cols = set(range(n)) - {idx}
+        row_order = []
+        col_order = []
+
+        for _ in range(n - 1):
+            # Markowitz style pivot, small entries in sparse rows/columns first
+            row_count = {i: sum(1 for c in rows[i] if c in remaining_cols) for i in remaining_rows}
+            col_count = {}
+            for i in remaining_rows:
+                for c in rows[i]:
+                    col_count[c] = col_count.get(c, 0) + 1
+            candidates = [(i, c) for i in remaining_rows for c in rows[i] if c in remaining_cols]
+            if not candidates:
+                return domain.zero, domain.zero
+            pivot_row, pivot_col = min(
+                candidates,
+                key=lambda ic: (entry_size(rows[ic[0]][ic[1]]), (row_count[ic[0]] - 1) * (col_count[ic[1]] - 1))
+            )
+
+            if row_prev[pivot_row] != prev:
+                rows[pivot_row] = {c: exquo(v * prev, row_prev[pivot_row]) for c, v in rows[pivot_row].items()}
+                row_prev[pivot_row] = prev
+            pivot_entries = rows[pivot_row]
+            pivot = pivot_entries[pivot_col]
+
+            remaining_rows.remove(pivot_row)
+            remaining_cols.remove(pivot_col)
+            row_order.append(pivot_row)
+            col_order.append(pivot_col)
+
+            for i in remaining_rows:
+                factor = rows[i].get(pivot_col)
+                if not factor:
+                    continue
+                entries = rows[i]
+                updated = {}
+                for c in set(entries) | set(pivot_entries):
+                    if c == pivot_col:
+                        continue
+                    value = pivot * entries.get(c, domain.zero) - factor * pivot_entries.get(c, domain.zero)
+                    value = exquo(value, row_prev[i])
+                    if value:
+                        updated[c] = value
+                rows[i] = updated
+                row_prev[i] = pivot
+
+            prev = pivot
+
+        last = remaining_rows[0]
+        row_order.append(last)
+        col_order.append(idx)
+        D = rows[last].get(idx, domain.zero)
+        N = rows[last].get(n, domain.zero)
+        if row_prev[last] != prev:
+            D = exquo(D * prev, row_prev[last])
+            N = exquo(N * prev, row_prev[last])
+
+        sign = EquationFormulator.permutationSign(row_order) * EquationFormulator.permutationSign(col_order)
+
+        return sign * N, sign * D
+
+    @staticmethod
+    def fractionFreeDerivatives(system: DomainMatrix, idx: int, symbol: sp.Symbol):
+        """Differentiate the two determinants of Cramer's rule by one symbol.
+
+        By Jacobi's formula d det(A) = sum_ij dA_ij * C_ij, and the sum over
+        one column j is the determinant of A with column j replaced by the
+        derivative of that column. Only the columns whose entries contain the
+        symbol contribute. The system [A_j | z] with column j replaced gives
+        both parts of column j in one elimination: its determinant belongs to
+        dD, its numerator for idx to dN. For j == idx the rhs is replaced by
+        dz instead.
+
+        Args:
+            system (DomainMatrix): augmented system [A | z] over a polynomial ring
+            idx (int): index of the unknown to solve for
+            symbol (sp.Symbol): generator of the ring to differentiate by
+
+        Returns:
+            dN(DomainElement): derivative of the numerator determinant
+            dD(DomainElement): derivative of the system determinant
+
+        Raises:
+            ValueError: the symbol is no generator of the ring
+
+        """
+        n = system.shape[0]
+        domain = system.domain
+        if not domain.is_PolynomialRing or symbol not in domain.symbols:
+            raise ValueError(f"{symbol} is no symbol of the equation system")
+        gen = domain.ring.gens[domain.symbols.index(symbol)]
+
+        dod = system.to_dod()
+        columns = {}
+        for row, cols in dod.items():
+            for col, value in cols.items():
+                derivative = value.diff(gen)
+                if derivative:
+                    columns.setdefault(col, {})[row] = derivative
+
+        dN, dD = domain.zero, domain.zero
+        if n in columns and idx not in columns:
+            columns[idx] = {}
+
+        for col in sorted(c for c in columns if c != n):
+            replaced = {row: dict(cols) for row, cols in dod.items()}
+            for cols in replaced.values():
+                cols.pop(col, None)
+                if col == idx:
+                    cols.pop(n, None)
+            for row, value in columns[col].items():
+                replaced.setdefault(row, {})[col] = value
+            if col == idx:
+                for row, value in columns.get(n, {}).items():
+                    replaced.setdefault(row, {})[n] = value
+
+            replaced = {row: cols for row, cols in replaced.items() if cols}
+
+            N_col, D_col = EquationFormulator.fractionFreeDeterminants(DomainMatrix(replaced, system.shape, domain), idx)
+            dN += N_col
+            dD += D_col
+
+        return dN, dD
+
+    @staticmethod
+    def permutationSign(order: list):
+        """Return the sign of a permutation given as list.
+
+        Args:
+            order (list): permutation of range(len(order))
+
+        Returns:
+            int: +1 for even, -1 for odd permutations
+
+        """
+        sign = 1
+        seen = [False] * len(order)
+        for start in range(len(order)):
+            length = 0
+            pos = start
+            while not seen[pos]:
+                seen[pos] = True
+                pos = order[pos]
+                length += 1
+            if length % 2 == 0 and length > 0:
+                sign = -sign
 
+        return sign
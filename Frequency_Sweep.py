@@ -0,0 +1,745 @@
+"""Defines solvers for frequency sweeps of the MNA pencil A(s) = G + s*C.
+"""
+import numpy as np
+import scipy.linalg as scipy
+import scipy.sparse as sparse
+import scipy.sparse.linalg as sparse_linalg
+from scipy.optimize import linear_sum_assignment
+import warnings
+import logging
+logger = logging.getLogger(__name__)
+
+
+class SweepResult:
+    """Solutions of a frequency sweep for several unknowns.
+
+    The values are stored as one (F, k) array, the columns can be accessed
+    by the names of the unknowns.
+
+    """
+
+    def __init__(self, frequencies, names, values, singular):
+        """Initialize the result.
+
+        Args:
+            frequencies (array): frequencies in Hz
+            names (list): names of the unknowns, one per column
+            values (array): complex solutions with shape (F, len(names))
+            singular (array): boolean mask of the frequencies with a singular system
+
+        """
+        self.frequencies = np.atleast_1d(np.asarray(frequencies, dtype=float))
+        self.names = list(names)
+        self.values = values
+        self.singular = singular
+
+        self.index = {name: idx for idx, name in enumerate(self.names)}
+
+    def __getitem__(self, name):
+        """Return the solution of one unknown over all frequencies."""
+        if name not in self.index:
+            raise KeyError(f"Unknown variable {name} not in the result")
+        return self.values[:, self.index[name]]
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def select(self, names):
+        """Return a result restricted to some of the unknowns.
+
+        Args:
+            names (list): names of the unknowns to keep
+
+        Returns:
+            SweepResult: result with one column per name
+
+        """
+        return SweepResult(
+            self.frequencies,
+            names,
+            self.values[:, [self.index[name] for name in names]],
+            self.singular
+        )
+
+
+class SweepSolver:
+    """Base class of the frequency sweep solvers.
+
+    A solver gets the numeric matrices G and C once and then solves
+    (G + j*2*pi*f*C) x = z for a list of frequencies. Frequencies at which the
+    system is singular are marked in a mask and their solution is NaN instead
+    of raising an exception.
+
+    """
+
+    def __init__(self, G, C):
+        """Initialize the solver.
+
+        Args:
+            G (array): frequency independent part of the system matrix (dense or scipy sparse)
+            C (array): part of the system matrix which gets multiplied with s (dense or scipy sparse)
+
+        """
+        self.G = G.toarray() if sparse.issparse(G) else np.asarray(G)
+        self.C = C.toarray() if sparse.issparse(C) else np.asarray(C)
+        self.n = self.G.shape[0]
+
+    @staticmethod
+    def to_s(frequencies):
+        """Convert frequencies in Hz to the complex frequency s = j*2*pi*f."""
+        return 1j * 2 * np.pi * np.atleast_1d(np.asarray(frequencies, dtype=float))
+
+    def matrix(self, s):
+        """Return the system matrix G + s*C for one complex frequency."""
+        return self.G + s * self.C
+
+    def is_structurally_singular(self):
+        """Check for empty rows or columns, which make the system singular at every frequency."""
+        pattern = (self.G != 0) | (self.C != 0)
+        return not (pattern.any(axis=0).all() and pattern.any(axis=1).all())
+
+    def solve(self, frequencies, z):
+        """Solve the system for all frequencies.
+
+        Args:
+            frequencies (list): frequencies in Hz
+            z (array): excitation, either a vector (n,) or one column per excitation (n, m)
+
+        Returns:
+            X(array): solutions with shape (F, n) or (F, n, m)
+            singular(array): boolean mask of the frequencies with a singular system
+
+        """
+        raise NotImplementedError
+
+    def solve_adjoint(self, frequencies, z, w):
+        """Solve the system and its transposed (adjoint) system for all frequencies.
+
+        Every frequency is factorized once, the LU factors are used for
+        A x = z and for the transposed solve A^T y = w.
+
+        Args:
+            frequencies (list): frequencies in Hz
+            z (array): excitation vector (n,)
+            w (array): excitation vector of the adjoint system (n,)
+
+        Returns:
+            X(array): solutions with shape (F, n)
+            Y(array): adjoint solutions with shape (F, n)
+            singular(array): boolean mask of the frequencies with a singular system
+
+        """
+        z = np.asarray(z, dtype=complex)
+        w = np.asarray(w, dtype=complex)
+        s_values = self.to_s(frequencies)
+
+        X = np.full((len(s_values), self.n), np.nan, dtype=complex)
+        Y = np.full((len(s_values), self.n), np.nan, dtype=complex)
+        singular = np.zeros(len(s_values), dtype=bool)
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", scipy.LinAlgWarning)
+
+            for k, s in enumerate(s_values):
+                try:
+                    lu = scipy.lu_factor(self.matrix(s))
+                except (ValueError, scipy.LinAlgError, scipy.LinAlgWarning):
+                    singular[k] = True
+                    continue
+
+                X[k] = scipy.lu_solve(lu, z)
+                Y[k] = scipy.lu_solve(lu, w, trans=1)
+
+        return X, Y, singular
+
+
+class LoopSweep(SweepSolver):
+    """Solves every frequency point on its own with scipy.linalg.solve."""
+
+    def solve(self, frequencies, z):
+        z = np.asarray(z, dtype=complex)
+        s_values = self.to_s(frequencies)
+
+        X = np.full((len(s_values),) + z.shape, np.nan, dtype=complex)
+        singular = np.zeros(len(s_values), dtype=bool)
+
+        for k, s in enumerate(s_values):
+            try:
+                X[k] = scipy.solve(self.matrix(s), z)
+
+            except (scipy.LinAlgError, scipy.LinAlgWarning):
+                singular[k] = True
+
+        return X, singular
+
+
+class BatchedSweep(SweepSolver):
+    """Solves all frequency points with stacked calls of np.linalg.solve.
+
+    The matrices G + j*w*C are built as one (F, n, n) array per chunk and
+    solved with a single vectorized LAPACK call. The chunk size is chosen so a
+    chunk of matrices stays below max_bytes.
+
+    """
+
+    def __init__(self, G, C, max_bytes:int=64 * 2**20):
+        """Initialize the solver.
+
+        Args:
+            G (array): frequency independent part of the system matrix
+            C (array): part of the system matrix which gets multiplied with s
+            max_bytes (int): memory limit of one chunk of stacked matrices
+
+        """
+        super().__init__(G, C)
+        self.chunk_size = max(1, int(max_bytes // (16 * max(self.n, 1) ** 2)))
+
+    def solve(self, frequencies, z):
+        z = np.asarray(z, dtype=complex)
+        rhs = z.reshape(self.n, -1)
+        s_values = self.to_s(frequencies)
+
+        X = np.full((len(s_values),) + z.shape, np.nan, dtype=complex)
+        singular = np.zeros(len(s_values), dtype=bool)
+
+        if self.is_structurally_singular():
+            logger.warning("System matrix has empty rows or columns, it is singular at every frequency")
+            singular[:] = True
+            return X, singular
+
+        for start in range(0, len(s_values), self.chunk_size):
+            stop = min(start + self.chunk_size, len(s_values))
+            A = self.G[None, :, :] + s_values[start:stop, None, None] * self.C[None, :, :]
+            self._solve_stack(A, rhs, X[start:stop], singular[start:stop])
+
+        # near singular matrices do not raise, but produce inf/nan entries
+        finite = np.isfinite(X.reshape(len(s_values), -1)).all(axis=1)
+        singular |= ~finite
+        X[singular] = np.nan
+
+        return X, singular
+
+    def _solve_stack(self, A, rhs, X, singular):
+        """Solve a stack of systems, bisecting it to isolate singular matrices.
+
+        Args:
+            A (array): stacked system matrices (k, n, n)
+            rhs (array): excitation as matrix (n, m)
+            X (array): output view for the solutions
+            singular (array): output view for the singular mask
+
+        """
+        try:
+            X[...] = np.linalg.solve(A, np.broadcast_to(rhs, (A.shape[0],) + rhs.shape)).reshape(X.shape)
+
+        except np.linalg.LinAlgError:
+            if A.shape[0] == 1:
+                singular[0] = True
+                return
+
+            half = A.shape[0] // 2
+            self._solve_stack(A[:half], rhs, X[:half], singular[:half])
+            self._solve_stack(A[half:], rhs, X[half:], singular[half:])
+
+
+class SparseLUSweep(SweepSolver):
+    """Solves every frequency point with a sparse LU factorization (SuperLU).
+
+    The union sparsity pattern of G and C and a fill reducing column ordering
+    (COLAMD) are computed once. For every frequency only the values of the
+    pre-ordered CSC matrix are updated with G + s*C and factorized with the
+    natural column ordering, so the pattern is never analyzed again.
+
+    """
+
+    def __init__(self, G, C):
+        """Initialize the solver and compute the ordering of the pattern.
+
+        Args:
+            G (array): frequency independent part of the system matrix (dense or scipy sparse)
+            C (array): part of the system matrix which gets multiplied with s (dense or scipy sparse)
+
+        """
+        G = sparse.csc_matrix(G)
+        C = sparse.csc_matrix(C)
+        self.n = G.shape[0]
+
+        # union pattern of G and C, the data arrays of both are aligned to it
+        pattern = (abs(G) + abs(C)).tocsc()
+        pattern.sort_indices()
+        rows = pattern.indices
+        cols = np.repeat(np.arange(self.n), np.diff(pattern.indptr))
+
+        self.column_order = self._column_ordering(pattern)
+        inverse_order = np.empty(self.n, dtype=int)
+        inverse_order[self.column_order] = np.arange(self.n)
+
+        # pattern with permuted columns, sorted like a CSC matrix
+        new_cols = inverse_order[cols]
+        entry_order = np.lexsort((rows, new_cols))
+
+        self.indices = rows[entry_order].astype(np.int32)
+        self.indptr = np.concatenate(([0], np.cumsum(np.bincount(new_cols, minlength=self.n)))).astype(np.int32)
+        self.g_data = np.asarray(G[rows[entry_order], cols[entry_order]]).ravel()
+        self.c_data = np.asarray(C[rows[entry_order], cols[entry_order]]).ravel()
+
+    def _column_ordering(self, pattern):
+        """Compute a fill reducing column ordering from the sparsity pattern.
+
+        SuperLU computes the COLAMD ordering from the structure only, so it is
+        taken from the factorization of a matrix with the same pattern and
+        random values.
+
+        Args:
+            pattern (csc_matrix): union pattern of G and C
+
+        Returns:
+            array: new position -> original column index
+
+        """
+        probe = pattern.copy()
+        probe.data = np.random.default_rng(0).uniform(1.0, 2.0, size=probe.nnz)
+
+        try:
+            lu = sparse_linalg.splu(probe, permc_spec="COLAMD")
+        except RuntimeError:
+            logger.warning("System matrix is structurally singular, using natural ordering")
+            return np.arange(self.n)
+
+        return np.argsort(lu.perm_c)
+
+    def factorize(self, s):
+        """Factorize G + s*C with the precomputed ordering.
+
+        Args:
+            s (complex): complex frequency
+
+        Returns:
+            SuperLU: factorization of the column permuted matrix
+
+        """
+        A = sparse.csc_matrix(
+            (self.g_data + s * self.c_data, self.indices, self.indptr),
+            shape=(self.n, self.n)
+        )
+        return sparse_linalg.splu(A, permc_spec="NATURAL")
+
+    def solve(self, frequencies, z):
+        z = np.asarray(z, dtype=complex)
+        s_values = self.to_s(frequencies)
+
+        X = np.full((len(s_values),) + z.shape, np.nan, dtype=complex)
+        singular = np.zeros(len(s_values), dtype=bool)
+
+        for k, s in enumerate(s_values):
+            try:
+                y = self.factorize(s).solve(z)
+
+            except RuntimeError:
+                singular[k] = True
+                continue
+
+            X[k][self.column_order] = y
+
+        return X, singular
+
+    def solve_adjoint(self, frequencies, z, w):
+        z = np.asarray(z, dtype=complex)
+        w = np.asarray(w, dtype=complex)
+        s_values = self.to_s(frequencies)
+
+        X = np.full((len(s_values), self.n), np.nan, dtype=complex)
+        Y = np.full((len(s_values), self.n), np.nan, dtype=complex)
+        singular = np.zeros(len(s_values), dtype=bool)
+
+        for k, s in enumerate(s_values):
+            try:
+                lu = self.factorize(s)
+
+            except RuntimeError:
+                singular[k] = True
+                continue
+
+            # the factorized matrix is A*P, so (A*P)^T y = P^T w gives A^T y = w
+            X[k][self.column_order] = lu.solve(z)
+            Y[k] = lu.solve(w[self.column_order], trans="T")
+
+        return X, Y, singular
+
+
+class QZSweep(SweepSolver):
+    """Solves all frequency points after one generalized Schur decomposition.
+
+    The pencil is reduced once with the complex QZ decomposition
+    G = Q*AA*Z^H and C = Q*BB*Z^H, where AA and BB are upper triangular. Every
+    frequency then only needs the back substitution of (AA + s*BB) y = Q^H z
+    and x = Z*y, which is O(n^2) instead of O(n^3). The back substitution runs
+    vectorized over all frequencies of a chunk.
+
+    """
+
+    def __init__(self, G, C, max_bytes:int=64 * 2**20):
+        """Initialize the solver and reduce the pencil.
+
+        Args:
+            G (array): frequency independent part of the system matrix
+            C (array): part of the system matrix which gets multiplied with s
+            max_bytes (int): memory limit of the solutions of one chunk
+
+        """
+        super().__init__(G, C)
+        self.AA, self.BB, self.Q, self.Z = scipy.qz(self.G, self.C, output="complex")
+        self.max_bytes = max_bytes
+
+        self.norm_AA = np.linalg.norm(self.AA, 1)
+        self.norm_BB = np.linalg.norm(self.BB, 1)
+
+    def solve(self, frequencies, z):
+        z = np.asarray(z, dtype=complex)
+        rhs = self.Q.conj().T @ z.reshape(self.n, -1)
+        s_values = self.to_s(frequencies)
+
+        X = np.full((len(s_values),) + z.shape, np.nan, dtype=complex)
+        singular = np.zeros(len(s_values), dtype=bool)
+
+        chunk_size = max(1, int(self.max_bytes // (16 * max(self.n, 1) * rhs.shape[1])))
+        for start in range(0, len(s_values), chunk_size):
+            stop = min(start + chunk_size, len(s_values))
+            Y, singular[start:stop] = self._back_substitution(s_values[start:stop], rhs)
+            X[start:stop] = (self.Z @ Y).reshape((stop - start,) + z.shape)
+
+        X[singular] = np.nan
+
+        return X, singular
+
+    def _back_substitution(self, s_values, rhs):
+        """Solve the triangular systems (AA + s*BB) y = rhs for all s at once.
+
+        Args:
+            s_values (array): complex frequencies
+            rhs (array): transformed excitation Q^H z with shape (n, m)
+
+        Returns:
+            Y(array): solutions with shape (F, n, m)
+            singular(array): mask of the frequencies with a zero on the diagonal
+
+        """
+        Y = np.zeros((len(s_values), self.n, rhs.shape[1]), dtype=complex)
+
+        diagonal = np.diag(self.AA)[None, :] + s_values[:, None] * np.diag(self.BB)[None, :]
+        tolerance = np.finfo(float).eps * self.n * (self.norm_AA + np.abs(s_values) * self.norm_BB)
+        singular = (np.abs(diagonal) <= tolerance[:, None]).any(axis=1)
+        diagonal[singular] = 1.0
+
+        for i in range(self.n - 1, -1, -1):
+            row = self.AA[i, i + 1:][None, :] + s_values[:, None] * self.BB[i, i + 1:][None, :]
+            Y[:, i, :] = (rhs[i][None, :] - np.einsum("fk,fkm->fm", row, Y[:, i + 1:, :])) / diagonal[:, i, None]
+
+        return Y, singular
+
+
+class IncrementalInverse:
+    """Inverse of G + s*C at fixed frequencies, kept up to date over single entry changes.
+
+    Changing one entry (i, j) by -(g + s*c) is a rank-1 update of the matrix.
+    With the Sherman-Morrison formula the solution of a trial change costs
+    O(n) per frequency and an accepted change updates the inverse in O(n^2),
+    a series of accepted changes is the Woodbury update of the inverse. The
+    updates accumulate rounding errors, so the residual of the solution is
+    checked after every accepted change and the inverse is computed anew if
+    it drifts.
+
+    """
+
+    def __init__(self, G, C, frequencies, z, drift_tol:float=1e-9, singular_tol:float=1e-8):
+        """Initialize the inverse.
+
+        Args:
+            G (array): frequency independent part of the system matrix
+            C (array): part of the system matrix which gets multiplied with s
+            frequencies (list): frequencies in Hz
+            z (array): excitation vector (n,)
+            drift_tol (float): relative residual ||A x - z|| / ||z|| which triggers a new inversion
+            singular_tol (float): changes with |1 - t * inv(A)[j, i]| below this make the matrix singular
+
+        Raises:
+            np.linalg.LinAlgError: the system is singular at one of the frequencies
+
+        """
+        self.G = np.array(G, dtype=complex)
+        self.C = np.array(C, dtype=complex)
+        self.s = SweepSolver.to_s(frequencies)
+        self.z = np.asarray(z, dtype=complex).reshape(self.G.shape[0])
+        self.drift_tol = drift_tol
+        self.singular_tol = singular_tol
+        self.updates = 0
+        self.refactorizations = 0
+
+        self.refactor()
+
+    def refactor(self):
+        """Invert the current matrices at all frequencies."""
+        A = self.G[None, :, :] + self.s[:, None, None] * self.C[None, :, :]
+        self.inverse = np.linalg.inv(A)
+        self.x = self.inverse @ self.z
+        self.refactorizations += 1
+
+    def residual(self):
+        """Return the relative residual ||A x - z|| / ||z|| of the current solution at every frequency."""
+        Ax = self.x @ self.G.T + self.s[:, None] * (self.x @ self.C.T)
+        return np.linalg.norm(Ax - self.z, axis=1) / np.linalg.norm(self.z)
+
+    def _update_factor(self, i, j, g, c):
+        """Return the value t of the change and 1 - t * inv(A)[j, i] at every frequency."""
+        t = g + self.s * c
+        return t, 1 - t * self.inverse[:, j, i]
+
+    def trial(self, i, j, g, c):
+        """Solve the system with g + s*c subtracted from the entry (i, j), without changing it.
+
+        Args:
+            i (int): row of the entry
+            j (int): column of the entry
+            g (complex): frequency independent part of the change
+            c (complex): part of the change which gets multiplied with s
+
+        Returns:
+            X(array): solutions with shape (F, n), NaN at singular points
+            singular(array): boolean mask of the frequencies at which the changed matrix is singular
+
+        """
+        t, denominator = self._update_factor(i, j, g, c)
+        singular = np.abs(denominator) < self.singular_tol
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            X = self.x + (t * self.x[:, j] / denominator)[:, None] * self.inverse[:, :, i]
+        X[singular] = np.nan
+
+        return X, singular
+
+    def update(self, i, j, g, c):
+        """Subtract g + s*c from the entry (i, j) and update the inverse.
+
+        Args:
+            i (int): row of the entry
+            j (int): column of the entry
+            g (complex): frequency independent part of the change
+            c (complex): part of the change which gets multiplied with s
+
+        """
+        self.G[i, j] -= g
+        self.C[i, j] -= c
+        t, denominator = self._update_factor(i, j, g, c)
+
+        if (np.abs(denominator) < self.singular_tol).any():
+            logger.debug(f"Change of ({i}, {j}) is nearly singular, inverting anew")
+            self.refactor()
+            return
+
+        column = self.inverse[:, :, i] * (t / denominator)[:, None]
+        self.x += column * self.x[:, j, None]
+        self.inverse += column[:, :, None] * self.inverse[:, j, None, :]
+        self.updates += 1
+
+        drift = self.residual().max()
+        if not drift <= self.drift_tol:
+            logger.debug(f"Residual {drift:.3g} after {self.updates} updates, inverting anew")
+            self.refactor()
+
+
+def interpolate_coefficients(G, C, z, idx:int, tol:float=1e-3, resolve_tol:float=1e-8, step:float=10.0, max_runs:int=20, patience:int=8):
+    """Recover the polynomial coefficients of det(A(s)) and of a Cramer numerator.
+
+    det(G + s*C) and det(A) * x[idx], the determinant of A with column idx
+    replaced by z, are evaluated on M points of the circle |s| = omega with
+    one batched LU. An FFT of the samples gives the coefficients. The degree
+    is bounded by rank(C) and by the matching structure, M is at least twice
+    as large, so the coefficients above the degree are zero and their
+    computed values show the rounding error of the circle. The rows and
+    columns are equilibrated (impedance scaling), so the sampled
+    determinants are well conditioned.
+
+    One circle only resolves the coefficients d_j * omega^j which are large
+    compared to this noise floor. Starting at the geometric mean ratio of
+    the entries of G and C, omega is therefore stepped up and down
+    (frequency scaling) until the higher and the lower powers are resolved
+    too. Every coefficient is taken from the circle with the smallest
+    estimated error.
+
+    Args:
+        G (array): frequency independent part of the system matrix
+        C (array): part of the system matrix which gets multiplied with s
+        z (array): excitation vector
+        idx (int): index of the unknown
+        tol (float): coefficients with a larger relative error estimate are zero
+        resolve_tol (float): coefficients with a smaller relative error estimate are accurate
+        step (float): factor between the radii of two circles
+        max_runs (int): maximum number of circles per direction
+        patience (int): stop a direction after this many circles which resolve nothing new
+
+    Returns:
+        N(array): numerator coefficients of s^0, s^1, ... (ascending powers)
+        D(array): determinant coefficients of s^0, s^1, ...
+
+    Raises:
+        ValueError: the matrix is (structurally) singular on the first circle
+
+    """
+    G = np.asarray(G.toarray() if sparse.issparse(G) else G, dtype=complex)
+    C = np.asarray(C.toarray() if sparse.issparse(C) else C, dtype=complex)
+    z = np.asarray(z, dtype=complex).reshape(-1)
+    is_real = not (G.imag.any() or C.imag.any() or z.imag.any())
+
+    # degree bound: rank(C) and the most C entries on a transversal of the
+    # matrix (of the matrix with column idx replaced by z for the numerator)
+    n = len(z)
+    degree = np.linalg.matrix_rank(C) if C.any() else 0
+    structural = 0
+    for column in (None, z):
+        weights = np.where(C != 0, 1.0, np.where(G != 0, 0.0, -n - 1.0))
+        if column is not None:
+            weights[:, idx] = np.where(column != 0, 0.0, -n - 1.0)
+        rows, cols = linear_sum_assignment(weights, maximize=True)
+        structural = max(structural, weights[rows, cols].sum())
+    if structural < 0:
+        raise ValueError("System matrix is structurally singular")
+    degree = min(degree, int(structural))
+
+    M = 4
+    while M < 2 * (degree + 1):
+        M *= 2
+    powers = np.arange(degree + 1)
+    sigma = np.exp(2j * np.pi * np.arange(M) / M)
+    eps = np.finfo(float).eps
+
+    def sample(omega):
+        # impedance scaling, Ruiz equilibration of the magnitudes
+        B = np.abs(G) + omega * np.abs(C)
+        d_row, d_col = np.ones(n), np.ones(n)
+        for _ in range(10):
+            S = d_row[:, None] * B * d_col[None, :]
+            row_max, col_max = S.max(axis=1), S.max(axis=0)
+            d_row /= np.sqrt(np.where(row_max > 0, row_max, 1))
+            d_col /= np.sqrt(np.where(col_max > 0, col_max, 1))
+
+        A = d_row[None, :, None] * (G[None, :, :] + (omega * sigma)[:, None, None] * C[None, :, :]) * d_col[None, None, :]
+        # one batched LU for the determinants and the solutions
+        lu, piv = scipy.lu_factor(A, check_finite=False)
+        diagonal = np.diagonal(lu, axis1=1, axis2=2)
+        if (diagonal == 0).any():
+            return None
+        swaps = np.count_nonzero(piv != np.arange(n)[None, :], axis=1)
+        sign = np.prod(diagonal / np.abs(diagonal), axis=1) * (-1.0) ** swaps
+        logdet = np.sum(np.log(np.abs(diagonal)), axis=1)
+        rhs = np.broadcast_to(d_row * z, (M, n))[..., None]
+        x_idx = scipy.lu_solve((lu, piv), rhs, check_finite=False)[:, idx, 0] * d_col[idx]
+
+        shift = logdet.max()
+        det_values = sign * np.exp(logdet - shift)
+        # exponent of the factor per power: det scaling, sample shift and omega^-j
+        log_factor = shift - np.sum(np.log(d_row)) - np.sum(np.log(d_col)) - powers * np.log(omega)
+
+        run = []
+        for values in (det_values * x_idx, det_values):
+            scaled = np.fft.fft(values) / M
+            noise = max(10 * np.abs(scaled[degree + 1:]).max(), eps * np.abs(values).max())
+            with np.errstate(divide="ignore"):
+                error = noise / np.abs(scaled[:degree + 1])
+            run.append((error, scaled[:degree + 1] * np.exp(log_factor)))
+        return run
+
+    def extreme_resolved(direction):
+        # highest (lowest) power of numerator and denominator resolved on any circle
+        extremes = []
+        for part in range(2):
+            hits = np.concatenate([np.flatnonzero(run[part][0] <= resolve_tol) for run in runs])
+            extremes.append((hits * direction).max() if len(hits) else degree * (direction == 1))
+        return extremes
+
+    # frequency scaling, the G and C parts get the same magnitude at |s| = omega
+    g_abs, c_abs = np.abs(G[G != 0]), np.abs(C[C != 0])
+    omega = np.exp(np.mean(np.log(g_abs)) - np.mean(np.log(c_abs))) if len(g_abs) and len(c_abs) else 1.0
+
+    runs = [sample(omega)]
+    if runs[0] is None:
+        raise ValueError("System matrix is singular on the interpolation circle")
+    for direction in (1, -1):
+        limit = degree * (direction == 1)
+        radius = omega
+        stalled = 0
+        for _ in range(max_runs):
+            before = extreme_resolved(direction)
+            if all(extreme == limit * direction for extreme in before) or stalled >= patience:
+                break
+            # larger steps while nothing new gets resolved, a coefficient stays
+            # resolved over several decades of the radius
+            radius *= step ** (direction * min(1 + stalled, 3))
+            run = sample(radius)
+            if run is None:
+                # G or C alone is singular, the radius is too small or too large
+                break
+            runs.append(run)
+            # nothing new resolved on several circles, the remaining coefficients are zero
+            stalled = stalled + 1 if extreme_resolved(direction) == before else 0
+
+    logger.debug(f"Interpolated {degree + 1} coefficients on {len(runs)} circles of {M} points")
+
+    result = []
+    for part in range(2):
+        errors = np.array([run[part][0] for run in runs])
+        best = np.argmin(errors, axis=0)
+        coefficients = np.array([runs[b][part][1][j] for j, b in enumerate(best)])
+        coefficients[errors[best, powers] > tol] = 0
+        if is_real:
+            coefficients = coefficients.real
+        result.append(np.trim_zeros(coefficients, "b") if coefficients.any() else coefficients[:1])
+
+    return result[0], result[1]
+
+
+SWEEP_STRATEGIES = {
+    "loop": LoopSweep,
+    "batched": BatchedSweep,
+    "sparse": SparseLUSweep,
+    "qz": QZSweep,
+}
+
+# the sparse LU pays off for large systems with few entries
+SPARSE_MIN_SIZE = 60
+SPARSE_MAX_DENSITY = 0.1
+
+# the QZ reduction pays off if there are many more frequencies than unknowns,
+# but its O(n^3) setup is too expensive for very large systems
+QZ_MIN_POINTS_PER_UNKNOWN = 10
+QZ_MAX_SIZE = 200
+
+
+def get_sweep_solver(strategy:str, G, C, n_freq:int=0):
+    """Create the sweep solver for a strategy.
+
+    Args:
+        strategy (str): name of the strategy or "auto"
+        G (array): frequency independent part of the system matrix
+        C (array): part of the system matrix which gets multiplied with s
+        n_freq (int): number of frequency points, used to pick the "auto" strategy
+
+    Returns:
+        SweepSolver: solver for the matrices
+
+    """
+    if strategy == "auto":
+        n = G.shape[0]
+        nnz = (abs(sparse.csc_matrix(G)) + abs(sparse.csc_matrix(C))).nnz
+        if n_freq >= QZ_MIN_POINTS_PER_UNKNOWN * n and n <= QZ_MAX_SIZE:
+            strategy = "qz"
+        elif n >= SPARSE_MIN_SIZE and nnz <= SPARSE_MAX_DENSITY * n**2:
+            strategy = "sparse"
+        else:
+            strategy = "batched"
+
+    if strategy not in SWEEP_STRATEGIES:
+        raise ValueError(f"Unknown sweep strategy: {strategy}")
+
+    logger.debug(f"Using sweep strategy {strategy} for {n_freq} points")
+
+    return SWEEP_STRATEGIES[strategy](G, C)
@@ -0,0 +1,342 @@
+"""Defines the hierarchical analysis, which reduces every subcircuit to its ports.
+"""
+import copy
+import sympy as sp
+import numpy as np
+import netlist.Circuit as Circuit
+import logging as logger
+import Pspice_util as pu
+from netlist.Circuit import Circuit as CircuitModel
+from Modified_Node_Analysis import ModifiedNodalAnalysis
+from Frequency_Sweep import SweepResult
+from Compiled_Evaluator import evaluate_transfer_function
+import warnings
+
+
+class HierarchicalAnalysis(ModifiedNodalAnalysis):
+    """Modified nodal analysis which keeps the hierarchy of the circuit.
+
+    Instead of flattening, every subcircuit instance (X) and every transistor
+    (Q, M) is reduced to the admittance matrix seen at its ports. The internal
+    nodes and branch currents are eliminated with the Schur complement
+
+        Y = A_pp - A_pi * A_ii^-1 * A_ip
+
+    in the local symbols of the definition. The reduced matrix is cached per
+    subcircuit definition (or model and small signal model), every instance
+    only renames the symbols the same way Circuit.flatten() does and stamps
+    the matrix at its port nodes. Only the top level port system gets solved.
+
+    The values are not cached, every instance (and every transistor inside
+    of it) has its own operating point. They are looked up by the flattened
+    element names in a flattened copy of the circuit, which gets the small
+    signal parameters from the .out file.
+
+    Subcircuits which contain subcircuits are reduced recursively with the
+    same cache. If a reduced matrix is not linear in s, the system is no
+    pencil G + s*C any more and the numeric sweep evaluates A(s) per frequency.
+
+    """
+    ct:Circuit
+    value_dict:dict
+
+    def __init__(self, circuit:Circuit, out_file_path:str="", subcircuits:dict|None=None, models:dict|None=None, port_cache:dict|None=None, ordering:str="none", flat_values:tuple|None=None, suffix:str=""):
+        """Innitialize the class.
+
+        Args:
+            circuit (Circuit): The (not flattened) Circuit to analyze.
+            out_file_path (str): .out file with the small signal parameters of the transistors
+            subcircuits (dict): subcircuit definitions of the parent circuit
+            models (dict): models of the parent circuit
+            port_cache (dict): reduced port matrices shared with the parent circuit
+            ordering (str): fill reducing order of the top level unknowns, see Node_Ordering.ORDERINGS
+            flat_values (tuple): flattened values of the parent circuit, see flattenValues()
+            suffix (str): appended to the element names of this circuit to get their flattened names
+
+        """
+        self.subcircuits = (subcircuits or {}) | circuit.subcircuits
+        # flatten() copies the models of the subcircuits into the root circuit as well
+        self.models = dict(models or {})
+        pending = [circuit]
+        while pending:
+            definition = pending.pop()
+            self.models.update(definition.models)
+            pending.extend(definition.subcircuits.values())
+        # definition key -> (reduced port matrix, local value dict of the first instance)
+        self.port_cache = {} if port_cache is None else port_cache
+        self.out_file_path = out_file_path
+        self.suffix = suffix
+        self.instances = []
+        self.pencil = True
+
+        top = CircuitModel(
+            name=circuit.name,
+            netlist_file_path=circuit.netlist_file_path,
+            bipolar_model=circuit.bipolar_model,
+            mosfet_model=circuit.mosfet_model,
+            separator=circuit.separator,
+        )
+        # a subcircuit definition has no ground of its own, its ports are measured against "0"
+        top.add_node("0")
+        for node in circuit.nodes:
+            top.add_node(node)
+
+        for element in circuit.elements:
+            if element.type in ("X", "Q", "M"):
+                self.instances.append(element)
+                for node in element.connections:
+                    top.add_node(node)
+            else:
+                top.add_element(element)
+
+        if flat_values is None:
+            flat_values = self.flattenValues(circuit, out_file_path) if self.instances else ({}, {})
+        # flattened element name -> value, flattened transistor name -> small signal parameters
+        self.flat_values, self.transistor_params = flat_values
+
+        super().__init__(top, ordering=ordering)
+
+    @staticmethod
+    def flattenValues(circuit:Circuit, out_file_path:str=""):
+        """Flatten a copy of the circuit and collect the values of its elements.
+
+        Args:
+            circuit (Circuit): the (not flattened) circuit
+            out_file_path (str): .out file with the small signal parameters of the transistors
+
+        Returns:
+            values(dict): flattened element symbol -> numeric value
+            transistor_params(dict): flattened transistor name -> parameters from the .out file
+
+        """
+        flat = copy.deepcopy(circuit)
+        flat.flatten()
+
+        transistor_params = {}
+        if out_file_path != "":
+            from parser.NetlistParser import get_element_parameters_from_outfile
+            transistors = [element for element in flat.elements if element.type in ("Q", "M")]
+            get_element_parameters_from_outfile(out_file_path, transistors)
+            transistor_params = {element.name: dict(element.params) for element in transistors}
+            flat.flatten(True, out_file_path)
+
+        values = {}
+        for element in flat.elements:
+            if element.type in ("V", "I"):
+                # the analysis keeps the AC values of the sources
+                continue
+            param = "value" if element.type in ("E", "F", "G", "H") else "value_dc"
+            try:
+                values[sp.symbols(element.get_symbol())] = pu.pspice_to_float(element.params[param])
+            except (KeyError, ValueError):
+                # transistors without small signal parameters
+                continue
+
+        return values, transistor_params
+
+    def get_definition(self, element):
+        """Return the cache key and the circuit which defines an instance.
+
+        Args:
+            element (Element): subcircuit instance or transistor
+
+        Returns:
+            key(tuple): key of the reduced port matrix in the cache
+            definition(Circuit): circuit of the instance, with the values of this instance
+
+        """
+        if element.type == "X":
+            name = element.params["ref_cir"]
+            if name not in self.subcircuits:
+                raise ValueError(f"Subcircuit {name} of {element.name} is not defined")
+            return ("X", name), self.subcircuits[name]
+
+        model_name = element.params["ref_model"]
+        model = self.models.get(model_name)
+        if model is None:
+            raise ValueError(f"Model {model_name} of {element.name} is not defined")
+
+        # the small signal parameters of this transistor, the definitions of the subcircuits have none
+        params = self.transistor_params.get(f"{element.name}{self.suffix}", element.params)
+        bipolar_model = element.params.get("bipolar_model", self.ct.bipolar_model)
+        mosfet_model = element.params.get("mosfet_model", self.ct.mosfet_model)
+        definition = model.get_generated_subcircuit(params, bipolar_model, mosfet_model)
+        if definition is None:
+            raise ValueError(f"No small signal model for {element.name}")
+
+        small_signal_model = bipolar_model if element.type == "Q" else mosfet_model
+        return (element.type, model_name, small_signal_model), definition
+
+    def reducePorts(self, definition:Circuit, element):
+        """Reduce a subcircuit definition to the admittance matrix at its ports.
+
+        Args:
+            definition (Circuit): subcircuit with inner_connecting_nodes as ports
+            element (Element): first instance of the definition, its values end up in the value dict
+
+        Returns:
+            Y(sp.Matrix): port admittance matrix in the local symbols (zero rows for grounded ports)
+            value_dict(dict): numeric values of the local symbols
+
+        Raises:
+            ValueError: the subcircuit contains an independent source with an AC value
+
+        """
+        sub = HierarchicalAnalysis(
+            definition,
+            out_file_path=self.out_file_path,
+            subcircuits=self.subcircuits,
+            models=self.models,
+            port_cache=self.port_cache,
+            ordering=self.ordering,
+            flat_values=(self.flat_values, self.transistor_params),
+            suffix=f"{self.ct.separator}{element.name}{self.suffix}",
+        )
+        sub.buildEquationsSystem()
+        # sources without AC value (supplies) only fix their nodes and get eliminated with the internal unknowns
+        if any(value != 0 for value in sub.z):
+            raise ValueError(f"Independent AC sources in subcircuit {definition.name} are not supported")
+
+        A = sub.A
+        ports = [
+            sub.unknown_names.index(f"V_{node}") if f"V_{node}" in sub.unknown_names else -1
+            for node in definition.inner_connecting_nodes
+        ]
+        port_idx = sorted({idx for idx in ports if idx >= 0})
+        internal = [idx for idx in range(A.rows) if idx not in port_idx]
+
+        reduced = A.extract(port_idx, port_idx)
+        if internal:
+            A_ip = A.extract(internal, port_idx)
+            A_pi = A.extract(port_idx, internal)
+            reduced = (reduced - A_pi * A.extract(internal, internal).LUsolve(A_ip)).applyfunc(sp.cancel)
+
+        Y = sp.zeros(len(ports), len(ports))
+        for i, row in enumerate(ports):
+            for j, col in enumerate(ports):
+                if row >= 0 and col >= 0:
+                    Y[i, j] = reduced[port_idx.index(row), port_idx.index(col)]
+
+        logger.debug(f"Reduced {definition.name} to {len(ports)} ports, eliminated {len(internal)} unknowns")
+
+        return Y, sub.value_dict
+
+    def instance_values(self, definition:Circuit):
+        """Return the values of the elements of a flat subcircuit (a transistor model).
+
+        Args:
+            definition (Circuit): generated small signal circuit of one transistor
+
+        Returns:
+            dict: local symbol -> numeric value
+
+        """
+        values = {}
+        for element in definition.elements:
+            param = "value" if element.type in ("E", "F", "G", "H") else "value_dc"
+            values[sp.symbols(element.get_symbol())] = pu.pspice_to_float(element.params[param])
+        return values
+
+    def buildEquationsSystem(self):
+        """Build the top level equation system and stamp the reduced instances.
+
+        """
+        super().buildEquationsSystem()
+
+        s = sp.symbols("s")
+
+        for element in self.instances:
+            key, definition = self.get_definition(element)
+
+            if key not in self.port_cache:
+                self.port_cache[key] = self.reducePorts(definition, element)
+            Y, values = self.port_cache[key]
+
+            if element.type != "X":
+                # same structure, but every transistor has its own operating point
+                values = self.instance_values(definition)
+
+            rename = {symbol: sp.Symbol(f"{symbol.name}{self.ct.separator}{element.name}") for symbol in values}
+            for symbol, value in values.items():
+                # the cached values belong to the first instance, look up the values of this one
+                flat_name = sp.Symbol(f"{rename[symbol].name}{self.suffix}")
+                self.value_dict[rename[symbol]] = self.flat_values.get(flat_name, value)
+
+            # rows by name, the top level may already be reordered
+            rows = [
+                self.unknown_names.index(f"V_{node}") if self.node_map[node] != 0 else -1
+                for node in element.connections
+            ]
+            for (i, j), value in Y.todok().items():
+                if rows[i] < 0 or rows[j] < 0:
+                    continue
+                value = sp.expand(value.xreplace(rename))
+                if value.is_polynomial(s) and sp.degree(value, s) <= 1:
+                    g_part, c_part = value.subs(s, 0), value.coeff(s, 1)
+                    if g_part != 0:
+                        self.stamp(rows[i], rows[j], g_part)
+                    if c_part != 0:
+                        self.stamp(rows[i], rows[j], c_part, order=1)
+                else:
+                    self.stamp(rows[i], rows[j], sp.factor(value))
+                    self.pencil = False
+
+        # the instances add fill of their own, order again with them
+        self.reorderUnknowns()
+
+        print(f"Stamped {len(self.instances)} instances of {len(self.port_cache)} reduced subcircuits")
+
+    def get_numeric_system(self, sparse_matrices:bool=False):
+        """Return the numeric pencil, see ModifiedNodalAnalysis.get_numeric_system().
+
+        Raises:
+            ValueError: a reduced subcircuit is not linear in s
+
+        """
+        if not self.pencil:
+            raise ValueError("Reduced subcircuits are rational in s, the system is no pencil G + s*C")
+        return super().get_numeric_system(sparse_matrices)
+
+    def solveNumericalAll(self, frequencies:list, outputs:list|None = None, input_modification:list = [], strategy:str = "auto"):
+        """Solve the equation system numerically, see ModifiedNodalAnalysis.solveNumericalAll().
+
+        If the system is no pencil, A(s) is evaluated and solved per frequency.
+
+        """
+        if self.pencil:
+            return super().solveNumericalAll(frequencies, outputs, input_modification, strategy)
+
+        if outputs is None:
+            outputs = self.get_unknowns_as_strings()
+
+        A_all = evaluate_transfer_function(self.toNumerical(self.A, self.value_dict), frequencies)
+        z_num = self.stamps.rhs_to_numpy(self.value_dict)
+
+        if len(input_modification) == len(z_num):
+            z_num = z_num * np.asarray(input_modification)
+
+        else:
+            warnings.warn("Input modification list is empty or has wrong length. Using unmodified input vector.")
+
+        X = np.full((len(frequencies), len(z_num)), np.nan, dtype=complex)
+        singular = np.zeros(len(frequencies), dtype=bool)
+        for k, f in enumerate(frequencies):
+            try:
+                X[k] = np.linalg.solve(A_all[:, :, k], z_num)
+            except np.linalg.LinAlgError:
+                singular[k] = True
+
+        idx_out = [self.unknown_names.index(name) for name in outputs]
+
+        return SweepResult(frequencies, outputs, X[:, idx_out], singular)
+
+    def solveSensitivities(self, frequencies:list, unknown_variable:str, strategy:str = "auto"):
+        """Not available, the stamps of the reduced instances carry no element values.
+
+        Raises:
+            ValueError: always if the circuit has instances
+
+        """
+        if self.instances:
+            raise ValueError("Sensitivities need the flattened circuit, use ModifiedNodalAnalysis")
+        return super().solveSensitivities(frequencies, unknown_variable, strategy)
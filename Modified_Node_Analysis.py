@@ -4,31 +4,54 @@ import logging as logger
 import Pspice_util as pu
 import numpy as np
 import scipy.linalg as scipy
+import scipy.sparse as sparse
 from Equation_Formulator import EquationFormulator
+from Stamp_Assembler import StampAssembler
+from Determinant_Decision_Diagram import DeterminantDecisionDiagram
+from sympy.polys.matrices import DomainMatrix
+from Frequency_Sweep import get_sweep_solver, SweepResult, interpolate_coefficients
+from Node_Ordering import get_ordering
+from Parallel_Determinant import parallel_fraction_free_solve
+from Compiled_Evaluator import evaluate_transfer_function
+from Rational_Function import RationalFunction, ring_coefficients
 import time
+import os
 import warnings
 
 class ModifiedNodalAnalysis(EquationFormulator):
     """Class for modified nodal analysis method.
 
+    The stamps of all elements are collected as sparse (row, col, value)
+    triplets. The symbolic matrices are only assembled when they are requested
+    via get_equation_system() or the A and z attributes.
+
+    The system is always stamped as a linear pencil A(s) = G + s*C, inductors
+    get an additional branch current. In numeric mode the element values are
+    stamped as floats and no SymPy object is created at all, the value_dict is
+    then keyed by the element symbol names.
 
     """
     ct:Circuit
     value_dict:dict
   
 
-    def __init__(self, circuit:Circuit):
+    def __init__(self, circuit:Circuit, numeric:bool=False, ordering:str="none", symbolic:list|None=None):
         """Innitialize the class.
 
         Args:
             circuit (Circuit): The Circuit to analyze.
+            numeric (bool): stamp numeric values only (for numeric pipelines)
+            ordering (str): fill reducing order of the unknowns, see Node_Ordering.ORDERINGS
+            symbolic (list): symbols of the elements which stay symbolic, None for all.
+                The other elements are stamped with their value as exact rational.
 
         """
         self.value_dict = {}
         self.ct = circuit
+        self.numeric = numeric
+        self.ordering = ordering
+        self.symbolic = None if symbolic is None else set(symbolic)
         self.n = len(self.ct.nodes) - 1  # Anzahl Knoten ohne Masse (0)
-        self.A = sp.zeros(self.n, self.n)
-        self.z = sp.zeros(self.n, 1)
         self.current_var_index = 0    # Gesamtanzahl von Stromvariablen
 
         self.sym_result = {}
@@ -56,57 +79,201 @@ class ModifiedNodalAnalysis(EquationFormulator):
         print("Node mapping:")
         print(self.node_map)
 
-        #create vector with symbols of unknown node voltages based on the size of the matrix      
+        #create vector with names of unknown node voltages based on the size of the matrix      
         size = len(self.node_map)
-        self.unknowns = [None] * size
+        self.unknown_names = [None] * size
 
         for name, idx in self.node_map.items():
             if (name == "ground") | (name == "0") | (name == "GND") | (name == "gnd"):
                 
                 continue
-            self.unknowns[idx] = sp.Symbol(f"V_{name}")
+            self.unknown_names[idx] = f"V_{name}"
 
        
-        self.unknowns = [s for s in self.unknowns if s is not None]
-        self.unknowns = sp.Matrix(self.unknowns)
-        
-     
-                
-    def expand_matrix(self, symName):
-        """Expand matrix in case of an additional voltage source by 1 row and 1 column.
+        self.unknown_names = [name for name in self.unknown_names if name is not None]
+
+        #count the branch currents up front, so the matrix never has to grow
+        self.branch_map = self.assign_branch_currents(len(self.unknown_names))
+        self.current_var_index = len(self.branch_map)
+
+        self.unknown_names += [f"I_{name}" for name in self.branch_map]
+        # position k of the system holds the unknown with the original index permutation[k]
+        self.permutation = list(range(len(self.unknown_names)))
+
+        self.stamps = StampAssembler(len(self.unknown_names))
+        # unit excitation pattern of every independent source, name -> [(row, sign)]
+        self.excitations = {}
+        self._unknowns = None
+        self._A = None
+        self._z = None
+        self._A_override = False
+        self._z_override = False
+        # SymbolicCache for the results of solve(), None to always solve
+        self.cache = None
+
+    @property
+    def unknowns(self):
+        """Vector with the symbols of the unknowns, created on first access."""
+        if self._unknowns is None:
+            self._unknowns = sp.Matrix([sp.Symbol(name) for name in self.unknown_names])
+        return self._unknowns
+
+    @property
+    def A(self):
+        """Symbolic system matrix, assembled from the stamps on first access."""
+        if self._A is None:
+            self._A = self.stamps.to_matrix()
+        return self._A
+
+    @A.setter
+    def A(self, matrix):
+        self._A = matrix
+        self._A_override = True
+
+    @property
+    def z(self):
+        """Symbolic excitation vector, assembled from the stamps on first access."""
+        if self._z is None:
+            self._z = self.stamps.rhs_to_matrix()
+        return self._z
+
+    @z.setter
+    def z(self, vector):
+        self._z = vector
+        self._z_override = True
+
+    def assign_branch_currents(self, offset:int):
+        """Assign a matrix row to every additional branch current.
+
+        The order matches the one of buildEquationsSystem: voltage sources first,
+        then the controlled sources in element order and the inductors last.
+
+        Args:
+            offset (int): index of the first branch current row (number of nodes without ground)
+
+        Returns:
+            dict: mapping branch current name -> zero based row index
 
         """
-        rows, cols = self.A.shape
-        last_row = sp.zeros(1, cols + 1)
-        self.A = self.A.row_join(sp.zeros(rows, 1))   # rechte Spalte anhängen
-        self.A = self.A.col_join(last_row)            # neue letzte Zeile
+        branch_map = {}
+
+        for element in self.ct.elements:
+            if element.type == "V":
+                branch_map[element.get_symbol()] = offset + len(branch_map)
+
+        for element in self.ct.elements:
+            match element.type:
+                case "H":
+                    branch_map[element.get_symbol() + "_ctrl"] = offset + len(branch_map)
+                    branch_map[element.get_symbol()] = offset + len(branch_map)
+                case "F":
+                    branch_map[element.name] = offset + len(branch_map)
+                case "E":
+                    branch_map[element.get_symbol()] = offset + len(branch_map)
+
+        for element in self.ct.elements:
+            if element.type == "L":
+                branch_map[element.get_symbol()] = offset + len(branch_map)
+
+        return branch_map
 
-        self.z = self.z.col_join(sp.Matrix([0]))
+    def element_value(self, element, param:str, default:str|None=None):
+        """Return the value which gets stamped for an element.
+
+        Args:
+            element (Element): element of the circuit
+            param (str): name of the parameter holding the numeric value
+            default (str): value to use if the parameter is missing
+
+        Returns:
+            symbol or number: element symbol, the numeric value in numeric mode
+                or the exact rational value if the element is not in the symbolic subset
+
+        """
+        symbol = element.get_symbol()
+        value = element.params[param] if default is None else element.params.get(param, default)
+        num_value = pu.pspice_to_float(value)
+
+        if self.numeric:
+            self.value_dict.update({symbol: num_value})
+            return num_value
+
+        # kept for all elements, the sensitivities and the numeric solves look the values up by name
+        self.value_dict.update({sp.symbols(symbol): num_value})
+
+        if self.symbolic is not None and symbol not in self.symbolic:
+            # rationals keep the fraction-free elimination exact, floats would turn the domain into RR
+            return sp.Rational(repr(num_value))
+
+        return sp.symbols(symbol)
+
+    def stamp(self, row, col, value, order=0, param=None):
+        """Add a value to the system matrix.
+
+        Args:
+            row (int): zero based row index
+            col (int): zero based column index
+            value (symbol): value to add
+            order (int): power of s the value gets multiplied with (0 -> G, 1 -> C)
+            param (tuple): (name, exponent) of the element value in the stamp
+
+        """
+        self.stamps.add(row, col, value, order, param)
+        self._A = None
 
-        newsym = sp.Symbol("I_" + str(symName))
-        self.unknowns = self.unknowns.col_join(sp.Matrix([newsym]))
-                                               
-        self.current_var_index += 1
+    def stamp_rhs(self, row, value, param=None):
+        """Add a value to the excitation vector.
 
-    def add_admittance(self, node1, node2, value):
+        Args:
+            row (int): zero based row index
+            value (symbol): value to add
+            param (tuple): (name, exponent) of the element value in the stamp
+
+        """
+        self.stamps.add_rhs(row, value, param)
+        self._z = None
+
+    def add_admittance(self, node1, node2, value, order=0, param=None):
         """Add admittance to the matrix.
 
         Args:
             node1 (int): Node 1 of admittance
             node2 (int): Node 2 of admittance
-            value (symbol): symbol of admittance (L, C, G, etc.)
+            value (symbol): symbol of admittance (G, C, etc.)
+            order (int): power of s of the admittance (1 for capacitors)
+            param (tuple): (name, exponent) of the element value, for the sensitivity analysis
 
         """
 
         if node1 != 0:
-            self.A[node1 - 1, node1 - 1] += value
+            self.stamp(node1 - 1, node1 - 1, value, order, param)
         if node2 != 0:
-            self.A[node2 - 1, node2 - 1] += value
+            self.stamp(node2 - 1, node2 - 1, value, order, param)
         if node1 != 0 and node2 != 0:
-            self.A[node1 - 1, node2 - 1] -= value
-            self.A[node2 - 1, node1 - 1] -= value
+            self.stamp(node1 - 1, node2 - 1, -value, order, param)
+            self.stamp(node2 - 1, node1 - 1, -value, order, param)
 
-    def add_independent_current_source(self, node1, node2, value, num_value):
+    def add_inductor(self, node1, node2, idx, value, param=None):
+        """Add inductor with its branch current, so the matrix stays linear in s.
+
+        Args:
+            node1 (int): Node 1 of the inductor
+            node2 (int): Node 2 of the inductor
+            idx (int): Row of the branch current of the inductor.
+            value (symbol): symbol of the inductance
+            param (tuple): (name, exponent) of the element value, for the sensitivity analysis
+
+        """
+        if node1 != 0:
+            self.stamp(node1 - 1, idx, 1)
+            self.stamp(idx, node1 - 1, 1)
+        if node2 != 0:
+            self.stamp(node2 - 1, idx, -1)
+            self.stamp(idx, node2 - 1, -1)
+
+        self.stamp(idx, idx, -value, order=1, param=param)
+
+    def add_independent_current_source(self, node1, node2, value, num_value, name=None, param=None):
         """Add independent current source. 
         Direction of the current is from node1 to node2.
 
@@ -114,37 +281,46 @@ class ModifiedNodalAnalysis(EquationFormulator):
             node1 (int): Node 1 of the current source.
             node2 (int): Node 2 of the current source.
             value (symbol): Symbol of the source.
+            name (str): name of the source, registers it as an input of the transfer matrix
+            param (tuple): (name, exponent) of the element value, for the sensitivity analysis
 
         """
+        if name is not None:
+            self.excitations[name] = [(node - 1, sign) for node, sign in ((node1, -1), (node2, 1)) if node != 0]
+
         if num_value != 0:
             if node1 != 0:
-                self.z[node1 - 1] -= value
+                self.stamp_rhs(node1 - 1, -value, param)
             if node2 != 0:
-                self.z[node2 - 1] += value
+                self.stamp_rhs(node2 - 1, value, param)
 
-    def add_independent_voltage_source(self, node1, node2, sym_value, num_value):  # noqa: D417
+    def add_independent_voltage_source(self, node1, node2, idx, sym_value, num_value, name=None, param=None):  # noqa: D417
         """Add independent voltage source.
 
         Args:
             node1 (int): Node 1 of the voltage source (+).
             node2 (int): Node 2 of the voltage source (-).
+            idx (int): Row of the branch current of the source.
             value (symbol): Symbol of the source.
+            name (str): name of the source, registers it as an input of the transfer matrix
+            param (tuple): (name, exponent) of the element value, for the sensitivity analysis
 
         """
-        self.expand_matrix(sym_value)
-        idx = self.A.rows - 1
+        if name is not None:
+            self.excitations[name] = [(idx, 1)]
+
         if node1 != 0:
-            self.A[node1 - 1, idx] = 1
-            self.A[idx, node1 - 1] = 1
+            self.stamp(node1 - 1, idx, 1)
+            self.stamp(idx, node1 - 1, 1)
         if node2 != 0:
-            self.A[node2 - 1, idx] = -1
-            self.A[idx, node2 - 1] = -1
+            self.stamp(node2 - 1, idx, -1)
+            self.stamp(idx, node2 - 1, -1)
 
         if num_value != 0:
-            self.z[idx] = sym_value
+            self.stamp_rhs(idx, sym_value, param)
         
         
-    def add_vccs(self, node_out1, node_out2, node_ctrl1, node_ctrl2, gm):
+    def add_vccs(self, node_out1, node_out2, node_ctrl1, node_ctrl2, gm, param=None):
         """Add voltage controlled current source.
 
         Args:
@@ -153,18 +329,19 @@ class ModifiedNodalAnalysis(EquationFormulator):
             node_ctrl1 (int): node 1 of controlling element
             node_ctrl2 (int): node 2 of controlling element
             gm (float): gain factor
+            param (tuple): (name, exponent) of the gain, for the sensitivity analysis
 
         """
         if node_out1 != 0 and node_ctrl1 != 0:
-            self.A[node_out1 - 1, node_ctrl1 - 1] += gm
+            self.stamp(node_out1 - 1, node_ctrl1 - 1, gm, param=param)
         if node_out1 != 0 and node_ctrl2 != 0:
-            self.A[node_out1 - 1, node_ctrl2 - 1] -= gm
+            self.stamp(node_out1 - 1, node_ctrl2 - 1, -gm, param=param)
         if node_out2 != 0 and node_ctrl1 != 0:
-            self.A[node_out2 - 1, node_ctrl1 - 1] -= gm
+            self.stamp(node_out2 - 1, node_ctrl1 - 1, -gm, param=param)
         if node_out2 != 0 and node_ctrl2 != 0:
-            self.A[node_out2 - 1, node_ctrl2 - 1] += gm
+            self.stamp(node_out2 - 1, node_ctrl2 - 1, gm, param=param)
 
-    def add_cccs(self, node_out1, node_out2, node_ctrl1, node_ctrl2, beta, name):  # noqa: C901, PLR0912
+    def add_cccs(self, node_out1, node_out2, node_ctrl1, node_ctrl2, idx, beta, param=None):  # noqa: C901, PLR0912
         """Add current controlled current source.
 
         Args:
@@ -172,30 +349,27 @@ class ModifiedNodalAnalysis(EquationFormulator):
             node_out2 (int): node 2 of controlled element
             node_ctrl1 (int): node 1 of controlling element
             node_ctrl2 (int): node 2 of controlling element
+            idx (int): row of the controlling branch current
             beta (float): gain factor
+            param (tuple): (name, exponent) of the gain, for the sensitivity analysis
 
         """
-        self.expand_matrix(name)
-        idx = self.A.rows - 1
-
         if node_out1 != 0:
-            self.A[node_out1 - 1, idx] += beta
+            self.stamp(node_out1 - 1, idx, beta, param=param)
 
         if node_out2 != 0:
-            self.A[node_out2 - 1, idx] -= beta
+            self.stamp(node_out2 - 1, idx, -beta, param=param)
                         
         if node_ctrl1 != 0:
-            self.A[idx, node_ctrl1 - 1] += 1
-            self.A[node_ctrl1 - 1, idx] += 1
+            self.stamp(idx, node_ctrl1 - 1, 1)
+            self.stamp(node_ctrl1 - 1, idx, 1)
                         
         if node_ctrl2 != 0:
-            self.A[idx, node_ctrl2 - 1] -= 1
-            self.A[node_ctrl2 - 1, idx] -= 1
-                        
-        self.z[idx] = 0
+            self.stamp(idx, node_ctrl2 - 1, -1)
+            self.stamp(node_ctrl2 - 1, idx, -1)
 
         
-    def add_vcvs(self, node_out1, node_out2, node_ctrl1, node_ctrl2, gain):
+    def add_vcvs(self, node_out1, node_out2, node_ctrl1, node_ctrl2, idx, gain, param=None):
         """Add voltage controlled voltage source.
 
         Args:
@@ -203,23 +377,23 @@ class ModifiedNodalAnalysis(EquationFormulator):
             node_out2 (int): node 2 of controlled element
             node_ctrl1 (int): node 1 of controlling element
             node_ctrl2 (int): node 2 of controlling element
+            idx (int): row of the branch current of the source
             gain (float): gain factor
+            param (tuple): (name, exponent) of the gain, for the sensitivity analysis
 
         """
-        self.expand_matrix(gain)
-        idx = self.A.rows - 1
         if node_out1 != 0:
-            self.A[node_out1 - 1, idx] = 1
-            self.A[idx, node_out1 - 1] = 1
+            self.stamp(node_out1 - 1, idx, 1)
+            self.stamp(idx, node_out1 - 1, 1)
         if node_out2 != 0:
-            self.A[node_out2 - 1, idx] = -1
-            self.A[idx, node_out2 - 1] = -1
+            self.stamp(node_out2 - 1, idx, -1)
+            self.stamp(idx, node_out2 - 1, -1)
         if node_ctrl1 != 0:
-            self.A[idx, node_ctrl1 - 1] += gain
+            self.stamp(idx, node_ctrl1 - 1, gain, param=param)
         if node_ctrl2 != 0:
-            self.A[idx, node_ctrl2 - 1] -= gain
+            self.stamp(idx, node_ctrl2 - 1, -gain, param=param)
        
-    def add_ccvs(self, node_out1, node_out2, node_ctrl1, node_ctrl2, r_m):  # noqa: C901, PLR0912, PLR0915
+    def add_ccvs(self, node_out1, node_out2, node_ctrl1, node_ctrl2, ctrl_idx, idx, r_m, param=None):  # noqa: C901, PLR0912, PLR0915
         """Add current controlled voltage source.
 
         Args:
@@ -227,49 +401,56 @@ class ModifiedNodalAnalysis(EquationFormulator):
             node_out2 (int): node 2 of controlled element
             node_ctrl1 (int): node 1 of controlling element
             node_ctrl2 (int): node 2 of controlling element
+            ctrl_idx (int): row of the controlling branch current
+            idx (int): row of the branch current of the source
             r_m (float): gain factor
+            param (tuple): (name, exponent) of the gain, for the sensitivity analysis
 
         """
-        self.expand_matrix(r_m + "_ctrl")
-        ctrl_idx = self.A.rows - 1
-
-                        
         if node_ctrl1 != 0:
-            self.A[ctrl_idx, node_ctrl1 - 1] += 1
-            self.A[node_ctrl1 - 1, ctrl_idx] += 1
+            self.stamp(ctrl_idx, node_ctrl1 - 1, 1)
+            self.stamp(node_ctrl1 - 1, ctrl_idx, 1)
                         
         if node_ctrl2 != 0:
-            self.A[ctrl_idx, node_ctrl2 - 1] += -1
-            self.A[node_ctrl2 - 1, ctrl_idx] += -1
-                        
-        self.z[ctrl_idx] = 0
-                        
-        self.expand_matrix(r_m)
-        idx = self.A.rows - 1
+            self.stamp(ctrl_idx, node_ctrl2 - 1, -1)
+            self.stamp(node_ctrl2 - 1, ctrl_idx, -1)
 
         if node_out1 != 0:
-            self.A[idx, node_out1 - 1] += 1
-            self.A[node_out1 - 1, idx] += 1
+            self.stamp(idx, node_out1 - 1, 1)
+            self.stamp(node_out1 - 1, idx, 1)
                         
-        if node_ctrl2 != 0:
-            self.A[idx, node_out2 - 1] += -1
-            self.A[node_out2 - 1, idx] += -1
+        if node_out2 != 0:
+            self.stamp(idx, node_out2 - 1, -1)
+            self.stamp(node_out2 - 1, idx, -1)
 
-        self.z[idx] = 0
-                        
-        self.A[idx, ctrl_idx] = -r_m
+        self.stamp(idx, ctrl_idx, -r_m, param=param)
 
 
-    def get_equation_system(self):
+    def get_equation_system(self, sparse:bool=False, domain:bool=False):
         """Returns equation system.
 
+        Args:
+            sparse (bool): return A as sp.SparseMatrix, assembled straight from the stamps
+            domain (bool): return A and z as DomainMatrix over the polynomial ring, see get_domain_system()
+
         Returns:
             A(matrix): Matrix table of the equation system.
             z(vector): solution vector of the equation system.
 
         """
+        if domain:
+            system = self.get_domain_system()
+            n = system.shape[0]
+            return system.extract(range(n), range(n)), system.extract(range(n), [n])
+
+        if sparse:
+            if self._A is None:
+                return self.stamps.to_matrix(sparse=True), self.z
+            return sp.SparseMatrix(self._A), self.z
+
         return self.A, self.z
 
+
     def get_unknowns(self):
         """Return vector with symbols of unknown node voltages and extra currents based
           on the size of the matrix.
@@ -292,7 +473,7 @@ class ModifiedNodalAnalysis(EquationFormulator):
 
         
         """
-        result = [str(sym) for sym in self.get_unknowns()]
+        result = list(self.unknown_names)
 
         return  result
      
@@ -300,10 +481,6 @@ class ModifiedNodalAnalysis(EquationFormulator):
         """Build the equation system based on the circuit description.
 
         """
-
-        s = sp.symbols('s')
-         
-        
         for element in self.ct.elements:
             symbol = element.get_symbol()
             print(symbol)
@@ -312,41 +489,46 @@ class ModifiedNodalAnalysis(EquationFormulator):
                     self.add_admittance(
                         self.node_map[element.connections[0]], 
                         self.node_map[element.connections[1]],
-                        1/sp.symbols(symbol)
+                        1/self.element_value(element, "value_dc"),
+                        param=(symbol, -1)
                     )
-                    self.value_dict.update({sp.symbols(symbol): pu.pspice_to_float(element.params["value_dc"])})
 
                 case "L": 
-                    self.add_admittance(
+                    self.add_inductor(
                         self.node_map[element.connections[0]], 
                         self.node_map[element.connections[1]],
-                        1/(s*sp.symbols(symbol))
+                        self.branch_map[symbol],
+                        self.element_value(element, "value_dc"),
+                        param=(symbol, 1)
                     )
-                    self.value_dict.update({sp.symbols(symbol): pu.pspice_to_float(element.params["value_dc"])})
 
                 case "C": 
                     self.add_admittance(
                         self.node_map[element.connections[0]], 
                         self.node_map[element.connections[1]], # noqa: E701
-                        (s*sp.symbols(symbol))
+                        self.element_value(element, "value_dc"),
+                        order=1,
+                        param=(symbol, 1)
                     )
-                    self.value_dict.update({sp.symbols(symbol): pu.pspice_to_float(element.params["value_dc"])})
 
                 case "V": 
                     self.add_independent_voltage_source(
                         self.node_map[element.connections[0]],
                         self.node_map[element.connections[1]], 
-                        sp.symbols(symbol), element.params.get("value_ac", 0)
+                        self.branch_map[symbol],
+                        self.element_value(element, "value_ac", "0V"), element.params.get("value_ac", 0),
+                        name=symbol,
+                        param=(symbol, 1)
                     )
-                    self.value_dict.update({sp.symbols(symbol): pu.pspice_to_float(element.params.get("value_ac", "0V"))})
 
                 case "I": 
                     self.add_independent_current_source(
                         self.node_map[element.connections[0]],
                         self.node_map[element.connections[1]], 
-                        sp.symbols(symbol), element.params.get("value_ac", 0)
+                        self.element_value(element, "value_ac", "0A"), element.params.get("value_ac", 0),
+                        name=symbol,
+                        param=(symbol, 1)
                     )
-                    self.value_dict.update({sp.symbols(symbol): pu.pspice_to_float(element.params.get("value_ac", "0A"))})
             
            
                     
@@ -361,9 +543,11 @@ class ModifiedNodalAnalysis(EquationFormulator):
                         self.node_map[element.connections[1]],
                         self.node_map[element.connections[2]], 
                         self.node_map[element.connections[3]], 
-                        sp.symbols(symbol)
+                        self.branch_map[symbol + "_ctrl"],
+                        self.branch_map[symbol],
+                        self.element_value(element, "value"),
+                        param=(symbol, 1)
                     )
-                    self.value_dict.update({sp.symbols(symbol): pu.pspice_to_float(element.params["value"])})
 
                 case "F": 
                     self.add_cccs(
@@ -371,10 +555,10 @@ class ModifiedNodalAnalysis(EquationFormulator):
                         self.node_map[element.connections[1]],
                         self.node_map[element.connections[2]], 
                         self.node_map[element.connections[3]], 
-                        sp.symbols(symbol), 
-                        element.name
+                        self.branch_map[element.name],
+                        self.element_value(element, "value"),
+                        param=(symbol, 1)
                     )
-                    self.value_dict.update({sp.symbols(symbol): pu.pspice_to_float(element.params["value"])})
 
                 case "E": 
                     self.add_vcvs(
@@ -382,9 +566,10 @@ class ModifiedNodalAnalysis(EquationFormulator):
                         self.node_map[element.connections[1]],
                         self.node_map[element.connections[2]], 
                         self.node_map[element.connections[3]], 
-                        sp.symbols(symbol)
+                        self.branch_map[symbol],
+                        self.element_value(element, "value"),
+                        param=(symbol, 1)
                     )
-                    self.value_dict.update({sp.symbols(symbol): pu.pspice_to_float(element.params["value"])})
 
                 case "G": 
                     self.add_vccs(
@@ -392,121 +577,592 @@ class ModifiedNodalAnalysis(EquationFormulator):
                         self.node_map[element.connections[1]],
                         self.node_map[element.connections[2]], 
                         self.node_map[element.connections[3]], 
-                        sp.symbols(symbol)
+                        self.element_value(element, "value"),
+                        param=(symbol, 1)
                     )
-                    self.value_dict.update({sp.symbols(symbol): pu.pspice_to_float(element.params["value"])})
+
+        self.reorderUnknowns()
 
         print("Finished building equation system!")
         logger.debug("Finished building equation system!")   
             
             
 
-    def solve(self, unknown_variable:str, input_modification:list=[]):
+    def reorderUnknowns(self):
+        """Permute unknowns and equations with the fill reducing ordering.
+
+        The nodes are numbered in the order of Circuit.nodes, which can cause
+        a lot of fill-in during the elimination. The ordering is computed on
+        the pattern of the stamps and applied to the stamps, so the matrices
+        get assembled in the new order right away. All results are addressed
+        by the names of the unknowns, permutation maps back to the original
+        order.
+
+        """
+        if self.ordering == "none":
+            return
+
+        order = get_ordering(self.ordering, self.stamps.pattern())
+        self.stamps.permute(order)
+
+        position = {old: new for new, old in enumerate(order)}
+        self.excitations = {
+            name: [(position[row], sign) for row, sign in pattern] for name, pattern in self.excitations.items()
+        }
+        self.unknown_names = [self.unknown_names[idx] for idx in order]
+        self.permutation = [self.permutation[idx] for idx in order]
+
+        self._unknowns = None
+        self._A = None
+        self._z = None
+
+    def solve(self, unknown_variable:str, input_modification:list=[], method:str="lu"):
         """Return the solution of the equation system.
 
+        If a SymbolicCache is set as self.cache, the result is looked up
+        there first and stored after solving.
+
         Args:
             unknown_variable (str): variable for which to solve the system
+            input_modification (list): list with modified input values
+            method (str): "lu" solves for all unknowns with LUsolve, "cramer" only
+                forms the two determinants of the requested unknown (see solveFraction),
+                "parallel" splits them into minors which are eliminated on all cores
         
         Returns:
             sol(array): array with symbolic solutuions
 
         """
-        unknown_variable_symbol = sp.symbols(unknown_variable)
+        if method not in ("lu", "cramer", "parallel"):
+            raise ValueError(f"Unknown solve method: {method}")
 
-        if unknown_variable_symbol not in self.unknowns:
+        if unknown_variable not in self.unknown_names:
             raise ValueError("Unknown variable not in the system")
+
+        key = None
+        if self.cache is not None:
+            # cramer and parallel give the same determinants
+            form = "lu" if method == "lu" else "fraction"
+            key = self.cache.key(self.get_domain_system(input_modification), unknown_variable, form)
+            cached = self.cache.load(key)
+            if cached is not None:
+                N, D = cached
+                return N / D
+
+        if method in ("cramer", "parallel"):
+            workers = os.cpu_count() if method == "parallel" else None
+            N, D = self.solveFraction(unknown_variable, input_modification, workers)
+        else:
+            z_mod = self.get_modified_input(input_modification)
+
+            result = self.A.LUsolve(z_mod)
+
+            x_syms = list(self.get_unknowns())
+            idx_out = x_syms.index(sp.symbols(unknown_variable))
+
+            N, D = result[idx_out], sp.S.One
+
+        if key is not None:
+            self.cache.store(key, N, D)
+
+        return N / D
+
+    def solveFraction(self, unknown_variable:str, input_modification:list=[], workers:int|None=None):
+        """Solve for a single unknown as numerator/denominator pair.
+
+        Only the determinant of the system and the determinant with the column
+        of the unknown replaced by z are formed (Cramer's rule), both with
+        fraction-free elimination over the polynomial ring of the symbols.
+        With workers, both determinants are expanded into minors which are
+        eliminated in a process pool (see Parallel_Determinant).
+
+        Args:
+            unknown_variable (str): variable for which to solve the system
+            input_modification (list): list with modified input values
+            workers (int): number of processes, None to eliminate in this process
+
+        Returns:
+            N(sp.Expr): numerator polynomial
+            D(sp.Expr): denominator polynomial (the row scaled system determinant)
+
+        Raises:
+            NonInvertibleMatrixError: the system determinant is zero
+
+        """
+        if unknown_variable not in self.unknown_names:
+            raise ValueError("Unknown variable not in the system")
+
+        idx_out = self.unknown_names.index(unknown_variable)
+
+        system = self.get_domain_system(input_modification)
+        if workers is None:
+            N, D = self.fractionFreeSolve(system, idx_out)
+        else:
+            N, D = parallel_fraction_free_solve(system, idx_out, workers)
+
+        if D == 0:
+            raise sp.matrices.exceptions.NonInvertibleMatrixError("Matrix det == 0; not invertible.")
+
+        return N, D
+
+    def solveRational(self, unknown_variable:str, input_modification:list=[]):
+        """Solve for a single unknown in the normal form N(s)/D(s).
+
+        The determinants of solveFraction() are split into powers of s
+        directly in their polynomial ring.
+
+        Args:
+            unknown_variable (str): variable for which to solve the system
+            input_modification (list): list with modified input values
+
+        Returns:
+            RationalFunction: symbolic coefficients of numerator and denominator
+
+        Raises:
+            NonInvertibleMatrixError: the system determinant is zero
+
+        """
+        if unknown_variable not in self.unknown_names:
+            raise ValueError("Unknown variable not in the system")
+
+        system = self.get_domain_system(input_modification)
+        N, D = self.fractionFreeDeterminants(system, self.unknown_names.index(unknown_variable))
+
+        if not D:
+            raise sp.matrices.exceptions.NonInvertibleMatrixError("Matrix det == 0; not invertible.")
+
+        s = sp.symbols("s")
+        return RationalFunction(ring_coefficients(system.domain, N, s), ring_coefficients(system.domain, D, s), s)
+
+    def solveSymbolicSensitivities(self, unknown_variable:str, elements:list|None=None, normalized:bool=True, input_modification:list=[]):
+        """Return the symbolic sensitivities of one unknown to element values.
+
+        The solution N/D is formed once, the derivatives of both determinants
+        come from Jacobi's formula on the structure of the system (see
+        EquationFormulator.fractionFreeDerivatives()), so only the columns
+        which contain the element are eliminated again. The result is kept
+        in the factored form of the quotient rule instead of differentiating
+        the expanded solution.
+
+        Args:
+            unknown_variable (str): variable for which to solve the system
+            elements (list): element symbols, None for all symbols of the system
+            normalized (bool): return p/H * dH/dp = p*(dN*D - N*dD)/(N*D) instead of dH/dp = (dN*D - N*dD)/D**2
+            input_modification (list): list with modified input values
+
+        Returns:
+            dict: element symbol -> sensitivity expression
+
+        Raises:
+            ValueError: unknown variable or an element which is not symbolic
+
+        """
+        if unknown_variable not in self.unknown_names:
+            raise ValueError("Unknown variable not in the system")
+        idx = self.unknown_names.index(unknown_variable)
+
+        system = self.get_domain_system(input_modification)
+        domain = system.domain
+        N, D = self.fractionFreeDeterminants(system, idx)
+
+        if elements is None:
+            s = sp.symbols("s")
+            elements = [str(symbol) for symbol in self.value_dict if symbol in getattr(domain, "symbols", ()) and symbol != s]
+
+        N_expr, D_expr = domain.to_sympy(N), domain.to_sympy(D)
+        sensitivities = {}
+        for name in elements:
+            symbol = sp.Symbol(name)
+            dN, dD = self.fractionFreeDerivatives(system, idx, symbol)
+            # products of the determinants, not expanded
+            numerator = domain.to_sympy(dN) * D_expr - N_expr * domain.to_sympy(dD)
+            if normalized:
+                sensitivities[name] = symbol * numerator / (N_expr * D_expr)
+            else:
+                sensitivities[name] = numerator / D_expr**2
+
+        return sensitivities
+
+    def evaluateSymbolic(self, expression:sp.Expr, frequencies:list):
+        """Evaluate a symbolic result, e.g. of solve(), with the values of the elements.
+
+        The expression is compiled with common subexpression elimination
+        once and cached, see Compiled_Evaluator.
+
+        Args:
+            expression (sp.Expr): expression in s and the element symbols
+            frequencies (list): frequencies in Hz
+
+        Returns:
+            array: complex values at s = j*2*pi*f
+
+        """
+        return evaluate_transfer_function(expression, frequencies, self.value_dict)
+
+    def estimateTerms(self, matrix:sp.MatrixBase|None=None, max_edges:int=200000):
+        """Estimate the number of product terms of the system determinant.
+
+        Without a matrix the term counts of the entries are taken straight
+        from the stamps, so the symbolic matrix does not have to be assembled.
+
+        Args:
+            matrix (sp.Matrix): matrix to estimate, None for the system matrix
+            max_edges (int): size limit of the decision diagram for the exact count
+
+        Returns:
+            int: number of product terms of the determinant (without cancellation)
+
+        """
+        if matrix is not None or self._A_override:
+            return super().estimateTerms(self.A if matrix is None else matrix, max_edges)
+
+        term_counts = {pos: sum(counts) for pos, counts in self.stamps.term_counts().items()}
+
+        return self.countTerms(self.stamps.size, term_counts, max_edges)
+
+    def get_determinant_diagrams(self, unknown_variable:str, input_modification:list|None=None, max_nodes:int=1_000_000):
+        """Return the determinant decision diagrams of the solution N/D of one unknown.
+
+        D is the system determinant and N the determinant with the column of
+        the unknown replaced by z (Cramer's rule). Both are kept as shared
+        graphs, so they can be counted, evaluated and split into powers of s
+        without expanding them.
+
+        Args:
+            unknown_variable (str): variable for which to solve the system
+            input_modification (list): list with modified input values, None for the unmodified z
+            max_nodes (int): abort if a diagram gets larger than this
+
+        Returns:
+            N(DeterminantDecisionDiagram): numerator determinant
+            D(DeterminantDecisionDiagram): system determinant
+
+        """
+        if unknown_variable not in self.unknown_names:
+            raise ValueError("Unknown variable not in the system")
+
+        idx_out = self.unknown_names.index(unknown_variable)
+
+        if self._A_override:
+            z_mod = self.z if input_modification is None else self.get_modified_input(input_modification)
+            A_num = self.A.copy()
+            A_num[:, idx_out] = z_mod
+            return (
+                DeterminantDecisionDiagram.from_matrix(A_num, self.value_dict, max_nodes),
+                DeterminantDecisionDiagram.from_matrix(self.A, self.value_dict, max_nodes),
+            )
+
+        value_dict = None if self.numeric else self.value_dict
+        rhs = None
+        if input_modification is not None or self._z_override:
+            _, _, rhs = self.get_numeric_system()
+            if input_modification is not None and len(input_modification) == len(rhs):
+                rhs = rhs * np.asarray(input_modification)
+
+        return (
+            DeterminantDecisionDiagram.from_stamps(self.stamps, value_dict, idx_out, rhs, max_nodes),
+            DeterminantDecisionDiagram.from_stamps(self.stamps, value_dict, max_nodes=max_nodes),
+        )
+
+    def get_domain_system(self, input_modification:list|None=None):
+        """Return the augmented system [A | z] as DomainMatrix over the polynomial ring of the symbols.
+
+        The DomainMatrix is built straight from the stamps, without assembling
+        the sp.Matrix. Every equation is scaled with the lcm of its
+        denominators (e.g. 1/R1), which does not change the solution but keeps
+        all entries in the ring ZZ[s, R1, C1, ...], so determinants and solves
+        can run fraction-free. Use domain.to_sympy() to convert results back.
+
+        Args:
+            input_modification (list): list with modified input values, None for the unmodified z
+
+        Returns:
+            DomainMatrix: (n, n + 1) augmented system
         
-        if len(input_modification) == len(self.z):
-            z_mod = self.modify_Input(input_modification)
-        
+        """
+        z_mod = None if input_modification is None else self.get_modified_input(input_modification)
+
+        if self._A_override:
+            z_mod = self.z if z_mod is None else z_mod
+            system = DomainMatrix.from_Matrix(self.A.row_join(z_mod)).to_sparse()
         else:
-            z_mod = self.z
-            warnings.warn("Input modification list is empty or has wrong length. Using unmodified input vector.")
+            if z_mod is None and self._z_override:
+                z_mod = self.z
+            system = self.stamps.to_domain_matrix(z_mod)
 
-        result = self.A.LUsolve(z_mod)
+        if system.domain.is_FractionField or system.domain.is_QQ:
+            _, system = system.clear_denoms_rowwise(convert=True)
 
-        x_syms = list(self.get_unknowns())
-        idx_out = x_syms.index(unknown_variable_symbol)
+        return system
 
+    def get_modified_input(self, input_modification:list=[]):
+        """Return z scaled with the input modification, or z itself if it does not fit.
 
-        return result[idx_out]
-    
+        Args:
+            input_modification (list): list with modified input values
+
+        Returns:
+            z(matrix): excitation vector used for solving
+
+        """
+        if len(input_modification) == len(self.z):
+            return self.modify_Input(input_modification)
+
+        warnings.warn("Input modification list is empty or has wrong length. Using unmodified input vector.")
+        return self.z
+
+    def get_numeric_system(self, sparse_matrices:bool=False):
+        """Return the numeric matrices of the pencil A(s) = G + s*C.
+
+        The matrices are evaluated stamp by stamp with the value dictionary, so
+        the symbolic matrix does not have to be assembled. If A or z have been
+        replaced (e.g. by the approximation), they are split into G and C instead.
 
+        Args:
+            sparse_matrices (bool): return G and C as scipy CSC matrices
 
-    def solveNumerical(self, frequencies:list, unknown_variable:str, input_modification:list = []): 
+        Returns:
+            G(array): frequency independent part of the system matrix
+            C(array): part of the system matrix which gets multiplied with s
+            z(array): numerical excitation vector
+
+        """
+        value_dict = None if self.numeric else self.value_dict
+
+        if self._A_override:
+            s = sp.symbols("s")
+            A_num = self.toNumerical(self.A, self.value_dict)
+            G = np.array(A_num.subs(s, 0), dtype=float)
+            C = np.array(sp.diff(A_num, s), dtype=float)
+            if sparse_matrices:
+                G, C = sparse.csc_matrix(G), sparse.csc_matrix(C)
+        elif sparse_matrices:
+            G, C = self.stamps.to_scipy(value_dict)
+        else:
+            G, C = self.stamps.to_numpy(value_dict)
+
+        if self._z_override:
+            z = np.array(self.toNumerical(self.z, self.value_dict), dtype=complex).reshape(-1)
+        else:
+            z = self.stamps.rhs_to_numpy(value_dict)
+
+        return G, C, z
+
+    def solveNumerical(self, frequencies:list, unknown_variable:str, input_modification:list = [], strategy:str = "auto"): 
 
         """Solve the equation system numerically based on the value dictionary.
 
         Args:
-            value_dict (dict): dictionary with numerical values for symbols
             frequencies (list): list with frequencies for which to solve the system
             unknown_variable (str): variable for which to solve the system
             input_modification (list): list with modified input values 
+            strategy (str): sweep solver, see Frequency_Sweep.SWEEP_STRATEGIES ("auto" picks one)
 
         Returns:
-            H(array): array with numerical solutions
+            H(array): array with numerical solutions, NaN at singular frequencies
 
         """
+        if unknown_variable not in self.unknown_names:
+            raise ValueError("Unknown variable not in the system")
 
-        H = np.zeros(len(frequencies), dtype=complex)
+        result = self.solveNumericalAll(frequencies, [unknown_variable], input_modification, strategy)
 
-        unknown_variable_symbol = sp.symbols(unknown_variable)
+        return result[unknown_variable]
 
-        if unknown_variable_symbol not in self.unknowns:
-            raise ValueError("Unknown variable not in the system")
-        
-        x_syms = list(self.get_unknowns())
-        idx_out = x_syms.index(unknown_variable_symbol)
+    def solveNumericalAll(self, frequencies:list, outputs:list|None = None, input_modification:list = [], strategy:str = "auto"):
+        """Solve the equation system numerically for all (or some) unknowns in one sweep.
 
-        if len(input_modification) == len(self.z):
-            z_mod = self.modify_Input(input_modification)
+        Args:
+            frequencies (list): list with frequencies for which to solve the system
+            outputs (list): names of the unknowns to keep, None for all of get_unknowns_as_strings()
+            input_modification (list): list with modified input values 
+            strategy (str): sweep solver, see Frequency_Sweep.SWEEP_STRATEGIES ("auto" picks one)
+
+        Returns:
+            SweepResult: (F, n_outputs) solutions, indexable by the names of the unknowns
+
+        """
+        if outputs is None:
+            outputs = self.get_unknowns_as_strings()
+
+        for name in outputs:
+            if name not in self.unknown_names:
+                raise ValueError(f"Unknown variable {name} not in the system")
+
+        G, C, z_num = self.get_numeric_system(sparse_matrices=True)
+
+        if len(input_modification) == len(z_num):
+            z_num = z_num * np.asarray(input_modification)
         
         else:
-            z_mod = self.z
             warnings.warn("Input modification list is empty or has wrong length. Using unmodified input vector.")
 
-        
+        solver = get_sweep_solver(strategy, G, C, len(frequencies))
+        X, singular = solver.solve(frequencies, z_num)
+
+        idx_out = [self.unknown_names.index(name) for name in outputs]
+
+        return SweepResult(frequencies, outputs, X[:, idx_out], singular)
+    
+    def numeric_coefficients(self, output:str):
+        """Return the polynomial coefficients of the transfer function numerically.
 
-        A_num = self.toNumerical(self.A, self.value_dict)
-        z_num = self.toNumerical(z_mod, self.value_dict)
+        The determinant and the Cramer numerator of the output are sampled on
+        a scaled circle and interpolated with an FFT, see
+        Frequency_Sweep.interpolate_coefficients(). No symbolic solve is needed.
 
-        print("Symbolic A matrix:")
-        #sp.pprint(self.A)
-        print("Symbolic z vector:")
-        #sp.pprint(z_mod)
+        Args:
+            output (str): name of the unknown
 
-        print("Numerical A matrix:")
-        print(A_num)
-        print("Numerical z vector:")
-        print(z_num)
+        Returns:
+            N(array): numerator coefficients of s^0, s^1, ... (ascending powers)
+            D(array): denominator (system determinant) coefficients of s^0, s^1, ...
 
-        A_num_func = sp.lambdify(sp.symbols("s"), A_num, "numpy")
-        z_num_func = sp.lambdify(sp.symbols("s"), z_num, "numpy")
+        """
+        if output not in self.unknown_names:
+            raise ValueError("Unknown variable not in the system")
 
-        
-        def solve_freq(freq):
-            jw = 1j * 2* np.pi*freq
-            A_num_eval = A_num_func(jw)
-            
-            z_num_eval = z_num_func(jw)
+        G, C, z_num = self.get_numeric_system()
 
-            try:
-                x = scipy.solve(A_num_eval, z_num_eval)
-            
-            except scipy.LinAlgError:
-                return np.nan
-                
-                
+        return interpolate_coefficients(G, C, z_num, self.unknown_names.index(output))
 
+    def get_excitation_matrix(self, inputs:list|None = None):
+        """Return the unit excitation of every independent source as one column.
 
-            return x[idx_out]
-            
+        Column j is the right hand side for source j set to 1 (V or A) and all
+        other sources set to 0, so z = B @ source_values by superposition.
 
-        H = np.array([solve_freq(freq) for freq in frequencies])
+        Args:
+            inputs (list): names of the sources to use, None for all V and I sources
 
+        Returns:
+            B(array): (n, m) excitation matrix
+            inputs(list): names of the sources, one per column
+
+        """
+        if inputs is None:
+            inputs = list(self.excitations)
+
+        B = np.zeros((len(self.unknown_names), len(inputs)))
+        for col, name in enumerate(inputs):
+            if name not in self.excitations:
+                raise ValueError(f"Unknown source {name} not in the system")
+            for row, sign in self.excitations[name]:
+                B[row, col] += sign
+
+        return B, inputs
+
+    def solveTransferMatrix(self, frequencies:list, outputs:list|None = None, inputs:list|None = None, strategy:str = "auto"):
+        """Solve the transfer functions from every source to every output in one sweep.
+
+        All excitation columns are solved with a single factorization per
+        frequency, instead of one sweep per source.
+
+        Args:
+            frequencies (list): list with frequencies for which to solve the system
+            outputs (list): names of the unknowns, None for all of get_unknowns_as_strings()
+            inputs (list): names of the sources, None for all V and I sources
+            strategy (str): sweep solver, see Frequency_Sweep.SWEEP_STRATEGIES ("auto" picks one)
+
+        Returns:
+            H(array): complex transfer matrix H[output, input, f], NaN at singular frequencies
+            outputs(list): names of the outputs (first axis)
+            inputs(list): names of the sources (second axis)
+
+        """
+        if outputs is None:
+            outputs = self.get_unknowns_as_strings()
+
+        for name in outputs:
+            if name not in self.unknown_names:
+                raise ValueError(f"Unknown variable {name} not in the system")
+
+        if self._z_override:
+            warnings.warn("The excitation vector has been replaced, the transfer matrix uses the source stamps.")
+
+        B, inputs = self.get_excitation_matrix(inputs)
+        G, C, _ = self.get_numeric_system(sparse_matrices=True)
+
+        solver = get_sweep_solver(strategy, G, C, len(frequencies))
+        X, _ = solver.solve(frequencies, B)
+
+        idx_out = [self.unknown_names.index(name) for name in outputs]
+        H = np.moveaxis(X[:, idx_out, :], 0, -1)
+
+        return H, outputs, inputs
+
+    def solveSensitivities(self, frequencies:list, unknown_variable:str, strategy:str = "auto"):
+        """Compute the normalized sensitivities of one unknown to every element value.
+
+        Uses the adjoint method: with A x = z and A^T y = e_out, the
+        sensitivity to a parameter p is
+
+            S_p = p/H * dH/dp = 1/H * y^T (p*dz/dp - p*dA/dp * x)
+
+        Every stamp is a multiple of p^exponent, so p*dA/dp is just the
+        exponent times the stamps of p. This needs one factorization and two
+        triangular solves per frequency for all parameters together.
+
+        Args:
+            frequencies (list): list with frequencies for which to solve the system
+            unknown_variable (str): variable of which the sensitivities are computed
+            strategy (str): "auto", "sparse" or "loop", QZ and batched solves fall back to "loop"
+
+        Returns:
+            H(array): solution of the unknown, NaN at singular frequencies
+            sensitivities(dict): normalized sensitivity arrays, keyed like value_dict
+
+        """
+        if unknown_variable not in self.unknown_names:
+            raise ValueError(f"Unknown variable {unknown_variable} not in the system")
+
+        if self._A_override or self._z_override:
+            raise ValueError("Sensitivities need the stamped system, but A or z have been replaced")
+
+        value_dict = None if self.numeric else self.value_dict
+        names = [str(key) for key in self.value_dict]
+        name_index = {name: idx for idx, name in enumerate(names)}
+
+        G, C, z_num = self.get_numeric_system(sparse_matrices=True)
+        out = self.unknown_names.index(unknown_variable)
+        e_out = np.zeros(len(self.unknown_names))
+        e_out[out] = 1
+
+        solver = get_sweep_solver(strategy, G, C)
+        X, Y, singular = solver.solve_adjoint(frequencies, z_num, e_out)
+        s_values = solver.to_s(frequencies)
+
+        # y^T * p*dA/dp * x, summed per parameter over its stamps
+        stamps = self.stamps
+        tagged = [k for k, param in enumerate(stamps.params) if param is not None]
+        rows = np.array([stamps.rows[k] for k in tagged], dtype=int)
+        cols = np.array([stamps.cols[k] for k in tagged], dtype=int)
+        orders = np.array([stamps.orders[k] for k in tagged], dtype=int)
+        weights = StampAssembler.evaluate([stamps.values[k] for k in tagged], value_dict)
+        weights *= [stamps.params[k][1] for k in tagged]
+        owners = [name_index[stamps.params[k][0]] for k in tagged]
+
+        terms = weights * Y[:, rows] * X[:, cols] * s_values[:, None] ** orders
+        dA = np.zeros((len(s_values), len(names)), dtype=complex)
+        np.add.at(dA.T, owners, terms.T)
+
+        # y^T * p*dz/dp
+        tagged = [k for k, param in enumerate(stamps.rhs_params) if param is not None]
+        rows = np.array([stamps.rhs_rows[k] for k in tagged], dtype=int)
+        weights = StampAssembler.evaluate([stamps.rhs_values[k] for k in tagged], value_dict)
+        weights *= [stamps.rhs_params[k][1] for k in tagged]
+        owners = [name_index[stamps.rhs_params[k][0]] for k in tagged]
+
+        dz = np.zeros((len(s_values), len(names)), dtype=complex)
+        np.add.at(dz.T, owners, (weights * Y[:, rows]).T)
+
+        H = X[:, out]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            S = (dz - dA) / H[:, None]
+        S[singular] = np.nan
+
+        return H, {key: S[:, idx] for idx, key in enumerate(self.value_dict)}
 
-        return H
-    
     def get_System_Inputs(self):
         """Get the input variables of the system.
 
@@ -530,7 +1186,6 @@ class ModifiedNodalAnalysis(EquationFormulator):
         z_modified = self.z.copy()
         
         for idx, element in enumerate(z_modified):
-            element = element * new_value[idx]
-                
+            z_modified[idx] = element * new_value[idx]
         
         return z_modified
\ No newline at end of file
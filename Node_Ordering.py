@@ -0,0 +1,112 @@
+"""Defines fill reducing orderings of the unknowns of an equation system.
+"""
+import heapq
+import numpy as np
+import scipy.sparse as sparse
+from scipy.sparse.csgraph import reverse_cuthill_mckee
+import logging
+logger = logging.getLogger(__name__)
+
+
+def symmetric_pattern(pattern):
+    """Return the structure of A + A^T without the diagonal as CSR matrix.
+
+    Args:
+        pattern (sparse matrix): structural nonzeros of the system matrix
+
+    Returns:
+        csr_matrix: symmetric 0/1 pattern
+
+    """
+    pattern = sparse.csr_matrix(pattern, dtype=float)
+    pattern.data[:] = 1
+    symmetric = (pattern + pattern.T).tocsr()
+    symmetric.setdiag(0)
+    symmetric.eliminate_zeros()
+    symmetric.data[:] = 1
+    return symmetric
+
+
+def no_ordering(pattern):
+    """Keep the order of the unknowns."""
+    return np.arange(pattern.shape[0])
+
+
+def rcm_ordering(pattern):
+    """Reverse Cuthill-McKee ordering, keeps the entries close to the diagonal.
+
+    Args:
+        pattern (sparse matrix): structural nonzeros of the system matrix
+
+    Returns:
+        array: new order, entry k is the old index of the unknown at position k
+
+    """
+    return np.asarray(reverse_cuthill_mckee(symmetric_pattern(pattern), symmetric_mode=True))
+
+
+def minimum_degree_ordering(pattern):
+    """Minimum degree ordering on the graph of A + A^T.
+
+    The unknown with the fewest neighbours is eliminated next, its
+    neighbours become a clique (the fill-in of the elimination). Ties are
+    broken by the original index, so the ordering is deterministic.
+
+    Args:
+        pattern (sparse matrix): structural nonzeros of the system matrix
+
+    Returns:
+        array: new order, entry k is the old index of the unknown at position k
+
+    """
+    symmetric = symmetric_pattern(pattern)
+    n = symmetric.shape[0]
+    adjacency = [set(symmetric.indices[symmetric.indptr[i]:symmetric.indptr[i + 1]]) for i in range(n)]
+
+    heap = [(len(neighbours), i) for i, neighbours in enumerate(adjacency)]
+    heapq.heapify(heap)
+    eliminated = [False] * n
+    order = []
+
+    while heap:
+        degree, node = heapq.heappop(heap)
+        if eliminated[node] or degree != len(adjacency[node]):
+            continue
+        eliminated[node] = True
+        order.append(node)
+
+        neighbours = adjacency[node]
+        for other in neighbours:
+            adjacency[other].discard(node)
+            adjacency[other] |= neighbours - {other}
+            heapq.heappush(heap, (len(adjacency[other]), other))
+        adjacency[node] = set()
+
+    return np.array(order, dtype=int)
+
+
+ORDERINGS = {
+    "none": no_ordering,
+    "rcm": rcm_ordering,
+    "min_degree": minimum_degree_ordering,
+}
+
+
+def get_ordering(method:str, pattern):
+    """Compute the order of the unknowns for an ordering method.
+
+    Args:
+        method (str): name of the ordering, see ORDERINGS
+        pattern (sparse matrix): structural nonzeros of the system matrix
+
+    Returns:
+        array: new order, entry k is the old index of the unknown at position k
+
+    """
+    if method not in ORDERINGS:
+        raise ValueError(f"Unknown ordering: {method}")
+
+    order = ORDERINGS[method](pattern)
+    logger.debug(f"Ordered {len(order)} unknowns with {method}")
+
+    return order
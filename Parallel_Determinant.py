@@ -0,0 +1,229 @@
+"""Defines the parallel cofactor expansion of the determinants of Cramer's rule.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+import sympy as sp
+from sympy.polys.matrices import DomainMatrix
+from Equation_Formulator import EquationFormulator
+import logging
+logger = logging.getLogger(__name__)
+
+# ground domains which can be rebuilt in a worker process
+GROUND_DOMAINS = {"ZZ": sp.ZZ, "QQ": sp.QQ, "RR": sp.RR}
+
+
+def encode_domain(domain):
+    """Return a picklable description of a domain.
+
+    The polynomial rings of sympy can not be pickled, so only the name of the
+    ground domain and the names of the generators are sent to the workers.
+
+    Args:
+        domain (Domain): domain of the system
+
+    Returns:
+        tuple: (name of the ground domain, names of the generators)
+
+    Raises:
+        ValueError: the ground domain can not be rebuilt in a worker
+
+    """
+    if domain.is_PolynomialRing:
+        ground, symbols = domain.domain, tuple(str(symbol) for symbol in domain.symbols)
+    else:
+        ground, symbols = domain, ()
+
+    if str(ground) not in GROUND_DOMAINS:
+        raise ValueError(f"Domain {domain} is not supported by the parallel expansion")
+
+    return str(ground), symbols
+
+
+def decode_domain(key:tuple):
+    """Rebuild a domain from encode_domain().
+
+    Args:
+        key (tuple): (name of the ground domain, names of the generators)
+
+    Returns:
+        Domain: the domain of the system
+
+    """
+    ground, symbols = key
+    ground = GROUND_DOMAINS[ground]
+    if not symbols:
+        return ground
+    return ground[sp.symbols(symbols)]
+
+
+def encode_value(domain, value):
+    """Convert a domain element to a polynomial dict of picklable coefficients.
+
+    Args:
+        domain (Domain): domain of the element
+        value (DomainElement): polynomial or number
+
+    Returns:
+        dict: monomial exponents -> coefficient
+
+    """
+    terms = dict(value) if domain.is_PolynomialRing else {(): value}
+    if (domain.domain if domain.is_PolynomialRing else domain).is_RR:
+        # the mpmath floats of RR do not survive pickling
+        terms = {monom: float(coeff) for monom, coeff in terms.items()}
+    return terms
+
+
+def decode_value(domain, terms:dict):
+    """Convert a polynomial dict of encode_value() back to a domain element.
+
+    Args:
+        domain (Domain): domain of the element
+        terms (dict): monomial exponents -> coefficient
+
+    Returns:
+        DomainElement: polynomial or number
+
+    """
+    if domain.is_PolynomialRing:
+        ground = domain.domain
+        return domain.ring.from_dict({monom: ground.convert(coeff) for monom, coeff in terms.items()})
+    return domain.convert(terms.get((), 0))
+
+
+def minor_determinant(domain_key:tuple, entries:dict, size:int):
+    """Compute the determinant of one minor, runs in the worker processes.
+
+    Args:
+        domain_key (tuple): domain of the entries, see encode_domain()
+        entries (dict): row -> column -> polynomial dict of the minor
+        size (int): number of rows of the minor
+
+    Returns:
+        dict: polynomial dict of the determinant
+
+    """
+    domain = decode_domain(domain_key)
+    if size == 0:
+        return encode_value(domain, domain.one)
+
+    dod = {
+        row: {col: decode_value(domain, terms) for col, terms in cols.items()}
+        for row, cols in entries.items()
+    }
+    # the zero rhs column is not used, the last pivot is the determinant
+    _, D = EquationFormulator.fractionFreeDeterminants(DomainMatrix(dod, (size, size + 1), domain), size - 1)
+
+    return encode_value(domain, D)
+
+
+def expand_minors(system:DomainMatrix, idx:int, tasks:int, min_size:int=4):
+    """Split the two determinants of Cramer's rule into weighted minors.
+
+    Both determinants are expanded along the column of the unknown: det(A)
+    with the entries of A, the numerator with the entries of z, the minors
+    are the same. The minors are expanded further along their sparsest
+    column until there are enough of them. Minors which delete the same rows
+    and columns are merged by adding their weights.
+
+    Args:
+        system (DomainMatrix): augmented system [A | z]
+        idx (int): index of the unknown to solve for
+        tasks (int): number of minors to aim for
+        min_size (int): minors of this size are not split any further
+
+    Returns:
+        dict: (deleted rows, deleted columns) -> [weight in N, weight in D]
+
+    """
+    n = system.shape[0]
+    domain = system.domain
+    columns = {}
+    for row, cols in system.to_dod().items():
+        for col, value in cols.items():
+            columns.setdefault(col, {})[row] = value
+
+    leaves = {}
+    for row in set(columns.get(idx, {})) | set(columns.get(n, {})):
+        sign = -1 if (row + idx) % 2 else 1
+        leaves[((row,), (idx,))] = [
+            sign * columns.get(n, {}).get(row, domain.zero),
+            sign * columns.get(idx, {}).get(row, domain.zero),
+        ]
+
+    size = n - 1
+    while 0 < len(leaves) < tasks and size > min_size:
+        expanded = {}
+        for (deleted_rows, deleted_cols), weights in leaves.items():
+            remaining_cols = [col for col in range(n) if col not in deleted_cols]
+            # sparsest column of the minor, fewest new minors
+            col = min(
+                remaining_cols,
+                key=lambda c: sum(1 for row in columns.get(c, {}) if row not in deleted_rows),
+            )
+            q = remaining_cols.index(col)
+            for row, value in columns.get(col, {}).items():
+                if row in deleted_rows:
+                    continue
+                p = row - sum(1 for deleted in deleted_rows if deleted < row)
+                factor = -value if (p + q) % 2 else value
+                key = (tuple(sorted(deleted_rows + (row,))), tuple(sorted(deleted_cols + (col,))))
+                merged = expanded.setdefault(key, [domain.zero, domain.zero])
+                merged[0] += factor * weights[0]
+                merged[1] += factor * weights[1]
+        leaves = {key: weights for key, weights in expanded.items() if weights[0] or weights[1]}
+        size -= 1
+
+    return leaves
+
+
+def parallel_fraction_free_solve(system:DomainMatrix, idx:int, workers:int|None=None, tasks:int|None=None):
+    """Solve for a single unknown with Cramer's rule, the minors are eliminated in parallel.
+
+    The result is the same as EquationFormulator.fractionFreeSolve(), the
+    determinants are split into minors with expand_minors(), every minor is
+    eliminated fraction-free in a ProcessPoolExecutor and the weighted
+    determinants are added up again in the polynomial ring.
+
+    Args:
+        system (DomainMatrix): augmented system [A | z] over a polynomial ring (or a field)
+        idx (int): index of the unknown to solve for
+        workers (int): number of processes, None for all cores
+        tasks (int): number of minors to aim for, None for four per worker
+
+    Returns:
+        N(sp.Expr): numerator determinant
+        D(sp.Expr): system determinant
+
+    """
+    domain = system.domain
+    domain_key = encode_domain(domain)
+    workers = workers or os.cpu_count() or 1
+    tasks = tasks or 4 * workers
+
+    leaves = expand_minors(system, idx, tasks)
+    logger.debug(f"Split the determinants into {len(leaves)} minors for {workers} workers")
+
+    dod = system.to_dod()
+    n = system.shape[0]
+    jobs = []
+    for deleted_rows, deleted_cols in leaves:
+        rows = [row for row in range(n) if row not in deleted_rows]
+        cols = {col: k for k, col in enumerate(c for c in range(n) if c not in deleted_cols)}
+        entries = {}
+        for i, row in enumerate(rows):
+            minor_row = {cols[col]: encode_value(domain, value) for col, value in dod.get(row, {}).items() if col in cols}
+            if minor_row:
+                entries[i] = minor_row
+        jobs.append((entries, len(rows)))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(minor_determinant, domain_key, entries, size) for entries, size in jobs]
+        determinants = [decode_value(domain, future.result()) for future in futures]
+
+    N, D = domain.zero, domain.zero
+    for (weight_N, weight_D), determinant in zip(leaves.values(), determinants):
+        N += weight_N * determinant
+        D += weight_D * determinant
+
+    return domain.to_sympy(N), domain.to_sympy(D)
@@ -0,0 +1,190 @@
+"""Defines the normal form N(s)/D(s) of symbolic results as coefficient lists in s.
+"""
+import numpy as np
+import sympy as sp
+from Compiled_Evaluator import compile_expression
+import logging
+logger = logging.getLogger(__name__)
+
+
+def polynomial_coefficients(polynomial:sp.Expr, s:sp.Symbol):
+    """Return the coefficients of a polynomial in s.
+
+    Args:
+        polynomial (sp.Expr): polynomial in s, the coefficients may contain other symbols
+        s (sp.Symbol): variable of the polynomial
+
+    Returns:
+        list: coefficients of s^0, s^1, ... (ascending powers)
+
+    Raises:
+        ValueError: the expression is no polynomial in s
+
+    """
+    polynomial = sp.expand(polynomial)
+    coefficients = {}
+    for term in sp.Add.make_args(polynomial):
+        coeff, power = term.as_independent(s, as_Add=False)
+        if power == 1:
+            k = 0
+        elif power == s:
+            k = 1
+        elif power.is_Pow and power.base == s and power.exp.is_Integer and power.exp > 0:
+            k = int(power.exp)
+        else:
+            raise ValueError(f"{term} is no term of a polynomial in {s}")
+        coefficients.setdefault(k, []).append(coeff)
+
+    if not coefficients:
+        return [sp.S.Zero]
+
+    return [sp.Add(*coefficients.get(k, [])) for k in range(max(coefficients) + 1)]
+
+
+def ring_coefficients(domain, polynomial, s:sp.Symbol):
+    """Return the coefficients of a polynomial ring element in s.
+
+    The monomials are grouped by their exponent of s directly in the ring,
+    without expanding a sympy expression.
+
+    Args:
+        domain (Domain): polynomial ring (or field) of the element
+        polynomial (DomainElement): element of the domain
+        s (sp.Symbol): variable of the polynomial
+
+    Returns:
+        list: coefficients of s^0, s^1, ... (ascending powers) as sympy expressions
+
+    """
+    if not domain.is_PolynomialRing or s not in domain.symbols:
+        return [domain.to_sympy(polynomial)]
+
+    ring = domain.ring
+    k_s = domain.symbols.index(s)
+    groups = {}
+    for monom, coeff in polynomial.items():
+        rest = monom[:k_s] + (0,) + monom[k_s + 1:]
+        groups.setdefault(monom[k_s], {})[rest] = coeff
+
+    if not groups:
+        return [sp.S.Zero]
+
+    return [
+        domain.to_sympy(ring.from_dict(groups[k])) if k in groups else sp.S.Zero
+        for k in range(max(groups) + 1)
+    ]
+
+
+def horner(coefficients:list, x):
+    """Evaluate a polynomial with Horner's method.
+
+    Args:
+        coefficients (list): coefficients of x^0, x^1, ... (scalars or arrays broadcast against x)
+        x (array): values of the variable
+
+    Returns:
+        array: values of the polynomial
+
+    """
+    result = np.zeros_like(x) + coefficients[-1]
+    for coeff in reversed(coefficients[:-1]):
+        result = result * x + coeff
+    return result
+
+
+class RationalFunction:
+    """Normal form N(s)/D(s) of a symbolic result.
+
+    Numerator and denominator are kept as lists of symbolic coefficients of
+    the powers of s. For a sweep the element values are substituted once per
+    coefficient, the polynomials in s are then evaluated with Horner's method
+    over all frequencies.
+
+    """
+
+    def __init__(self, numerator:list, denominator:list, s:sp.Symbol|None=None):
+        """Innitialize the rational function.
+
+        Args:
+            numerator (list): coefficients of s^0, s^1, ... of N
+            denominator (list): coefficients of s^0, s^1, ... of D
+            s (sp.Symbol): variable of the polynomials
+
+        """
+        self.numerator = list(numerator)
+        self.denominator = list(denominator)
+        self.s = s or sp.symbols("s")
+        # (symbols, evaluator) of the coefficients, compiled on first use
+        self._compiled = None
+
+    @classmethod
+    def from_expression(cls, expression:sp.Expr, s:sp.Symbol|None=None):
+        """Bring a (nested) rational expression into the normal form.
+
+        Args:
+            expression (sp.Expr): rational function in s
+            s (sp.Symbol): variable of the polynomials
+
+        Returns:
+            RationalFunction: normal form of the expression
+
+        """
+        s = s or sp.symbols("s")
+        N, D = sp.fraction(sp.together(expression))
+        return cls(polynomial_coefficients(N, s), polynomial_coefficients(D, s), s)
+
+    def as_expr(self):
+        """Return N(s)/D(s) as sympy expression."""
+        N = sp.Add(*[coeff * self.s**k for k, coeff in enumerate(self.numerator)])
+        D = sp.Add(*[coeff * self.s**k for k, coeff in enumerate(self.denominator)])
+        return N / D
+
+    def degrees(self):
+        """Return the degrees in s of numerator and denominator."""
+        return len(self.numerator) - 1, len(self.denominator) - 1
+
+    def numeric_coefficients(self, value_dict:dict):
+        """Substitute the element values into the coefficients.
+
+        Args:
+            value_dict (dict): symbol -> value of the element symbols (scalars or arrays)
+
+        Returns:
+            N(list): numeric coefficients of s^0, s^1, ... of N
+            D(list): numeric coefficients of s^0, s^1, ... of D
+
+        Raises:
+            ValueError: a symbol of the coefficients has no value
+
+        """
+        if self._compiled is None:
+            coefficients = sp.ImmutableMatrix(self.numerator + self.denominator)
+            symbols = tuple(sorted(coefficients.free_symbols, key=str))
+            # the coefficients are expanded sums of products, cse finds little and costs a lot
+            self._compiled = symbols, compile_expression(coefficients, symbols, cse=False)
+        symbols, evaluator = self._compiled
+
+        missing = [symbol for symbol in symbols if symbol not in value_dict]
+        if missing:
+            raise ValueError(f"No values for {missing}")
+
+        values = evaluator(*(value_dict[symbol] for symbol in symbols))
+        values = list(values[:, 0])
+
+        return values[:len(self.numerator)], values[len(self.numerator):]
+
+    def evaluate(self, frequencies, value_dict:dict):
+        """Evaluate the rational function at s = j*2*pi*f.
+
+        Args:
+            frequencies (array): frequencies in Hz
+            value_dict (dict): symbol -> value of the element symbols, arrays must broadcast against the frequencies
+
+        Returns:
+            array: complex values of N(s)/D(s)
+
+        """
+        N, D = self.numeric_coefficients(value_dict)
+        jw = 2j * np.pi * np.asarray(frequencies, dtype=float)
+
+        return horner(N, jw) / horner(D, jw)
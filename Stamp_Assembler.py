@@ -0,0 +1,296 @@
+"""Defines a triplet based stamp collector for the equation formulators.
+"""
+import sympy as sp
+import numpy as np
+import scipy.sparse as sparse
+from sympy.polys.matrices import DomainMatrix
+
+
+class StampAssembler:
+    """Collects matrix and right hand side stamps as sparse triplets.
+
+    Every stamp is appended as a (row, col, value) triplet in O(1). Entries
+    that get stamped more than once are summed up only when a matrix is
+    assembled, so building a system is linear in the number of stamps.
+
+    Each stamp also carries the power of s it gets multiplied with, so the
+    system can be assembled as the numeric pencil A(s) = G + s*C as well.
+    Stamps which depend on an element value can be tagged with the name of
+    the element and the exponent of the value (1/R -> -1), which gives
+    p * dA/dp for the sensitivity analysis.
+
+    """
+
+    def __init__(self, size:int):
+        """Initialize an empty collector.
+
+        Args:
+            size (int): Number of rows/columns of the square system matrix.
+
+        """
+        self.size = size
+
+        self.rows = []
+        self.cols = []
+        self.values = []
+        self.orders = []
+        self.params = []
+
+        self.rhs_rows = []
+        self.rhs_values = []
+        self.rhs_params = []
+
+    def __len__(self):
+        return len(self.values)
+
+    def add(self, row:int, col:int, value, order:int=0, param:tuple|None=None):
+        """Add a stamp to the system matrix.
+
+        Args:
+            row (int): zero based row index
+            col (int): zero based column index
+            value: value which gets added to the entry
+            order (int): power of s the value gets multiplied with
+            param (tuple): (name, exponent) of the element value in the stamp, None for constant stamps
+
+        """
+        self.rows.append(row)
+        self.cols.append(col)
+        self.values.append(value)
+        self.orders.append(order)
+        self.params.append(param)
+
+    def add_rhs(self, row:int, value, param:tuple|None=None):
+        """Add a stamp to the right hand side vector.
+
+        Args:
+            row (int): zero based row index
+            value: value which gets added to the entry
+            param (tuple): (name, exponent) of the element value in the stamp, None for constant stamps
+
+        """
+        self.rhs_rows.append(row)
+        self.rhs_values.append(value)
+        self.rhs_params.append(param)
+
+    def entries(self):
+        """Group the matrix stamps by position.
+
+        Returns:
+            dict: mapping (row, col) -> list of stamped values
+
+        """
+        s = sp.symbols("s")
+
+        grouped = {}
+        for row, col, value, order in zip(self.rows, self.cols, self.values, self.orders):
+            grouped.setdefault((row, col), []).append(value * s**order)
+
+        return grouped
+
+    def term_counts(self):
+        """Count the symbolic terms of every entry without assembling it.
+
+        Stamps of the same element (or the constant +-1 stamps) at the same
+        position and power of s form one term.
+
+        Returns:
+            dict: mapping (row, col) -> [terms of s^0, terms of s^1]
+
+        """
+        terms = {}
+        for row, col, order, param in zip(self.rows, self.cols, self.orders, self.params):
+            terms.setdefault((row, col), [set(), set()])[order].add(param[0] if param else None)
+
+        return {pos: [len(terms_g), len(terms_c)] for pos, (terms_g, terms_c) in terms.items()}
+
+    def pattern(self):
+        """Return the structural nonzeros of the system matrix.
+
+        Returns:
+            csr_matrix: (size, size) matrix with a one at every stamped position
+
+        """
+        positions = set(zip(self.rows, self.cols))
+        rows = [row for row, _ in positions]
+        cols = [col for _, col in positions]
+
+        return sparse.csr_matrix((np.ones(len(positions)), (rows, cols)), shape=(self.size, self.size))
+
+    def permute(self, order):
+        """Reorder the unknowns and equations symmetrically, A -> P A P^T.
+
+        Args:
+            order (list): new order, entry k is the old index of the row/column at position k
+
+        """
+        position = np.empty(self.size, dtype=int)
+        position[np.asarray(order, dtype=int)] = np.arange(self.size)
+
+        self.rows = [int(position[row]) for row in self.rows]
+        self.cols = [int(position[col]) for col in self.cols]
+        self.rhs_rows = [int(position[row]) for row in self.rhs_rows]
+
+    def rhs_entries(self):
+        """Group the right hand side stamps by row.
+
+        Returns:
+            dict: mapping row -> list of stamped values
+
+        """
+        grouped = {}
+        for row, value in zip(self.rhs_rows, self.rhs_values):
+            grouped.setdefault(row, []).append(value)
+
+        return grouped
+
+    def to_matrix(self, sparse:bool=False):
+        """Assemble the symbolic system matrix.
+
+        Args:
+            sparse (bool): return a sp.SparseMatrix instead of a dense sp.Matrix
+
+        Returns:
+            matrix: assembled system matrix
+
+        """
+        data = {}
+        for key, values in self.entries().items():
+            expr = sp.Add(*values)
+            if expr != 0:
+                data[key] = expr
+
+        if sparse:
+            return sp.SparseMatrix(self.size, self.size, data)
+
+        matrix = sp.zeros(self.size, self.size)
+        for (row, col), expr in data.items():
+            matrix[row, col] = expr
+
+        return matrix
+
+    def rhs_to_matrix(self):
+        """Assemble the symbolic right hand side vector.
+
+        Returns:
+            matrix: assembled column vector
+
+        """
+        rhs = sp.zeros(self.size, 1)
+        for row, values in self.rhs_entries().items():
+            rhs[row] = sp.Add(*values)
+
+        return rhs
+
+    def to_domain_matrix(self, rhs=None):
+        """Assemble the augmented system [A | z] as sparse DomainMatrix.
+
+        The domain is constructed from the symbols of the stamps, e.g.
+        ZZ(s,R1,C1) if there are 1/R stamps.
+
+        Args:
+            rhs (sp.Matrix): right hand side to use instead of the stamped one
+
+        Returns:
+            DomainMatrix: (size, size + 1) augmented system matrix
+
+        """
+        data = {}
+        for (row, col), values in self.entries().items():
+            expr = sp.Add(*values)
+            if expr != 0:
+                data.setdefault(row, {})[col] = expr
+
+        if rhs is None:
+            rhs_items = ((row, sp.Add(*values)) for row, values in self.rhs_entries().items())
+        else:
+            rhs_items = enumerate(rhs)
+        for row, expr in rhs_items:
+            if expr != 0:
+                data.setdefault(row, {})[self.size] = expr
+
+        return DomainMatrix.from_dict_sympy(self.size, self.size + 1, data).to_sparse()
+
+    @staticmethod
+    def evaluate(values, value_dict=None):
+        """Evaluate stamp values to numbers.
+
+        Args:
+            values (list): stamp values (numbers or symbolic expressions)
+            value_dict (dict): numeric values of the symbols, None if the values are numeric already
+
+        Returns:
+            array: numeric stamp values
+
+        """
+        if value_dict is None:
+            return np.array(values, dtype=complex)
+
+        return np.array(
+            [complex(value.xreplace(value_dict)) if isinstance(value, sp.Basic) else value for value in values],
+            dtype=complex
+        )
+
+    def to_numpy(self, value_dict=None):
+        """Assemble the numeric matrices of the pencil A(s) = G + s*C.
+
+        Args:
+            value_dict (dict): numeric values of the symbols, None if the stamps are numeric already
+
+        Returns:
+            G(array): frequency independent part of the system matrix
+            C(array): part of the system matrix which gets multiplied with s
+
+        """
+        values = self.evaluate(self.values, value_dict).real
+        rows = np.array(self.rows, dtype=int)
+        cols = np.array(self.cols, dtype=int)
+        orders = np.array(self.orders, dtype=int)
+
+        G = np.zeros((self.size, self.size))
+        C = np.zeros((self.size, self.size))
+
+        np.add.at(G, (rows[orders == 0], cols[orders == 0]), values[orders == 0])
+        np.add.at(C, (rows[orders == 1], cols[orders == 1]), values[orders == 1])
+
+        return G, C
+
+    def to_scipy(self, value_dict=None):
+        """Assemble the numeric matrices of the pencil A(s) = G + s*C as sparse CSC matrices.
+
+        Args:
+            value_dict (dict): numeric values of the symbols, None if the stamps are numeric already
+
+        Returns:
+            G(csc_matrix): frequency independent part of the system matrix
+            C(csc_matrix): part of the system matrix which gets multiplied with s
+
+        """
+        values = self.evaluate(self.values, value_dict).real
+        rows = np.array(self.rows, dtype=int)
+        cols = np.array(self.cols, dtype=int)
+        orders = np.array(self.orders, dtype=int)
+
+        shape = (self.size, self.size)
+        G = sparse.coo_matrix((values[orders == 0], (rows[orders == 0], cols[orders == 0])), shape=shape).tocsc()
+        C = sparse.coo_matrix((values[orders == 1], (rows[orders == 1], cols[orders == 1])), shape=shape).tocsc()
+
+        G.eliminate_zeros()
+        C.eliminate_zeros()
+
+        return G, C
+
+    def rhs_to_numpy(self, value_dict=None):
+        """Assemble the numeric right hand side vector.
+
+        Args:
+            value_dict (dict): numeric values of the symbols, None if the stamps are numeric already
+
+        Returns:
+            array: complex excitation vector
+
+        """
+        z = np.zeros(self.size, dtype=complex)
+        np.add.at(z, np.array(self.rhs_rows, dtype=int), self.evaluate(self.rhs_values, value_dict))
+
+        return z
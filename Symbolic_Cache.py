@@ -0,0 +1,250 @@
+"""Defines a disk cache for symbolic solutions of equation systems.
+"""
+import hashlib
+import json
+import os
+import zlib
+import sympy as sp
+from sympy.polys.matrices import DomainMatrix
+import logging
+logger = logging.getLogger(__name__)
+
+# version of the file format, part of the key
+FORMAT = 1
+
+
+def default_directory():
+    """Return the per-user cache folder of symcirc.
+
+    Returns:
+        str: %LOCALAPPDATA%/symcirc on Windows, $XDG_CACHE_HOME/symcirc (~/.cache/symcirc) elsewhere
+
+    """
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "symcirc")
+
+
+def encode_expression(expression:sp.Expr):
+    """Convert an expression into a list of nodes which can be stored as JSON.
+
+    Only numbers, symbols, sums, products and powers are allowed, shared
+    subexpressions are stored once. Every node refers to its arguments by
+    their index in the list, the last node is the expression.
+
+    Args:
+        expression (sp.Expr): expression to encode
+
+    Returns:
+        list: nodes of the expression
+
+    Raises:
+        TypeError: the expression contains other objects
+
+    """
+    nodes = []
+    index = {}
+    # post-order without recursion, the determinants are deeply nested
+    stack = [(expression, False)]
+    while stack:
+        expr, expanded = stack.pop()
+        if expr in index:
+            continue
+
+        if expr.is_Symbol:
+            node = ["S", expr.name]
+        elif expr.is_Integer:
+            node = ["I", int(expr)]
+        elif expr.is_Rational:
+            node = ["Q", int(expr.p), int(expr.q)]
+        elif expr.is_Float:
+            node = ["F", list(expr._mpf_), expr._prec]
+        elif expr.is_Add or expr.is_Mul or expr.is_Pow:
+            if not expanded:
+                stack.append((expr, True))
+                stack.extend((arg, False) for arg in reversed(expr.args))
+                continue
+            node = ["+" if expr.is_Add else "*" if expr.is_Mul else "^"] + [index[arg] for arg in expr.args]
+        else:
+            raise TypeError(f"{type(expr).__name__} can not be stored in the symbolic cache")
+
+        index[expr] = len(nodes)
+        nodes.append(node)
+
+    return nodes
+
+
+def decode_expression(nodes:list):
+    """Rebuild an expression from encode_expression().
+
+    The arguments keep their stored order, so the expression is not
+    evaluated again.
+
+    Args:
+        nodes (list): nodes of the expression
+
+    Returns:
+        sp.Expr: the expression
+
+    Raises:
+        ValueError: a node is not valid
+
+    """
+    exprs = []
+    for node in nodes:
+        kind, args = node[0], node[1:]
+        if kind == "S":
+            expr = sp.Symbol(str(args[0]))
+        elif kind == "I":
+            expr = sp.Integer(int(args[0]))
+        elif kind == "Q":
+            expr = sp.Rational(int(args[0]), int(args[1]))
+        elif kind == "F":
+            sign, man, exp, bc = (int(value) for value in args[0])
+            expr = sp.Float._new((sign, man, exp, bc), int(args[1]))
+        elif kind == "+":
+            expr = sp.Add(*(exprs[arg] for arg in args), evaluate=False)
+        elif kind == "*":
+            expr = sp.Mul(*(exprs[arg] for arg in args), evaluate=False)
+        elif kind == "^":
+            expr = sp.Pow(*(exprs[arg] for arg in args), evaluate=False)
+        else:
+            raise ValueError(f"Unknown node {kind!r} in the symbolic cache")
+        exprs.append(expr)
+
+    return exprs[-1]
+
+
+class SymbolicCache:
+    """Content addressed disk cache for numerator/denominator pairs.
+
+    The key is the sha256 of the augmented system [A | z] (as DomainMatrix,
+    so the assembled matrix with the scaled equations), the solved unknown
+    and the solve method. Every entry is one file with the zlib compressed
+    JSON of N and D, see encode_expression(). Loading a file never executes
+    code, a file which can not be decoded counts as a miss and is removed.
+    The least recently used files are removed as soon as the directory gets
+    larger than max_bytes.
+
+    """
+
+    def __init__(self, directory:str|None=None, max_bytes:int=64 * 2**20):
+        """Innitialize the cache.
+
+        Args:
+            directory (str): folder of the cache files, created if missing, None for default_directory()
+            max_bytes (int): size limit of all cache files together
+
+        """
+        self.directory = directory or default_directory()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, system:DomainMatrix, unknown:str, method:str):
+        """Return the cache key of a solve.
+
+        Args:
+            system (DomainMatrix): augmented system [A | z]
+            unknown (str): name of the solved unknown
+            method (str): solve method, different methods give different forms of the result
+
+        Returns:
+            str: hex digest
+
+        """
+        digest = hashlib.sha256()
+        digest.update(f"{FORMAT}|{system.domain}|{system.shape}|{unknown}|{method}".encode())
+        for row, cols in sorted(system.to_dod().items()):
+            for col, value in sorted(cols.items()):
+                digest.update(f"|{row},{col}:{value}".encode())
+        return digest.hexdigest()
+
+    def path(self, key:str):
+        """Return the file of a cache entry."""
+        return os.path.join(self.directory, f"{key}.json.z")
+
+    def load(self, key:str):
+        """Return a cached solution.
+
+        Args:
+            key (str): cache key, see key()
+
+        Returns:
+            tuple: (N, D) as sympy expressions, None if the key is not cached
+
+        """
+        path = self.path(key)
+        try:
+            with open(path, "rb") as fp:
+                N, D = json.loads(zlib.decompress(fp.read()))
+            N, D = decode_expression(N), decode_expression(D)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as error:
+            # truncated or foreign file
+            logger.warning(f"Removing unreadable symbolic cache entry {path}: {error!r}")
+            self.misses += 1
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+        # mark as recently used
+        os.utime(path)
+        self.hits += 1
+        logger.debug(f"Symbolic cache hit {key[:12]}")
+        return N, D
+
+    def store(self, key:str, N:sp.Expr, D:sp.Expr):
+        """Store a solution and evict the least recently used entries.
+
+        Args:
+            key (str): cache key, see key()
+            N (sp.Expr): numerator
+            D (sp.Expr): denominator
+
+        """
+        try:
+            data = json.dumps([encode_expression(sp.sympify(N)), encode_expression(sp.sympify(D))], separators=(",", ":"))
+        except TypeError as error:
+            logger.debug(f"Not caching {key[:12]}: {error}")
+            return
+
+        # write and rename, a reader never sees a partial file
+        path = self.path(key)
+        with open(f"{path}.tmp", "wb") as fp:
+            fp.write(zlib.compress(data.encode()))
+        os.replace(f"{path}.tmp", path)
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently used entries until the cache fits into max_bytes.
+
+        """
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".json.z"):
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.directory, name))
+            total -= size
+            logger.debug(f"Evicted {name} from the symbolic cache")
+
+    def clear(self):
+        """Remove all entries of the cache.
+
+        """
+        for name in os.listdir(self.directory):
+            if name.endswith(".json.z"):
+                os.remove(os.path.join(self.directory, name))
@@ -0,0 +1,289 @@
+"""Defines the two-graph (tree enumeration) analysis for admittance and gm-C networks.
+"""
+import sympy as sp
+import netlist.Circuit as Circuit
+import logging as logger
+import numpy as np
+from Equation_Formulator import EquationFormulator
+
+
+class TopologicalAnalysis(EquationFormulator):
+    """Class for the two-graph analysis method.
+
+    Every admittance (R, C, L) is an edge of the current graph and of the
+    voltage graph, a voltage controlled current source is an edge of the
+    current graph between its output nodes and an edge of the voltage graph
+    between its control nodes. The nodal admittance matrix is then
+    Y = A_I * diag(w) * A_V^T with the reduced incidence matrices A_I, A_V and
+    by Binet-Cauchy its determinant is the sum over all common spanning trees:
+
+        det(Y) = sum(det(A_I[:, T]) * det(A_V[:, T]) * prod(w[T]))
+
+    The cofactors are the same sums over the common 2-trees, where the row
+    node is merged with ground in the current graph and the column node in
+    the voltage graph. Every cofactor is a sum of products without any
+    cancelling terms, no matrix has to be eliminated.
+
+    Numerator and denominator are single cofactors, and so cancellation-free,
+    if the input source has a grounded terminal. For a floating input source
+    they are signed sums of cofactors, see solveFraction(), and their common
+    terms cancel when they are added.
+
+    Only R, C, L, G and independent sources are supported, one independent
+    source is the input and all other current sources are left open.
+
+    """
+    ct:Circuit
+    value_dict:dict
+
+    def __init__(self, circuit:Circuit):
+        """Innitialize the class.
+
+        Args:
+            circuit (Circuit): The Circuit to analyze.
+
+        """
+        self.ct = circuit
+        self.value_dict = self.generateValueDict(self.ct)
+        self.s = sp.symbols("s")
+
+        #create mapping for node names to integer values, ground is 0
+        self.node_map = {}
+        used_values = set()
+
+        for node in self.ct.nodes:
+            if (node == "ground") | (node == "0") | (node == "GND") | (node == "gnd"):
+                self.node_map[node] = 0
+                used_values.add(0)
+                continue
+
+            val = 1
+            while val in used_values:
+                val += 1
+            self.node_map[node] = val
+            used_values.add(val)
+
+        self.n = len(used_values - {0})
+        self.unknown_names = [None] * self.n
+        for name, idx in self.node_map.items():
+            if idx != 0:
+                self.unknown_names[idx - 1] = f"V_{name}"
+
+        # edges (name, current graph nodes, voltage graph nodes, weight)
+        self.edges = []
+        # independent sources name -> (type, node1, node2)
+        self.sources = {}
+
+    def get_unknowns_as_strings(self):
+        """Return the node voltages which can be solved for.
+
+        Returns:
+            String (array): names of the node voltages.
+
+        """
+        return list(self.unknown_names)
+
+    def buildGraphs(self):
+        """Build the current and voltage graph from the circuit elements.
+
+        Raises:
+            ValueError: the circuit contains an element which is no admittance or VCCS
+
+        """
+        self.edges = []
+        self.sources = {}
+
+        for element in self.ct.elements:
+            symbol = sp.symbols(element.get_symbol())
+            nodes = [self.node_map[node] for node in element.connections]
+            match element.type:
+                case "R":
+                    self.edges.append((element.name, nodes[:2], nodes[:2], 1 / symbol))
+                case "C":
+                    self.edges.append((element.name, nodes[:2], nodes[:2], self.s * symbol))
+                case "L":
+                    self.edges.append((element.name, nodes[:2], nodes[:2], 1 / (self.s * symbol)))
+                case "G":
+                    self.edges.append((element.name, nodes[:2], nodes[2:4], symbol))
+                case "V" | "I":
+                    self.sources[element.name] = (element.type, nodes[0], nodes[1])
+                case _:
+                    raise ValueError(
+                        f"Element {element.name} of type {element.type} is not supported by the topological analysis"
+                    )
+
+        logger.debug(f"Two-graph with {self.n + 1} nodes and {len(self.edges)} edges")
+
+    def commonTrees(self, merge_current:int=0, merge_voltage:int=0):
+        """Enumerate the common spanning trees of the current and voltage graph.
+
+        The edges are included or excluded one after the other. An edge is
+        only included if it closes no loop in both graphs, it is only
+        excluded if the remaining edges can still span both graphs.
+
+        Args:
+            merge_current (int): node which is merged with ground in the current graph (0 for none)
+            merge_voltage (int): node which is merged with ground in the voltage graph (0 for none)
+
+        Returns:
+            list: (edge indices, sign) of every common tree with nonzero sign
+
+        """
+        size = self.n if merge_current == 0 else self.n - 1
+
+        def vertex(node, merge):
+            return 0 if node == merge else node
+
+        current_edges = [tuple(vertex(node, merge_current) for node in edge[1]) for edge in self.edges]
+        voltage_edges = [tuple(vertex(node, merge_voltage) for node in edge[2]) for edge in self.edges]
+
+        def find(parent, node):
+            while parent[node] != node:
+                node = parent[node]
+            return node
+
+        def spans(edges, merge):
+            parent = list(range(self.n + 1))
+            # the merged node is no vertex of its own
+            components = self.n + 1 - (1 if merge else 0)
+            for p, q in edges:
+                root_p, root_q = find(parent, p), find(parent, q)
+                if root_p != root_q:
+                    parent[root_p] = root_q
+                    components -= 1
+            return components == 1
+
+        trees = []
+        stack = [(0, [], list(range(self.n + 1)), list(range(self.n + 1)))]
+
+        while stack:
+            pos, chosen, parent_i, parent_v = stack.pop()
+            if len(chosen) == size:
+                trees.append(chosen)
+                continue
+            if len(self.edges) - pos < size - len(chosen):
+                continue
+
+            # exclude the edge, if the remaining edges can still span both graphs
+            rest = chosen + list(range(pos + 1, len(self.edges)))
+            if spans((current_edges[i] for i in rest), merge_current) and spans((voltage_edges[i] for i in rest), merge_voltage):
+                stack.append((pos + 1, chosen, parent_i, parent_v))
+
+            # include the edge, if it closes no loop
+            (p, q), (k, l) = current_edges[pos], voltage_edges[pos]
+            root_p, root_q = find(parent_i, p), find(parent_i, q)
+            root_k, root_l = find(parent_v, k), find(parent_v, l)
+            if root_p != root_q and root_k != root_l:
+                parent_i, parent_v = list(parent_i), list(parent_v)
+                parent_i[root_p] = root_q
+                parent_v[root_k] = root_l
+                stack.append((pos + 1, chosen + [pos], parent_i, parent_v))
+
+        return [(tree, self.treeSign(tree, merge_current, merge_voltage)) for tree in trees]
+
+    def treeSign(self, tree:list, merge_current:int=0, merge_voltage:int=0):
+        """Return det(A_I[:, T]) * det(A_V[:, T]) of a common tree.
+
+        Args:
+            tree (list): edge indices of the tree
+            merge_current (int): node deleted from the current incidence matrix (0 for none)
+            merge_voltage (int): node deleted from the voltage incidence matrix (0 for none)
+
+        Returns:
+            int: +1 or -1
+
+        """
+        def incidence(graph, merge):
+            rows = [node for node in range(1, self.n + 1) if node != merge]
+            matrix = np.zeros((len(rows), len(tree)))
+            for col, idx in enumerate(tree):
+                p, q = self.edges[idx][graph]
+                if p in rows:
+                    matrix[rows.index(p), col] += 1
+                if q in rows:
+                    matrix[rows.index(q), col] -= 1
+            return matrix
+
+        if not tree:
+            return 1
+
+        return int(round(np.linalg.det(incidence(1, merge_current)) * np.linalg.det(incidence(2, merge_voltage))))
+
+    def cofactor(self, row:int=0, col:int=0):
+        """Return a cofactor of the nodal admittance matrix as sum over common trees.
+
+        Args:
+            row (int): node of the deleted row (0 for the determinant itself)
+            col (int): node of the deleted column (0 for the determinant itself)
+
+        Returns:
+            sp.Expr: (-1)^(row+col) * det(Y without row and col)
+
+        """
+        terms = [
+            sign * sp.Mul(*[self.edges[idx][3] for idx in tree])
+            for tree, sign in self.commonTrees(row, col)
+        ]
+        return (-1) ** (row + col) * sp.Add(*terms)
+
+    def solveFraction(self, unknown_variable:str, source:str|None=None):
+        """Solve for a node voltage as numerator/denominator pair.
+
+        A current source injects into node q: V_b = I * (C_qb - C_pb) / det(Y).
+        A voltage source sets V_p - V_q, so the current it drives cancels:
+        V_b = V * (C_pb - C_qb) / (C_pp - C_pq - C_qp + C_qq).
+        The cofactors of a grounded node are zero, so for an input with a
+        grounded terminal N and D are single cofactors without cancellation.
+
+        Args:
+            unknown_variable (str): node voltage to solve for
+            source (str): name of the input source, None if there is only one
+
+        Returns:
+            N(sp.Expr): numerator sum of products
+            D(sp.Expr): denominator sum of products
+
+        Raises:
+            ValueError: unknown node voltage or ambiguous input source
+
+        """
+        if unknown_variable not in self.unknown_names:
+            raise ValueError("Unknown variable not in the system")
+        out = self.unknown_names.index(unknown_variable) + 1
+
+        if source is None:
+            if len(self.sources) != 1:
+                raise ValueError(f"Select one of the input sources {list(self.sources)}")
+            source = next(iter(self.sources))
+        source_type, p, q = self.sources[source]
+
+        voltage_sources = [name for name, (kind, _, _) in self.sources.items() if kind == "V" and name != source]
+        if voltage_sources:
+            raise ValueError(f"Voltage sources {voltage_sources} besides the input are not supported")
+
+        def cofactor(row, col):
+            return self.cofactor(row, col) if row != 0 and col != 0 else sp.S.Zero
+
+        symbol = sp.symbols(source)
+        if source_type == "I":
+            N = symbol * (cofactor(q, out) - cofactor(p, out))
+            D = self.cofactor()
+        else:
+            N = symbol * (cofactor(p, out) - cofactor(q, out))
+            D = cofactor(p, p) - cofactor(p, q) - cofactor(q, p) + cofactor(q, q)
+
+        return N, D
+
+    def solve(self, unknown_variable:str, source:str|None=None):
+        """Return the transfer function of a node voltage.
+
+        Args:
+            unknown_variable (str): node voltage to solve for
+            source (str): name of the input source, None if there is only one
+
+        Returns:
+            sp.Expr: N / D as returned by solveFraction()
+
+        """
+        N, D = self.solveFraction(unknown_variable, source)
+        return N / D
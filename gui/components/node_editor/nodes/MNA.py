@@ -8,6 +8,7 @@ from gui.components.node_editor.nodes.Node import Node, NodeType
 from gui.windows.MNAEditor import MNAEditor
 from netlist.Circuit import Circuit
 from Modified_Node_Analysis import ModifiedNodalAnalysis
+from Symbolic_Cache import SymbolicCache
 
 
 class MNA(Node):
@@ -20,6 +21,18 @@ class MNA(Node):
         self.add_input_pin("circuit_input_pin", "Connect Circuit here")
 
         with self.add_static_attr():
+            dpg.add_checkbox(
+                label="Numeric only",
+                default_value=self.data.get("numeric_only", False),
+                tag=self.uuid("numeric_only")
+            )
+            dpg.add_input_text(
+                label="Symbols",
+                hint="all elements",
+                default_value=self.data.get("symbolic", ""),
+                tag=self.uuid("symbolic"),
+                width=150,
+            )
             dpg.add_button(label="Calculate Numeric Values", callback=self.update)
 
         super().build()
@@ -40,7 +53,15 @@ class MNA(Node):
         pass
 
     def update(self):
-        self.mna = ModifiedNodalAnalysis(self.circuit)
+        self.data["numeric_only"] = dpg.get_value(self.uuid("numeric_only"))
+
+        self.data["symbolic"] = dpg.get_value(self.uuid("symbolic"))
+        # comma separated element symbols, empty keeps every element symbolic
+        symbolic = [name.strip() for name in self.data["symbolic"].split(",") if name.strip()] or None
+
+        self.mna = ModifiedNodalAnalysis(self.circuit, numeric=self.data["numeric_only"], symbolic=symbolic)
+        # reloaded pipelines solve the same systems again
+        self.mna.cache = SymbolicCache()
         self.mna.buildEquationsSystem()
 
         # get the log_space from the circuit
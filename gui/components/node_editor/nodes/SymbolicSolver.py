@@ -2,6 +2,7 @@ import dearpygui.dearpygui as dpg
 import sympy as sp
 
 from gui.components.node_editor.nodes.Node import Node, NodeType
+from Compiled_Evaluator import evaluate_transfer_function
 from typing import Literal, List
 from pydantic import Field
 
@@ -12,6 +13,7 @@ class SymbolicSolver(Node):
 
     transfer_function: List[float] = Field(default_factory=list, exclude=True)
     sweep: List[float] = Field(default_factory=list, exclude=True)
+    value_dict: dict = Field(default_factory=dict, exclude=True)
 
     def build(self):
         self.add_input_pin("h_input_pin", "Connect H here")
@@ -25,7 +27,7 @@ class SymbolicSolver(Node):
         return ["bode_plot"]
 
     def onlink_callback(self):
-        self.transfer_function, self.sweep = self.get_input_pin_value("h_input_pin", ([], []))
+        self.transfer_function, self.sweep, self.value_dict = self.get_input_pin_value("h_input_pin", ([], [], {}))
 
         super().onlink_callback()
 
@@ -35,14 +37,15 @@ class SymbolicSolver(Node):
         print("started calculating the numeric values")
 
 
-        s = sp.symbols("s")
+        if isinstance(self.transfer_function, sp.Basic):
+            # compiled once per expression, shared subterms are evaluated once,
+            # the sweep is in Hz like in solveNumerical (s = j*2*pi*f)
+            H_eval = evaluate_transfer_function(self.transfer_function, self.sweep, self.value_dict)
+        else:
+            H_eval = np.asarray(self.transfer_function)
 
-        H_lambdified = sp.lambdify(s, self.transfer_function, "numpy")
-        jw = 1j * np.array(self.sweep)
-        H_eval = H_lambdified(jw)
-
-        magnitude = 20 * np.log10(np.abs(H_eval)).flatten.tolist()
-        phase_deg = np.unwrap(np.angle(self.transfer_function, deg=True), axis=0).flatten().tolist()
+        magnitude = 20 * np.log10(np.abs(H_eval)).flatten().tolist()
+        phase_deg = np.degrees(np.unwrap(np.angle(H_eval), axis=0)).flatten().tolist()
 
         print("finished")
 
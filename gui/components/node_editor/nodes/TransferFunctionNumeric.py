@@ -3,7 +3,7 @@ from pydantic import Field
 
 from gui.components.node_editor.nodes.Node import Node, NodeType
 from Modified_Node_Analysis import ModifiedNodalAnalysis
-from typing import Literal, List
+from typing import Literal, List, Any
 from netlist.Circuit import Circuit
 from Equation_Formulator import EquationFormulator
 
@@ -13,6 +13,10 @@ class TransferFunctionNumeric(Node):
     mna: ModifiedNodalAnalysis = Field(default=None, exclude=True)
     sweep: str = Field(default="None", exclude=True)
 
+    # solution of all unknowns, so switching the output node needs no new solve
+    result: Any = Field(default=None, exclude=True)
+    result_sweep: str = Field(default="", exclude=True)
+
     def build(self):
         self.add_input_pin("num_results_input_pin", "Connect Circuit here")
 
@@ -21,7 +25,7 @@ class TransferFunctionNumeric(Node):
             # add selection for the transfer-function
             with dpg.group(horizontal=True):
                 dpg.add_text("Output Node")
-                dpg.add_combo(items=[], tag=self.uuid("output_node"), width=100)
+                dpg.add_combo(items=[], tag=self.uuid("output_node"), width=100, callback=self.on_output_changed)
             dpg.add_button(label="Calculate Numeric Values", callback=self.update)
 
             dpg.add_text("Complexity Estimations", tag=self.uuid("compl_estimate"))
@@ -37,6 +41,7 @@ class TransferFunctionNumeric(Node):
 
     def onlink_callback(self):
         self.sweep, self.mna = self.get_input_pin_value("num_results_input_pin", ("None", None))
+        self.result = None
         dpg.configure_item(self.uuid("sweep"), default_value=self.sweep)
 
         if self.mna is None:
@@ -68,9 +73,19 @@ class TransferFunctionNumeric(Node):
         # use the selected nodes
         node_out = dpg.get_value(self.uuid("output_node"))
 
-        H = self.mna.solveNumerical(sweep, node_out)
+        # solve once for all unknowns, a new solve is only needed for a new sweep
+        if self.result is None or self.result_sweep != sweep_str:
+            self.result = self.mna.solveNumericalAll(sweep)
+            self.result_sweep = sweep_str
+
+        H = self.result[node_out]
 
         if not dpg.does_item_exist(self.uuid("h_out")):
             self.add_output_pin(tag="h_out", text="H")
         self.add_output_pin_value("h_out", (H.tolist(), sweep), is_persistence=False)
         super().update()
+
+    def on_output_changed(self):
+        # only slice the cached result, if there is one
+        if self.result is not None:
+            self.update()
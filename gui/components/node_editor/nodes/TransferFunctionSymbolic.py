@@ -30,6 +30,7 @@ class TransferFunctionSymbolic(Node):
             with dpg.group(horizontal=True):
                 dpg.add_text("Output Node")
                 dpg.add_combo(items=[], tag=self.uuid("output_node"), width=100)
+            dpg.add_checkbox(label="Parallel (all cores)", tag=self.uuid("parallel"))
             dpg.add_button(label="Calculate Numeric Values", callback=self.update)
 
             dpg.add_text(default_value="Complexity Estimations", tag=self.uuid("compl_estimate"))
@@ -49,8 +50,7 @@ class TransferFunctionSymbolic(Node):
         self.sweep, self.mna = self.get_input_pin_value("num_results_input_pin", ("None", None))
         dpg.configure_item(self.uuid("sweep"), default_value=self.sweep)
 
-        A, _ = self.mna.get_equation_system()
-        estimate_num_terms = self.mna.estimateTerms(A)
+        estimate_num_terms = self.mna.estimateTerms()
         print("Estimations: ", estimate_num_terms)
         dpg.configure_item(self.uuid("compl_estimate"), default_value="Complexity Estimations: " + str(estimate_num_terms))
 
@@ -86,7 +86,8 @@ class TransferFunctionSymbolic(Node):
         # use the selected nodes
         node_out = dpg.get_value(self.uuid("output_node"))
 
-        H_sym = self.mna.solve(node_out)
+        method = "parallel" if dpg.get_value(self.uuid("parallel")) else "cramer"
+        H_sym = self.mna.solve(node_out, method=method)
         # smpl = H_sym
         # smpl = sp.cancel(H_sym)
         # smpl = sp.simplify(H_sym)
@@ -96,5 +97,6 @@ class TransferFunctionSymbolic(Node):
 
         if not dpg.does_item_exist(self.uuid("h_out")):
             self.add_output_pin(tag="h_out", text="H")
-        self.add_output_pin_value("h_out", (H_num.tolist(), sweep), is_persistence=False)
+        # the element values let the solver evaluate symbolic results as well
+        self.add_output_pin_value("h_out", (H_num.tolist(), sweep, self.mna.value_dict), is_persistence=False)
         super().update()
@@ -34,7 +34,11 @@ class ApproximatorWindow(Window):
 
         from Approximate import Approximation
 
-        ap = Approximation(self.mna)
+        ap = Approximation(
+            self.mna,
+            dpg.get_value(self.uuid("sweep_strategy")),
+            dpg.get_value(self.uuid("relevance_method")),
+        )
         print(self.approximation_points)
 
         to_node = dpg.get_value(self.uuid("to_node"))
@@ -96,6 +100,8 @@ class ApproximatorWindow(Window):
 
         sort_methods = Approximation.get_Sorting_Methods()
         elim_methods = Approximation.get_Elimination_Methods()
+        sweep_strategies = Approximation.get_Sweep_Strategies()
+        relevance_methods = Approximation.get_Relevance_Methods()
 
         dpg.add_combo(items=sort_methods, tag=self.uuid("sorting_method"), default_value=sort_methods[0], label="Sorting Method")
         dpg.add_input_float(default_value=0.6, tag=self.uuid("rel_error_threshold"), label="Reletive error threshold")
@@ -104,6 +110,14 @@ class ApproximatorWindow(Window):
                       default_value=elim_methods[0], 
                       label="Elimination Method")
         dpg.add_input_int(default_value=0, tag=self.uuid("column"), label="Column")
+        dpg.add_combo(items=sweep_strategies,
+                      tag=self.uuid("sweep_strategy"),
+                      default_value=sweep_strategies[0],
+                      label="Sweep Solver")
+        dpg.add_combo(items=relevance_methods,
+                      tag=self.uuid("relevance_method"),
+                      default_value=relevance_methods[0],
+                      label="Relevance Method")
 
         dpg.add_text(
             default_value="Not Calculated yet!", tag=self.uuid("approx_func_txt")
@@ -1,4 +1,10 @@
+import multiprocessing
 from Application import Application
 
-app = Application()
-app.start()
+# the worker processes of the parallel elimination import __main__ again
+# with the spawn and forkserver start methods, they must not open the GUI
+if __name__ == "__main__":
+    # workers of a PyInstaller bundle start the executable itself
+    multiprocessing.freeze_support()
+    app = Application()
+    app.start()
@@ -0,0 +1,77 @@
+import unittest
+import numpy as np
+import sympy as sp
+
+from Approximate import Approximation
+from Modified_Node_Analysis import ModifiedNodalAnalysis
+from tests.test_analysis.test_modified_nodal_analysis import build_circuit
+
+
+class TestApproximation(unittest.TestCase):
+
+    def setUp(self):
+        circuit = build_circuit([
+            ("V1", "V", ["1", "0"], {"value_ac": "1"}),
+            ("R1", "R", ["1", "2"], {"value_dc": "1k"}),
+            ("C1", "C", ["2", "0"], {"value_dc": "1u"}),
+            ("R2", "R", ["2", "3"], {"value_dc": "10k"}),
+            ("C2", "C", ["3", "0"], {"value_dc": "10n"}),
+            ("R3", "R", ["3", "0"], {"value_dc": "1meg"}),
+        ])
+        self.mna = ModifiedNodalAnalysis(circuit)
+        self.mna.buildEquationsSystem()
+        self.points = [10.0, 1e3, 1e5]
+
+    def test_sherman_morrison_matches_exact(self):
+        ap = Approximation(self.mna)
+        output = sp.Symbol("V_3")
+
+        sm = ap.generate_relevance_coefficients(output, self.points, self.mna.A)
+        exact = Approximation(self.mna, relevance_method="exact").generate_relevance_coefficients(output, self.points, self.mna.A)
+
+        self.assertEqual([(pos, term) for pos, term, _ in sm], [(pos, term) for pos, term, _ in exact])
+        for (_, term, error_sm), (_, _, error_exact) in zip(sm, exact):
+            self.assertEqual(error_sm.shape, (3,))
+            np.testing.assert_allclose(error_sm, error_exact, rtol=1e-8, atol=1e-14, err_msg=str(term))
+
+        # the only entry of the source row, the reduced matrix is singular
+        singular = [error for (i, j), term, error in sm if term == 1 and i == 3]
+        self.assertEqual(len(singular), 1)
+        self.assertTrue(np.isinf(singular[0]).all())
+
+        self.assertEqual(ap.compare_relevance_methods("V_3", self.points), [])
+
+    def test_unknown_relevance_method(self):
+        with self.assertRaises(ValueError):
+            Approximation(self.mna, relevance_method="does-not-exist").generate_relevance_coefficients(
+                sp.Symbol("V_3"), self.points, self.mna.A)
+
+    def test_find_order_jump(self):
+        ap = Approximation(self.mna)
+        terms = lambda relevances: [((0, 0), 0.0, 0.0, relevance) for relevance in relevances]
+
+        self.assertEqual(ap.find_order_jump(terms([1e-9, 2e-9, 1e-3, 2e-3]), 1.0), 1)
+        self.assertEqual(ap.find_order_jump(terms([0.0, 1e-9]), 1.0), 0)
+        self.assertEqual(ap.find_order_jump(terms([1e-9, 2e-9]), 1.0), 2)
+
+    def test_block_elimination_keeps_error(self):
+        points = [(f, 0.05) for f in self.points]
+        frequencies = np.array(self.points)
+        H = self.mna.solveNumerical(frequencies, "V_3")
+
+        reduced = Approximation(self.mna).approximate("V_3", points, "block", 0.6, "max")
+        H_block = reduced.solveNumerical(frequencies, "V_3")
+
+        self.assertLess(len(Approximation(self.mna).generate_term_list(reduced.A)), len(Approximation(self.mna).generate_term_list(self.mna.A)))
+        self.assertLessEqual(np.max(np.abs(np.abs(H_block) - np.abs(H)) / np.abs(H)), 0.05)
+
+    def test_block_elimination_keeps_columns(self):
+        # H = 1 at the source node, every term of the other nodes is irrelevant and whole columns empty out
+        points = [(f, 0.05) for f in self.points]
+        frequencies = np.array(self.points)
+
+        reduced = Approximation(self.mna).approximate("V_1", points, "block", 0.6, "max")
+
+        for col in range(reduced.A.cols):
+            self.assertFalse(reduced.A[:, col].is_zero_matrix, f"column {col} is empty")
+        np.testing.assert_allclose(reduced.solveNumerical(frequencies, "V_1"), 1.0, rtol=0.05)
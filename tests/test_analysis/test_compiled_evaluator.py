@@ -0,0 +1,57 @@
+import unittest
+import numpy as np
+import sympy as sp
+
+from Compiled_Evaluator import compile_expression, evaluate_transfer_function
+from Modified_Node_Analysis import ModifiedNodalAnalysis
+from tests.test_analysis.test_modified_nodal_analysis import build_circuit
+
+
+class TestCompiledEvaluator(unittest.TestCase):
+
+    def setUp(self):
+        self.s, self.R, self.C, self.X = sp.symbols("s R C V_$N_0001")
+
+    def test_matches_lambdify(self):
+        s, R, C, X = self.s, self.R, self.C, self.X
+        H = (1 + s*R*C)**3 / (X + s*C*R + (1 + s*R*C)**2) + sp.expand((1 + s*R + C)**12)
+        jw = 2j * np.pi * np.logspace(0, 6, 7)
+
+        expected = sp.lambdify((s, R, C, X), H, "numpy")(jw, 1e3, 1e-6, 2.0)
+        np.testing.assert_allclose(compile_expression(H, (s, R, C, X))(jw, 1e3, 1e-6, 2.0), expected, rtol=1e-12)
+
+        # element values as array, broadcast against the frequencies
+        values = compile_expression(H, (s, R, C, X))(jw, np.array([[1e3], [2e3]]), 1e-6, 2.0)
+        self.assertEqual(values.shape, (2, 7))
+        np.testing.assert_allclose(values[0], expected, rtol=1e-12)
+
+        self.assertIs(compile_expression(H, (s, R, C, X)), compile_expression(H, (s, R, C, X)))
+
+    def test_matrix_and_missing_values(self):
+        s, R, C, X = self.s, self.R, self.C, self.X
+        A = sp.Matrix([[1/R + s*C, -1/R], [0, X]])
+        values = evaluate_transfer_function(A, [1.0, 10.0, 100.0], {R: 1e3, C: 1e-6, X: 2.0})
+        self.assertEqual(values.shape, (2, 2, 3))
+        self.assertAlmostEqual(values[1, 1, 2], 2.0)
+        self.assertAlmostEqual(values[0, 0, 1], 1e-3 + 2j * np.pi * 10.0 * 1e-6)
+
+        with self.assertRaises(ValueError):
+            evaluate_transfer_function(A, [1.0], {R: 1e3})
+
+    def test_symbolic_result_matches_numeric_solve(self):
+        circuit = build_circuit([
+            ("V1", "V", ["1", "0"], {"value_ac": "1"}),
+            ("R1", "R", ["1", "2"], {"value_dc": "1k"}),
+            ("C1", "C", ["2", "0"], {"value_dc": "1u"}),
+            ("L1", "L", ["2", "3"], {"value_dc": "1m"}),
+            ("R2", "R", ["3", "0"], {"value_dc": "50"}),
+        ])
+        mna = ModifiedNodalAnalysis(circuit)
+        mna.buildEquationsSystem()
+        frequencies = np.logspace(1, 6, 11)
+
+        np.testing.assert_allclose(
+            mna.evaluateSymbolic(mna.solve("V_3", method="cramer"), frequencies),
+            mna.solveNumerical(frequencies, "V_3"),
+            rtol=1e-9,
+        )
@@ -0,0 +1,67 @@
+import unittest
+import numpy as np
+
+from Modified_Node_Analysis import ModifiedNodalAnalysis
+from Equation_Formulator import EquationFormulator
+from tests.test_analysis.test_modified_nodal_analysis import build_circuit
+
+
+class TestDeterminantDecisionDiagram(unittest.TestCase):
+
+    def setUp(self):
+        circuit = build_circuit([
+            ("V1", "V", ["1", "0"], {"value_ac": "1"}),
+            ("R1", "R", ["1", "2"], {"value_dc": "1k"}),
+            ("C1", "C", ["2", "0"], {"value_dc": "1u"}),
+            ("E1", "E", ["3", "0", "2", "0"], {"value": "10"}),
+            ("R2", "R", ["3", "0"], {"value_dc": "10k"}),
+        ])
+        self.mna = ModifiedNodalAnalysis(circuit)
+        self.mna.buildEquationsSystem()
+        self.frequencies = np.logspace(0, 6, 7)
+
+    def test_evaluation_matches_numeric_solve(self):
+        for name in self.mna.get_unknowns_as_strings():
+            N, D = self.mna.get_determinant_diagrams(name)
+            H = N.evaluate(self.frequencies) / D.evaluate(self.frequencies)
+            np.testing.assert_allclose(H, self.mna.solveNumerical(self.frequencies, name), rtol=1e-10, atol=1e-15)
+
+    def test_coefficients_and_term_counts(self):
+        N, D = self.mna.get_determinant_diagrams("V_2")
+
+        # D = -(1/R1 + s*C1) up to the sign of the E1 branch, N = -V1/R1 with the same sign
+        np.testing.assert_allclose(D.coefficients() / D.coefficients()[0], [1, 1e-3])
+        np.testing.assert_allclose(N.coefficients() / D.coefficients()[0], [1])
+        self.assertEqual(D.term_counts(), [1, 1])
+        self.assertEqual(N.term_counts(), [1])
+        self.assertEqual(D.term_count(), 2)
+
+    def test_numeric_mode_matches_symbolic_mode(self):
+        numeric = ModifiedNodalAnalysis(self.mna.ct, numeric=True)
+        numeric.buildEquationsSystem()
+
+        _, D_sym = self.mna.get_determinant_diagrams("V_3")
+        _, D_num = numeric.get_determinant_diagrams("V_3")
+
+        np.testing.assert_allclose(D_num.coefficients(), D_sym.coefficients())
+        self.assertEqual(D_num.term_counts(), D_sym.term_counts())
+
+    def test_count_terms_of_large_sparse_pattern(self):
+        # tridiagonal 200x200 with 2-term diagonal: per = 2*per(n-1) + per(n-2), Pell numbers
+        size = 200
+        counts = {(i, i): 2 for i in range(size)}
+        counts.update({(i, i + 1): 1 for i in range(size - 1)})
+        counts.update({(i + 1, i): 1 for i in range(size - 1)})
+        pell = [1, 2]
+        for _ in range(size - 1):
+            pell.append(2 * pell[-1] + pell[-2])
+
+        formulator = EquationFormulator()
+        self.assertEqual(formulator.countTerms(size, counts), pell[size])
+
+        # too large for the exact count, the estimate is within sqrt(2)^n of 12!
+        dense = {(i, j): 1 for i in range(12) for j in range(12)}
+        self.assertEqual(formulator.countTerms(12, dense), 479001600)
+        estimate = formulator.countTerms(12, dense, max_edges=100)
+        self.assertLessEqual(estimate, 479001600)
+        self.assertGreaterEqual(estimate, 479001600 / 2 ** 6)
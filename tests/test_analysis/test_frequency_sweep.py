@@ -0,0 +1,107 @@
+import unittest
+import numpy as np
+
+from Frequency_Sweep import LoopSweep, BatchedSweep, SparseLUSweep, QZSweep, IncrementalInverse, get_sweep_solver, interpolate_coefficients
+
+
+class TestFrequencySweep(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.G = rng.normal(size=(6, 6)) + 6 * np.eye(6)
+        self.C = rng.normal(size=(6, 6)) * 1e-3
+        self.z = rng.normal(size=6)
+        self.frequencies = np.logspace(0, 6, 50)
+
+    def test_batched_matches_loop(self):
+        X_loop, _ = LoopSweep(self.G, self.C).solve(self.frequencies, self.z)
+        X_batched, singular = BatchedSweep(self.G, self.C, max_bytes=2048).solve(self.frequencies, self.z)
+
+        self.assertFalse(singular.any())
+        np.testing.assert_allclose(X_batched, X_loop)
+
+    def test_singular_points_are_masked(self):
+        G = np.array([[1.0, 1.0], [1.0, 1.0]])
+        C = np.eye(2)
+
+        X, singular = get_sweep_solver("batched", G, C).solve([0.0, 1.0, 0.0, 2.0], np.array([1.0, 0.0]))
+
+        np.testing.assert_array_equal(singular, [True, False, True, False])
+        self.assertTrue(np.isnan(X[0]).all())
+        np.testing.assert_allclose((G + 2j * np.pi * C) @ X[1], [1.0, 0.0], atol=1e-12)
+
+    def test_unknown_strategy(self):
+        with self.assertRaises(ValueError):
+            get_sweep_solver("does-not-exist", self.G, self.C)
+
+    def test_sparse_matches_batched(self):
+        n = 40
+        G = np.diag(np.full(n, 2.0)) - np.diag(np.ones(n - 1), 1) - np.diag(np.ones(n - 1), -1)
+        G[0, 0] = 1.0
+        C = np.diag(np.full(n, 1e-6))
+        z = np.zeros(n)
+        z[0] = 1.0
+
+        solver = SparseLUSweep(G, C)
+        X_sparse, singular = solver.solve(self.frequencies, z)
+        X_batched, _ = BatchedSweep(G, C).solve(self.frequencies, z)
+
+        self.assertFalse(singular.any())
+        self.assertEqual(sorted(solver.column_order), list(range(n)))
+        np.testing.assert_allclose(X_sparse, X_batched, rtol=1e-8, atol=1e-12)
+
+    def test_qz_matches_batched(self):
+        z = np.stack([self.z, np.arange(6.0)], axis=1)
+
+        X_qz, singular = QZSweep(self.G, self.C, max_bytes=1024).solve(self.frequencies, z)
+        X_batched, _ = BatchedSweep(self.G, self.C).solve(self.frequencies, z)
+
+        self.assertFalse(singular.any())
+        self.assertEqual(X_qz.shape, (50, 6, 2))
+        np.testing.assert_allclose(X_qz, X_batched, rtol=1e-9)
+
+    def test_auto_picks_qz_for_many_points(self):
+        self.assertIsInstance(get_sweep_solver("auto", self.G, self.C, 1000), QZSweep)
+        self.assertIsInstance(get_sweep_solver("auto", self.G, self.C, 10), BatchedSweep)
+
+    def test_interpolated_coefficients_with_spread_poles(self):
+        # det = (1 + s) (1 + 1e-6 s) (1 + 1e-12 s), coefficients over 18 decades
+        G = np.eye(3) + np.diag([1.0, 1.0], 1)
+        C = np.diag([1.0, 1e-6, 1e-12])
+        z = np.array([0.0, 0.0, 1.0])
+
+        N, D = interpolate_coefficients(G, C, z, 0)
+
+        np.testing.assert_allclose(D, np.polynomial.polynomial.polyfromroots([-1, -1e6, -1e12]) * 1e-18, rtol=1e-9)
+        # Cramer: column 0 replaced by z, det = 1
+        np.testing.assert_allclose(N, [1.0], rtol=1e-9)
+
+    def test_incremental_inverse_matches_direct_solve(self):
+        inverse = IncrementalInverse(self.G, self.C, self.frequencies, self.z)
+        G, C = self.G.copy(), self.C.copy()
+
+        for i, j in [(0, 1), (2, 2), (4, 0)]:
+            X_trial, singular = inverse.trial(i, j, G[i, j], C[i, j])
+            inverse.update(i, j, G[i, j], C[i, j])
+            G[i, j] = C[i, j] = 0.0
+
+            X, _ = BatchedSweep(G, C).solve(self.frequencies, self.z)
+            self.assertFalse(singular.any())
+            np.testing.assert_allclose(X_trial, X, rtol=1e-9)
+            np.testing.assert_allclose(inverse.x, X, rtol=1e-9)
+
+        self.assertEqual((inverse.updates, inverse.refactorizations), (3, 1))
+
+        # every update drifts with a zero tolerance
+        strict = IncrementalInverse(self.G, self.C, self.frequencies, self.z, drift_tol=0.0)
+        strict.update(0, 1, self.G[0, 1], self.C[0, 1])
+        self.assertEqual(strict.refactorizations, 2)
+
+    def test_incremental_inverse_singular_trial(self):
+        G = np.array([[1.0, 0.0], [0.0, 2.0]])
+        C = np.zeros((2, 2))
+
+        X, singular = IncrementalInverse(G, C, [1.0, 10.0], np.ones(2)).trial(1, 1, 2.0, 0.0)
+
+        self.assertTrue(singular.all())
+        self.assertTrue(np.isnan(X).all())
@@ -0,0 +1,92 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import sympy as sp
+
+from netlist.Element import Element
+from Hierarchical_Analysis import HierarchicalAnalysis
+from Modified_Node_Analysis import ModifiedNodalAnalysis
+from parser.NetlistParser import get_circuit_from_file
+from tests.test_analysis.test_modified_nodal_analysis import build_circuit
+
+
+def build_hierarchical_circuit():
+    # RC T-section with an internal node, used twice in a row
+    section = build_circuit([
+        ("R1", "R", ["a", "m"], {"value_dc": "1k"}),
+        ("R2", "R", ["m", "b"], {"value_dc": "2k"}),
+        ("C1", "C", ["m", "0"], {"value_dc": "1u"}),
+    ])
+    section.name = "TSECTION"
+    section.inner_connecting_nodes = ["a", "b"]
+
+    circuit = build_circuit([
+        ("V1", "V", ["1", "0"], {"value_ac": "1"}),
+        ("R3", "R", ["3", "0"], {"value_dc": "10k"}),
+    ])
+    circuit.add_subcircuit(section)
+    for name, nodes in (("X1", ["1", "2"]), ("X2", ["2", "3"])):
+        circuit.add_element(Element(name=name, type="X", connections=nodes, params={"ref_cir": "TSECTION"}))
+    return circuit
+
+
+class TestHierarchicalAnalysis(unittest.TestCase):
+
+    def setUp(self):
+        self.hierarchical = HierarchicalAnalysis(build_hierarchical_circuit())
+        self.hierarchical.buildEquationsSystem()
+
+        flat = build_hierarchical_circuit()
+        flat.flatten()
+        self.flat = ModifiedNodalAnalysis(flat)
+        self.flat.buildEquationsSystem()
+
+    def test_instances_share_one_reduction(self):
+        self.assertEqual(list(self.hierarchical.port_cache), [("X", "TSECTION")])
+        # only the top level nodes and the source current are left
+        self.assertEqual(self.hierarchical.get_unknowns_as_strings(), ["V_1", "V_3", "V_2", "I_V1"])
+
+    def test_symbolic_result_matches_flat_circuit(self):
+        H_hierarchical = self.hierarchical.solve("V_3")
+        H_flat = self.flat.solve("V_3", method="cramer")
+        self.assertEqual(sp.simplify(H_hierarchical - H_flat), 0)
+
+    def test_numeric_result_matches_flat_circuit(self):
+        frequencies = np.logspace(0, 5, 6)
+        self.assertFalse(self.hierarchical.pencil)
+        np.testing.assert_allclose(
+            self.hierarchical.solveNumerical(frequencies, "V_3"),
+            self.flat.solveNumerical(frequencies, "V_3"),
+            rtol=1e-10,
+        )
+
+    def test_transistors_in_subcircuits_get_their_own_values(self):
+        # three UA741 instances with 21 transistors each, Q1 of XOP1 gets another operating point
+        with open("test_circuits/labor10.out") as fp:
+            out = fp.read().replace("RPI          5.37E+05", "RPI          1.00E+05", 1)
+        with tempfile.TemporaryDirectory() as directory:
+            out_file = os.path.join(directory, "labor10.out")
+            with open(out_file, "w") as fp:
+                fp.write(out)
+
+            hierarchical = HierarchicalAnalysis(get_circuit_from_file("test_circuits/labor10.cir"), out_file)
+            hierarchical.buildEquationsSystem()
+
+            flat = get_circuit_from_file("test_circuits/labor10.cir")
+            flat.flatten()
+            flat.flatten(True, out_file)
+            flat = ModifiedNodalAnalysis(flat)
+            flat.buildEquationsSystem()
+
+        self.assertEqual(len(hierarchical.port_cache), 5)
+        self.assertEqual(hierarchical.value_dict, flat.value_dict)
+        self.assertEqual(hierarchical.value_dict[sp.Symbol("R_be.Q1.XOP1")], 1e5)
+        self.assertEqual(hierarchical.value_dict[sp.Symbol("R_be.Q1.XOP3")], 5.37e5)
+
+        frequencies = np.logspace(1, 7, 7)
+        np.testing.assert_allclose(
+            hierarchical.solveNumerical(frequencies, "V_6"),
+            flat.solveNumerical(frequencies, "V_6"),
+            rtol=1e-9,
+        )
@@ -0,0 +1,230 @@
+import unittest
+import sympy as sp
+import numpy as np
+
+from netlist.Circuit import Circuit
+from netlist.Element import Element
+from Modified_Node_Analysis import ModifiedNodalAnalysis
+
+
+def build_circuit(elements):
+    circuit = Circuit(name="TestBench")
+    for name, type, connections, params in elements:
+        circuit.add_element(Element(name=name, type=type, connections=connections, params=params))
+    return circuit
+
+
+class TestModifiedNodalAnalysis(unittest.TestCase):
+
+    def setUp(self):
+        self.circuit = build_circuit([
+            ("V1", "V", ["1", "0"], {"value_ac": "1"}),
+            ("R1", "R", ["1", "2"], {"value_dc": "1k"}),
+            ("C1", "C", ["2", "0"], {"value_dc": "1u"}),
+            ("E1", "E", ["3", "0", "2", "0"], {"value": "10"}),
+        ])
+        self.mna = ModifiedNodalAnalysis(self.circuit)
+        self.mna.buildEquationsSystem()
+
+    def test_branch_currents_counted_up_front(self):
+        self.assertEqual(self.mna.get_unknowns_as_strings(), ["V_1", "V_2", "V_3", "I_V1", "I_E1"])
+        self.assertEqual(self.mna.stamps.size, 5)
+
+    def test_sparse_and_dense_system_match(self):
+        A, z = self.mna.get_equation_system()
+        A_sparse, z_sparse = self.mna.get_equation_system(sparse=True)
+
+        self.assertIsInstance(A_sparse, sp.SparseMatrix)
+        self.assertEqual(A_sparse, sp.SparseMatrix(A))
+        self.assertEqual(z, z_sparse)
+
+        R1, C1, s = sp.symbols("R1 C1 s")
+        self.assertEqual(A[1, 1], 1/R1 + s*C1)
+        self.assertEqual(A[0, 1], -1/R1)
+        self.assertEqual(z[3], sp.Symbol("V1"))
+
+    def test_numeric_mode_matches_symbolic_system(self):
+        numeric = ModifiedNodalAnalysis(self.circuit, numeric=True)
+        numeric.buildEquationsSystem()
+
+        self.assertIsNone(numeric._unknowns)
+        self.assertNotIn(True, [isinstance(value, sp.Basic) for value in numeric.stamps.values])
+
+        frequencies = [1.0, 159.0, 1e5]
+        H_sym = self.mna.solveNumerical(frequencies, "V_3")
+        H_num = numeric.solveNumerical(frequencies, "V_3")
+
+        for h_sym, h_num in zip(H_sym, H_num):
+            self.assertAlmostEqual(h_sym, h_num)
+        self.assertAlmostEqual(abs(H_num[1]), 10 / abs(1 + 2j * 3.141592653589793 * 159.0e-3), places=6)
+
+    def test_inductor_gets_branch_current(self):
+        circuit = build_circuit([
+            ("V1", "V", ["1", "0"], {"value_ac": "1"}),
+            ("L1", "L", ["1", "2"], {"value_dc": "1m"}),
+            ("R1", "R", ["2", "0"], {"value_dc": "1"}),
+        ])
+        mna = ModifiedNodalAnalysis(circuit)
+        mna.buildEquationsSystem()
+
+        self.assertEqual(mna.get_unknowns_as_strings(), ["V_1", "V_2", "I_V1", "I_L1"])
+        G, C, _ = mna.get_numeric_system()
+        self.assertEqual(C[3, 3], -1e-3)
+        self.assertAlmostEqual(abs(mna.solveNumerical([1e3 / (2 * 3.141592653589793)], "V_2")[0]), 1 / abs(1 + 1j))
+
+    def test_solve_all_unknowns_at_once(self):
+        frequencies = [1.0, 159.0, 1e5]
+        result = self.mna.solveNumericalAll(frequencies)
+
+        self.assertEqual(result.names, self.mna.get_unknowns_as_strings())
+        self.assertEqual(result.values.shape, (3, len(result.names)))
+        self.assertFalse(result.singular.any())
+        for name in ["V_2", "V_3"]:
+            for h_all, h_single in zip(result[name], self.mna.solveNumerical(frequencies, name)):
+                self.assertAlmostEqual(h_all, h_single)
+
+        subset = self.mna.solveNumericalAll(frequencies, outputs=["V_3"])
+        self.assertEqual(subset.names, ["V_3"])
+        with self.assertRaises(ValueError):
+            self.mna.solveNumericalAll(frequencies, outputs=["V_9"])
+
+    def test_transfer_matrix_superposition(self):
+        circuit = build_circuit([
+            ("V1", "V", ["1", "0"], {"value_ac": "1"}),
+            ("R1", "R", ["1", "2"], {"value_dc": "1k"}),
+            ("C1", "C", ["2", "0"], {"value_dc": "1u"}),
+            ("I1", "I", ["0", "2"], {"value_ac": "0"}),
+        ])
+        mna = ModifiedNodalAnalysis(circuit)
+        mna.buildEquationsSystem()
+
+        frequencies = [1.0, 159.0, 1e5]
+        H, outputs, inputs = mna.solveTransferMatrix(frequencies, outputs=["V_2"])
+
+        self.assertEqual(inputs, ["V1", "I1"])
+        self.assertEqual(H.shape, (1, 2, 3))
+        for k, f in enumerate(frequencies):
+            s = 2j * 3.141592653589793 * f
+            self.assertAlmostEqual(H[0, 0, k], 1 / (1 + s * 1e-3))
+            self.assertAlmostEqual(H[0, 1, k], 1e3 / (1 + s * 1e-3))
+
+        # the V1 column is the regular solution, as I1 has no ac value
+        for h, h_ref in zip(H[0, 0], mna.solveNumerical(frequencies, "V_2")):
+            self.assertAlmostEqual(h, h_ref)
+
+    def test_modify_input_scales_excitation(self):
+        z = self.mna.modify_Input([2, 2, 2, 3, 2])
+        self.assertEqual(z[3], 3 * sp.Symbol("V1"))
+
+    def test_adjoint_sensitivities(self):
+        frequencies = [1.0, 159.0, 1e5]
+        H, sensitivities = self.mna.solveSensitivities(frequencies, "V_3")
+
+        self.assertEqual(list(sensitivities), list(self.mna.value_dict))
+        R1, C1, V1, E1 = sp.symbols("R1 C1 V1 E1")
+        for k, f in enumerate(frequencies):
+            sRC = 2j * 3.141592653589793 * f * 1e-3
+            self.assertAlmostEqual(abs(H[k]), abs(10 / (1 + sRC)))
+            self.assertAlmostEqual(sensitivities[R1][k], -sRC / (1 + sRC))
+            self.assertAlmostEqual(sensitivities[C1][k], -sRC / (1 + sRC))
+            self.assertAlmostEqual(sensitivities[V1][k], 1)
+            self.assertAlmostEqual(sensitivities[E1][k], 1)
+
+        _, sparse_sensitivities = self.mna.solveSensitivities(frequencies, "V_3", strategy="sparse")
+        for key, values in sensitivities.items():
+            for value, sparse_value in zip(values, sparse_sensitivities[key]):
+                self.assertAlmostEqual(value, sparse_value)
+
+    def test_cramer_solve_matches_lu(self):
+        for name in ["V_2", "V_3", "I_V1"]:
+            N, D = self.mna.solveFraction(name)
+            self.assertEqual(sp.simplify(N / D - self.mna.solve(name)), 0)
+
+        R1, C1, V1, s = sp.symbols("R1 C1 V1 s")
+        N, D = self.mna.solveFraction("V_2")
+        self.assertEqual(sp.cancel(N / D), V1 / (C1 * R1 * s + 1))
+        self.assertTrue(N.is_polynomial() and D.is_polynomial())
+        self.assertEqual(sp.simplify(self.mna.solve("V_2", method="cramer") - V1 / (C1 * R1 * s + 1)), 0)
+
+    def test_domain_system_is_polynomial(self):
+        A, z = self.mna.get_equation_system(domain=True)
+
+        self.assertTrue(A.domain.is_PolynomialRing)
+        self.assertEqual(A.shape, (5, 5))
+        self.assertEqual(z.shape, (5, 1))
+
+        # row of node 2 is scaled with R1: -1/R1, 1/R1 + s*C1 -> -1, 1 + s*C1*R1
+        R1, C1, s = sp.symbols("R1 C1 s")
+        row = A.to_Matrix().row(1)
+        self.assertEqual(sp.expand(row[1] / row[0]), sp.expand(-(1 + s * C1 * R1)))
+
+        A_sym, _ = self.mna.get_equation_system()
+        # structural count from the stamps and from the matrix, no cancellation considered
+        terms = self.mna.estimateTerms()
+        self.assertEqual(terms, self.mna.estimateTerms(A_sym))
+        self.assertGreaterEqual(terms, len(sp.Add.make_args(sp.expand(A_sym.det()))))
+
+        _, D = self.mna.solveFraction("V_2")
+        self.assertEqual(sp.expand(D - A.domain.to_sympy(A.det())), 0)
+
+    def test_numeric_coefficients_match_determinant_diagram(self):
+        circuit = build_circuit([
+            ("V1", "V", ["1", "0"], {"value_ac": "1"}),
+            ("R1", "R", ["1", "2"], {"value_dc": "1k"}),
+            ("L1", "L", ["2", "3"], {"value_dc": "10m"}),
+            ("C1", "C", ["3", "0"], {"value_dc": "1u"}),
+            ("R2", "R", ["3", "0"], {"value_dc": "10k"}),
+        ])
+        mna = ModifiedNodalAnalysis(circuit)
+        mna.buildEquationsSystem()
+
+        N, D = mna.numeric_coefficients("V_3")
+        N_ddd, D_ddd = mna.get_determinant_diagrams("V_3")
+
+        np.testing.assert_allclose(D, D_ddd.coefficients(), rtol=1e-9)
+        np.testing.assert_allclose(N, N_ddd.coefficients(), rtol=1e-9)
+
+    def test_ordering_keeps_solution_and_names(self):
+        original = self.mna.get_unknowns_as_strings()
+        H = self.mna.solveNumerical([1.0, 159.0], "V_3")
+
+        for ordering in ("rcm", "min_degree"):
+            mna = ModifiedNodalAnalysis(self.circuit, ordering=ordering)
+            mna.buildEquationsSystem()
+
+            names = mna.get_unknowns_as_strings()
+            self.assertEqual(sorted(names), sorted(original))
+            self.assertEqual(names, [original[idx] for idx in mna.permutation])
+            self.assertEqual(sp.simplify(mna.solve("V_3") - self.mna.solve("V_3")), 0)
+            for h, h_ordered in zip(H, mna.solveNumerical([1.0, 159.0], "V_3")):
+                self.assertAlmostEqual(h, h_ordered)
+
+        with self.assertRaises(ValueError):
+            ModifiedNodalAnalysis(self.circuit, ordering="amd").buildEquationsSystem()
+
+    def test_symbolic_subset(self):
+        mna = ModifiedNodalAnalysis(self.circuit, symbolic=["R1"])
+        mna.buildEquationsSystem()
+
+        R1, s = sp.symbols("R1 s")
+        H = mna.solve("V_3", method="cramer")
+        self.assertEqual(H.free_symbols, {R1, s})
+        self.assertEqual(sp.simplify(H - self.mna.solve("V_3").subs({"C1": sp.Rational(1, 10**6), "E1": 10, "V1": 1})), 0)
+        self.assertEqual(set(mna.value_dict), set(self.mna.value_dict))
+        for h, h_sub in zip(self.mna.solveNumerical([1.0, 159.0], "V_3"), mna.solveNumerical([1.0, 159.0], "V_3")):
+            self.assertAlmostEqual(h, h_sub)
+
+    def test_symbolic_sensitivities_match_diff(self):
+        H = self.mna.solve("V_3", method="cramer")
+
+        derivatives = self.mna.solveSymbolicSensitivities("V_3", normalized=False)
+        self.assertEqual(set(derivatives), {"V1", "R1", "C1", "E1"})
+        for name, derivative in derivatives.items():
+            self.assertEqual(sp.simplify(derivative - sp.diff(H, sp.Symbol(name))), 0)
+
+        R1 = sp.Symbol("R1")
+        S = self.mna.solveSymbolicSensitivities("V_3", ["R1"])
+        self.assertEqual(sp.simplify(S["R1"] - R1 / H * sp.diff(H, R1)), 0)
+
+        with self.assertRaises(ValueError):
+            ModifiedNodalAnalysis(self.circuit, symbolic=["C1"]).solveSymbolicSensitivities("V_3", ["R1"])
@@ -0,0 +1,41 @@
+import unittest
+import sympy as sp
+
+from Modified_Node_Analysis import ModifiedNodalAnalysis
+from Parallel_Determinant import expand_minors, parallel_fraction_free_solve
+from tests.test_analysis.test_modified_nodal_analysis import build_circuit
+
+
+class TestParallelDeterminant(unittest.TestCase):
+
+    def setUp(self):
+        elements = [("V1", "V", ["1", "0"], {"value_ac": "1"})]
+        for i in range(1, 6):
+            elements.append((f"R{i}", "R", [str(i), str(i + 1)], {"value_dc": "1k"}))
+            elements.append((f"C{i}", "C", [str(i + 1), "0"], {"value_dc": "1n"}))
+        elements.append(("G1", "G", ["3", "0", "6", "0"], {"value": "1m"}))
+        self.circuit = build_circuit(elements)
+
+    def test_minors_add_up_to_serial_solve(self):
+        mna = ModifiedNodalAnalysis(self.circuit)
+        mna.buildEquationsSystem()
+        system = mna.get_domain_system()
+        idx = mna.unknown_names.index("V_4")
+
+        self.assertGreater(len(expand_minors(system, idx, tasks=8)), 1)
+
+        N, D = mna.fractionFreeSolve(system, idx)
+        N_par, D_par = parallel_fraction_free_solve(system, idx, workers=2, tasks=8)
+        self.assertEqual(sp.expand(N - N_par), 0)
+        self.assertEqual(sp.expand(D - D_par), 0)
+        self.assertEqual(mna.solve("V_4", method="parallel"), N / D)
+
+    def test_numeric_system(self):
+        mna = ModifiedNodalAnalysis(self.circuit, numeric=True)
+        mna.buildEquationsSystem()
+
+        N, D = mna.solveFraction("V_6")
+        N_par, D_par = mna.solveFraction("V_6", workers=2)
+        s = sp.symbols("s")
+        for value in (1e3, 1e5j):
+            self.assertAlmostEqual(complex((N / D).subs(s, value)), complex((N_par / D_par).subs(s, value)))
@@ -0,0 +1,44 @@
+import unittest
+import numpy as np
+import sympy as sp
+
+from Modified_Node_Analysis import ModifiedNodalAnalysis
+from Rational_Function import RationalFunction, horner
+from tests.test_analysis.test_modified_nodal_analysis import build_circuit
+
+
+class TestRationalFunction(unittest.TestCase):
+
+    def setUp(self):
+        self.circuit = build_circuit([
+            ("V1", "V", ["1", "0"], {"value_ac": "1"}),
+            ("R1", "R", ["1", "2"], {"value_dc": "1k"}),
+            ("C1", "C", ["2", "0"], {"value_dc": "1u"}),
+            ("L1", "L", ["2", "3"], {"value_dc": "1m"}),
+            ("R2", "R", ["3", "0"], {"value_dc": "50"}),
+        ])
+        self.mna = ModifiedNodalAnalysis(self.circuit)
+        self.mna.buildEquationsSystem()
+        self.frequencies = np.logspace(1, 6, 11)
+
+    def test_normal_form_matches_numeric_solve(self):
+        H = self.mna.solveNumerical(self.frequencies, "V_3")
+
+        rational = self.mna.solveRational("V_3")
+        self.assertEqual(rational.degrees(), (0, 2))
+        self.assertEqual(sp.simplify(rational.as_expr() - self.mna.solve("V_3")), 0)
+        np.testing.assert_allclose(rational.evaluate(self.frequencies, self.mna.value_dict), H, rtol=1e-12)
+
+        nested = RationalFunction.from_expression(self.mna.solve("V_3"))
+        np.testing.assert_allclose(nested.evaluate(self.frequencies, self.mna.value_dict), H, rtol=1e-12)
+
+    def test_batched_element_values(self):
+        rational = self.mna.solveRational("V_3")
+        values = dict(self.mna.value_dict)
+        values[sp.Symbol("R2")] = np.array([[50.0], [100.0]])
+
+        H = rational.evaluate(self.frequencies, values)
+        self.assertEqual(H.shape, (2, len(self.frequencies)))
+        np.testing.assert_allclose(H[0], self.mna.solveNumerical(self.frequencies, "V_3"), rtol=1e-12)
+
+        self.assertEqual(horner([1, 2, 3], np.array([2.0]))[0], 17.0)
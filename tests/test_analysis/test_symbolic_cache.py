@@ -0,0 +1,81 @@
+import json
+import os
+import tempfile
+import unittest
+import zlib
+import sympy as sp
+
+from Modified_Node_Analysis import ModifiedNodalAnalysis
+from Symbolic_Cache import SymbolicCache, decode_expression, encode_expression
+from tests.test_analysis.test_modified_nodal_analysis import build_circuit
+
+
+class TestSymbolicCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.circuit = build_circuit([
+            ("V1", "V", ["1", "0"], {"value_ac": "1"}),
+            ("R1", "R", ["1", "2"], {"value_dc": "1k"}),
+            ("C1", "C", ["2", "0"], {"value_dc": "1u"}),
+            ("R2", "R", ["2", "0"], {"value_dc": "10k"}),
+        ])
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def solve(self, cache, unknown, method="cramer"):
+        mna = ModifiedNodalAnalysis(self.circuit)
+        mna.buildEquationsSystem()
+        mna.cache = cache
+        return mna.solve(unknown, method=method)
+
+    def test_reload_hits_cache(self):
+        cache = SymbolicCache(self.directory.name)
+        H = self.solve(cache, "V_2")
+        self.assertEqual((cache.hits, cache.misses), (0, 1))
+
+        # a new cache on the same folder, like a reloaded pipeline
+        reloaded = SymbolicCache(self.directory.name)
+        self.assertEqual(self.solve(reloaded, "V_2"), H)
+        self.assertEqual(self.solve(reloaded, "V_2", method="parallel"), H)
+        self.assertEqual(reloaded.hits, 2)
+
+        self.solve(reloaded, "V_2", method="lu")
+        self.solve(reloaded, "V_1")
+        self.assertEqual(reloaded.misses, 2)
+
+    def test_lru_eviction(self):
+        cache = SymbolicCache(self.directory.name)
+        self.solve(cache, "V_1")
+        self.solve(cache, "V_2")
+        files = os.listdir(self.directory.name)
+        self.assertEqual(len(files), 2)
+
+        cache.max_bytes = max(os.path.getsize(os.path.join(self.directory.name, name)) for name in files)
+        # touch V_1, so V_2 is the least recently used entry
+        self.solve(cache, "V_1")
+        cache.evict()
+        self.assertEqual(len(os.listdir(self.directory.name)), 1)
+        self.solve(cache, "V_1")
+        self.assertEqual(cache.hits, 2)
+
+    def test_unreadable_entry_is_a_miss(self):
+        cache = SymbolicCache(self.directory.name)
+        H = self.solve(cache, "V_2")
+        path = os.path.join(self.directory.name, os.listdir(self.directory.name)[0])
+
+        for data in (b"\x80\x04\x95garbage", zlib.compress(b'[[["X", 1]], [["I", 1]]]'), b""):
+            with open(path, "wb") as fp:
+                fp.write(data)
+            self.assertEqual(self.solve(cache, "V_2"), H)
+            self.assertTrue(os.path.exists(path))
+        self.assertEqual((cache.hits, cache.misses), (0, 4))
+
+    def test_expression_round_trip(self):
+        R, C, s = sp.symbols("R C s")
+        expression = (sp.Float("1.5e-9") * R + sp.Rational(1, 3) * s * C) ** 2 / (R**-1 + 7 * C * s)
+        self.assertEqual(decode_expression(json.loads(json.dumps(encode_expression(expression)))), expression)
+
+        with self.assertRaises(TypeError):
+            encode_expression(sp.sin(R))
@@ -0,0 +1,51 @@
+import unittest
+import sympy as sp
+
+from Modified_Node_Analysis import ModifiedNodalAnalysis
+from Topological_Analysis import TopologicalAnalysis
+from tests.test_analysis.test_modified_nodal_analysis import build_circuit
+
+
+class TestTopologicalAnalysis(unittest.TestCase):
+
+    def setUp(self):
+        self.elements = [
+            ("R1", "R", ["1", "2"], {"value_dc": "1k"}),
+            ("C1", "C", ["2", "0"], {"value_dc": "1u"}),
+            ("G1", "G", ["3", "0", "2", "0"], {"value": "1m"}),
+            ("R2", "R", ["3", "0"], {"value_dc": "10k"}),
+            ("L1", "L", ["3", "1"], {"value_dc": "1m"}),
+        ]
+
+    def assert_matches_mna(self, circuit):
+        topological = TopologicalAnalysis(circuit)
+        topological.buildGraphs()
+        mna = ModifiedNodalAnalysis(circuit)
+        mna.buildEquationsSystem()
+
+        for name in topological.get_unknowns_as_strings():
+            self.assertEqual(sp.simplify(topological.solve(name) - mna.solve(name, method="cramer")), 0)
+
+    def test_current_source_input_matches_mna(self):
+        self.assert_matches_mna(build_circuit(self.elements + [("I1", "I", ["0", "1"], {"value_ac": "1"})]))
+
+    def test_floating_voltage_source_input_matches_mna(self):
+        self.assert_matches_mna(build_circuit(self.elements + [("V1", "V", ["1", "2"], {"value_ac": "1"})]))
+
+    def test_ladder_is_sum_of_trees(self):
+        # RC ladder with n sections: the spanning trees are counted by every other Fibonacci number
+        elements = [("V1", "V", ["1", "0"], {"value_ac": "1"})]
+        for i in range(1, 6):
+            elements.append((f"R{i}", "R", [str(i), str(i + 1)], {"value_dc": "1k"}))
+            elements.append((f"C{i}", "C", [str(i + 1), "0"], {"value_dc": "1n"}))
+        topological = TopologicalAnalysis(build_circuit(elements))
+        topological.buildGraphs()
+
+        N, D = topological.solveFraction("V_6")
+        self.assertEqual(len(sp.Add.make_args(D)), 89)
+        self.assertEqual(len(sp.Add.make_args(N)), 1)
+
+    def test_unsupported_element(self):
+        circuit = build_circuit(self.elements + [("E1", "E", ["3", "0", "2", "0"], {"value": "10"})])
+        with self.assertRaises(ValueError):
+            TopologicalAnalysis(circuit).buildGraphs()